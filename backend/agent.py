@@ -0,0 +1,131 @@
+"""
+Monitoring Agent
+Runs SystemMonitor headless and pushes batched samples to a fleet aggregator
+
+Usage: python agent.py --server HOST:PORT [--name NAME] [--batch SECONDS]
+"""
+
+import argparse
+import socket
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from fleet import DEFAULT_PORT, encode_batch, encode_hello
+from metrics_store import FIELD_NAMES, extract_values
+
+# Seconds of samples per batch
+DEFAULT_BATCH_SECONDS = 5.0
+
+# Rows kept while the aggregator is unreachable (one hour at a 0.5 s tick)
+MAX_PENDING_ROWS = 7200
+
+RECONNECT_MIN_SECONDS = 1.0
+RECONNECT_MAX_SECONDS = 30.0
+
+
+class AgentConnection:
+    """Persistent connection to the aggregator with a bounded send backlog.
+
+    Rows are queued locally and flushed as one compressed batch; while the
+    aggregator is unreachable they accumulate (oldest dropped first) and
+    the connection is retried with exponential backoff.
+    """
+
+    def __init__(self, server: str, host_name: str, fields: List[str] = FIELD_NAMES,
+                 max_pending: int = MAX_PENDING_ROWS):
+        address, _, port = server.rpartition(':')
+        self.address = (address or server, int(port) if address else DEFAULT_PORT)
+        self.host_name = host_name
+        self.fields = fields
+        self.pending: deque = deque(maxlen=max_pending)
+        self.latest: Optional[Dict] = None
+        self.sock: Optional[socket.socket] = None
+        self._retry_at = 0.0
+        self._backoff = RECONNECT_MIN_SECONDS
+        self.bytes_sent = 0
+
+    def add(self, timestamp: float, values: List[float], frame: Optional[Dict] = None):
+        self.pending.append([timestamp] + list(values))
+        if frame is not None:
+            self.latest = frame
+
+    def _connect(self) -> bool:
+        now = time.monotonic()
+        if now < self._retry_at:
+            return False
+        try:
+            self.sock = socket.create_connection(self.address, timeout=10)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._send(encode_hello(self.host_name, self.fields))
+            self._backoff = RECONNECT_MIN_SECONDS
+            return True
+        except OSError as e:
+            print(f"Aggregator {self.address[0]}:{self.address[1]} unreachable: {e}")
+            self.close()
+            self._retry_at = now + self._backoff
+            self._backoff = min(self._backoff * 2, RECONNECT_MAX_SECONDS)
+            return False
+
+    def _send(self, message: bytes):
+        self.sock.sendall(message)
+        self.bytes_sent += len(message)
+
+    def flush(self) -> bool:
+        """Send all pending rows as one batch; keeps them queued on failure"""
+        if not self.pending:
+            return True
+        if self.sock is None and not self._connect():
+            return False
+        rows = list(self.pending)
+        try:
+            self._send(encode_batch(rows, self.latest))
+        except OSError:
+            self.close()
+            return False
+        for _ in rows:
+            self.pending.popleft()
+        return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def run_agent(server: str, host_name: str, batch_seconds: float = DEFAULT_BATCH_SECONDS):
+    """Collect on the monitor's schedule and flush a batch every batch_seconds"""
+    from system_monitor import SystemMonitor
+
+    # Only a short in-memory history is needed; the aggregator keeps the rest
+    monitor = SystemMonitor(history_size=60)
+    connection = AgentConnection(server, host_name)
+    next_flush = time.monotonic() + batch_seconds
+
+    print(f"Agent '{host_name}' sending to {server} every {batch_seconds:g} s")
+    try:
+        while True:
+            frame = monitor.collect()
+            connection.add(monitor.data_history.last_timestamp, extract_values(frame), frame)
+
+            if time.monotonic() >= next_flush:
+                connection.flush()
+                next_flush = time.monotonic() + batch_seconds
+            time.sleep(monitor.next_due())
+    except KeyboardInterrupt:
+        connection.flush()
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='System monitor agent')
+    parser.add_argument('--server', required=True, help=f'aggregator host[:port] (default port {DEFAULT_PORT})')
+    parser.add_argument('--name', default=socket.gethostname(), help='host name reported to the aggregator')
+    parser.add_argument('--batch', type=float, default=DEFAULT_BATCH_SECONDS, help='seconds between batches')
+    args = parser.parse_args()
+    run_agent(args.server, args.name, args.batch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+"""
+Alert Engine
+Threshold rules evaluated incrementally on every sample as it is collected
+
+A rule compares a value against a threshold:
+
+    {"name": "cpu_high", "metric": "cpu_percent", "op": ">", "threshold": 90,
+     "for": 60, "window": 0, "aggregate": "avg", "clear": 85, "severity": "warning"}
+
+- ``metric`` is a FIELD_NAMES column, or one of the per-entity sources in
+  ENTITY_METRICS (one alert state per disk partition / temperature sensor)
+- ``window`` (seconds) compares a sliding avg/max/min instead of the raw value
+- ``for`` (seconds) requires the condition to hold that long before firing
+- ``clear`` is the hysteresis threshold a firing alert must cross to resolve
+  (defaults to the threshold itself)
+
+Sliding windows are shared between rules on the same metric/window/aggregate
+and updated in O(1) amortised per sample (running sum, monotonic deques).
+The thresholds, pending clocks and firing flags of all column rules are
+arrays, so a sample costs one window update per distinct window plus a fixed
+number of NumPy operations across every rule; Python only runs per rule when
+it fires or resolves. bench_alerts.py, 20k samples: 50-65 us/sample for 100
+rules and 120-170 us/sample for 500 rules, most of it in the window updates.
+
+Replacing the rules keeps the state of a rule whose name, metric and op are
+unchanged; alerts still firing on removed rules are resolved.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from metrics_store import FIELD_NAMES
+
+# Per-entity sources: name -> function(frame) -> [(entity key, value, per-entity threshold or None)]
+ENTITY_METRICS: Dict[str, Callable[[Dict], List[Tuple[str, float, Optional[float]]]]] = {
+    'partition_percent': lambda frame: [
+        (p['mountpoint'], p['percent'], None) for p in frame['disk']['partitions']
+    ],
+    'temperature_high': lambda frame: [
+        (t['label'], t['current'], t.get('high')) for t in frame['temperature']['cpu'] if t.get('high')
+    ],
+}
+
+# Chart column that shows each entity source in the PDF
+ENTITY_CHART_COLUMNS = {'partition_percent': 'disk_percent', 'temperature_high': 'cpu_temp'}
+
+DEFAULT_RULES = [
+    {'name': 'cpu_high', 'metric': 'cpu_percent', 'op': '>', 'threshold': 90, 'for': 60, 'clear': 85},
+    {'name': 'memory_high', 'metric': 'memory_percent', 'op': '>', 'threshold': 90, 'for': 60, 'clear': 85},
+    {'name': 'swap_high', 'metric': 'swap_percent', 'op': '>', 'threshold': 80, 'window': 300, 'clear': 70},
+    {'name': 'disk_full', 'metric': 'partition_percent', 'op': '>', 'threshold': 95, 'clear': 93,
+     'severity': 'critical'},
+    # threshold 0 means "the sensor's own entry.high"
+    {'name': 'temperature_high', 'metric': 'temperature_high', 'op': '>', 'threshold': 0, 'for': 30,
+     'severity': 'critical'},
+]
+
+FIRING = 'firing'
+RESOLVED = 'resolved'
+
+# Events kept in memory for /api/alerts and reports
+MAX_EVENTS = 1000
+
+ALERT_LOG = 'alerts.jsonl'
+
+
+class SlidingWindow:
+    """avg/max/min of the values seen in the last `seconds`"""
+
+    __slots__ = ('seconds', 'aggregate', 'values', 'extremes', 'total')
+
+    def __init__(self, seconds: float, aggregate: str):
+        self.seconds = seconds
+        self.aggregate = aggregate
+        self.values: deque = deque()     # (timestamp, value)
+        self.extremes: deque = deque()   # monotonic (timestamp, value) for max/min
+        self.total = 0.0
+
+    def add(self, timestamp: float, value: float) -> float:
+        cutoff = timestamp - self.seconds
+        values = self.values
+        values.append((timestamp, value))
+
+        if self.aggregate == 'avg':
+            self.total += value
+            while values[0][0] <= cutoff:
+                self.total -= values.popleft()[1]
+            return self.total / len(values)
+
+        while values[0][0] <= cutoff:
+            values.popleft()
+        extremes = self.extremes
+        if self.aggregate == 'max':
+            while extremes and extremes[-1][1] <= value:
+                extremes.pop()
+        else:
+            while extremes and extremes[-1][1] >= value:
+                extremes.pop()
+        extremes.append((timestamp, value))
+        while extremes[0][0] <= cutoff:
+            extremes.popleft()
+        return extremes[0][1]
+
+
+class _State:
+    """Pending/firing state of one rule (for one entity)"""
+
+    __slots__ = ('since', 'firing', 'fired_at')
+
+    def __init__(self):
+        self.since = None
+        self.firing = False
+        self.fired_at = None
+
+
+class AlertRule:
+    """A compiled rule; see the module docstring for the fields"""
+
+    def __init__(self, spec: Dict):
+        self.name = spec['name']
+        self.metric = spec['metric']
+        if self.metric not in FIELD_NAMES and self.metric not in ENTITY_METRICS:
+            raise ValueError(f"Unknown alert metric: {self.metric}")
+        self.op = spec.get('op', '>')
+        if self.op not in ('>', '<'):
+            raise ValueError(f"Alert op must be '>' or '<': {self.op}")
+        self.threshold = float(spec['threshold'])
+        self.clear = float(spec.get('clear', self.threshold))
+        self.for_seconds = float(spec.get('for', 0))
+        self.window = float(spec.get('window', 0))
+        self.aggregate = spec.get('aggregate', 'avg')
+        if self.aggregate not in ('avg', 'max', 'min'):
+            raise ValueError(f"Alert aggregate must be avg, max or min: {self.aggregate}")
+        self.severity = spec.get('severity', 'warning')
+        self.states: Dict[Optional[str], _State] = {}
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name, 'metric': self.metric, 'op': self.op, 'threshold': self.threshold,
+            'clear': self.clear, 'for': self.for_seconds, 'window': self.window,
+            'aggregate': self.aggregate, 'severity': self.severity
+        }
+
+    def evaluate(self, timestamp: float, value: float, key: Optional[str] = None,
+                 threshold: Optional[float] = None) -> Optional[Dict]:
+        """Advance this rule's state; returns an event when it fires or resolves"""
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = _State()
+
+        limit = self.threshold if threshold is None else threshold
+        if not state.firing:
+            breached = value > limit if self.op == '>' else value < limit
+            if not breached:
+                state.since = None
+                return None
+            if state.since is None:
+                state.since = timestamp
+            if timestamp - state.since < self.for_seconds:
+                return None
+            state.firing = True
+            state.fired_at = timestamp
+            return self._event(FIRING, timestamp, value, limit, key)
+
+        # Hysteresis: stay firing until the value crosses the clear threshold
+        clear = self.clear if threshold is None else threshold - (self.threshold - self.clear)
+        cleared = value <= clear if self.op == '>' else value >= clear
+        if not cleared:
+            return None
+        state.firing = False
+        state.since = None
+        return self._event(RESOLVED, timestamp, value, limit, key, state.fired_at)
+
+    def retire(self, timestamp: float) -> List[Dict]:
+        """RESOLVED events for the firing states of a rule that is being removed"""
+        return [self._event(RESOLVED, timestamp, None, self.threshold, key, state.fired_at)
+                for key, state in self.states.items() if state.firing]
+
+    def _event(self, status: str, timestamp: float, value: Optional[float], limit: float,
+               key: Optional[str], fired_at: Optional[float] = None) -> Dict:
+        subject = f"{self.metric}[{key}]" if key is not None else self.metric
+        if value is None:
+            message = f"{self.name}: {subject} rule removed"
+        else:
+            message = f"{self.name}: {subject} {self.op} {limit:g} ({value:.1f})"
+        event = {
+            'rule': self.name,
+            'status': status,
+            'severity': self.severity,
+            'metric': self.metric,
+            'key': key,
+            'value': round(value, 3) if value is not None else None,
+            'threshold': limit,
+            'timestamp': timestamp,
+            'message': message
+        }
+        if fired_at is not None:
+            event['fired_at'] = fired_at
+        return event
+
+
+class _ColumnRules:
+    """Rules on FIELD_NAMES columns, evaluated together as arrays.
+
+    Same state machine as AlertRule.evaluate(). Each rule's _State is only
+    written when it fires or resolves; sync() copies the pending clocks
+    back before the rules are replaced.
+    """
+
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = rules
+        # One input per distinct (column, window, aggregate); rules on it share the window
+        self.inputs: List[Tuple[int, Optional[SlidingWindow]]] = []
+        slots: Dict[Tuple, int] = {}
+        input_of = []
+        for rule in rules:
+            index = FIELD_NAMES.index(rule.metric)
+            key = (index, rule.window, rule.aggregate) if rule.window > 0 else (index,)
+            if key not in slots:
+                slots[key] = len(self.inputs)
+                window = SlidingWindow(rule.window, rule.aggregate) if rule.window > 0 else None
+                self.inputs.append((index, window))
+            input_of.append(slots[key])
+        self.input_of = np.array(input_of, dtype=np.intp)
+
+        self.above = np.array([rule.op == '>' for rule in rules], dtype=bool)
+        self.threshold = np.array([rule.threshold for rule in rules], dtype=np.float64)
+        self.clear = np.array([rule.clear for rule in rules], dtype=np.float64)
+        self.for_seconds = np.array([rule.for_seconds for rule in rules], dtype=np.float64)
+        # Carried-over states keep their pending clock and firing flag
+        self.states = [rule.states.setdefault(None, _State()) for rule in rules]
+        self.since = np.array([np.nan if state.since is None else state.since for state in self.states],
+                              dtype=np.float64)
+        self.firing = np.array([state.firing for state in self.states], dtype=bool)
+
+    def evaluate(self, timestamp: float, values: List[float], events: List[Dict]):
+        if not self.rules:
+            return
+        current = np.array([window.add(timestamp, values[index]) if window is not None else values[index]
+                            for index, window in self.inputs], dtype=np.float64)
+        value = current[self.input_of]
+
+        above, firing, since = self.above, self.firing, self.since
+        breached = np.where(above, value > self.threshold, value < self.threshold)
+        # Hysteresis: a firing rule resolves once the value crosses its clear threshold
+        resolve = firing & np.where(above, value <= self.clear, value >= self.clear)
+        idle = ~firing
+        since[idle & ~breached] = np.nan
+        since[idle & breached & np.isnan(since)] = timestamp
+        fire = idle & breached & (timestamp - since >= self.for_seconds)
+        if not (fire.any() or resolve.any()):
+            return
+
+        for i in np.flatnonzero(fire | resolve):
+            rule, state = self.rules[i], self.states[i]
+            if fire[i]:
+                firing[i] = True
+                state.firing = True
+                state.since = float(since[i])
+                state.fired_at = timestamp
+                events.append(rule._event(FIRING, timestamp, float(value[i]), rule.threshold, None))
+            else:
+                firing[i] = False
+                since[i] = np.nan
+                state.firing = False
+                state.since = None
+                events.append(rule._event(RESOLVED, timestamp, float(value[i]), rule.threshold, None,
+                                          state.fired_at))
+
+    def sync(self):
+        """Copy the pending clocks into the rules' states"""
+        for state, since in zip(self.states, self.since.tolist()):
+            state.since = None if np.isnan(since) else since
+
+
+class AlertEngine:
+    """Evaluates every rule on each sample and records fire/resolve events"""
+
+    def __init__(self, rules: Optional[Iterable[Dict]] = None, directory: Optional[str] = None,
+                 on_event: Optional[Callable[[Dict], None]] = None):
+        self.directory = directory
+        self.on_event = on_event
+        self.events: deque = deque(maxlen=MAX_EVENTS)
+        self._lock = threading.Lock()
+        self.set_rules(DEFAULT_RULES if rules is None else rules)
+
+    def set_rules(self, specs: Iterable[Dict]):
+        """Replace the rules, keeping the state of unchanged ones and resolving removed ones"""
+        rules = [AlertRule(spec) for spec in specs]
+        names = set()
+        for rule in rules:
+            # Events, active() and the dashboard's alert map are keyed by rule name
+            if rule.name in names:
+                raise ValueError(f"Duplicate alert rule name: {rule.name}")
+            names.add(rule.name)
+
+        with self._lock:
+            current = {}
+            if hasattr(self, 'rules'):
+                self._columns.sync()
+                current = {rule.name: rule for rule in self.rules}
+            for rule in rules:
+                previous = current.get(rule.name)
+                if previous is not None and (previous.metric, previous.op) == (rule.metric, rule.op):
+                    rule.states = previous.states
+                    del current[rule.name]
+            resolved = [event for rule in current.values() for event in rule.retire(time.time())]
+
+            self.rules = rules
+            self._columns = _ColumnRules([rule for rule in rules if rule.metric not in ENTITY_METRICS])
+            self._entity_rules = [rule for rule in rules if rule.metric in ENTITY_METRICS]
+            self.events.extend(resolved)
+
+        for event in resolved:
+            self._record(event)
+
+    def load_rules(self, path: str):
+        """Replace the rules with a JSON list from a file"""
+        with open(path) as f:
+            self.set_rules(json.load(f))
+
+    def evaluate(self, timestamp: float, values: List[float], frame: Optional[Dict] = None) -> List[Dict]:
+        """Feed one sample (values ordered as FIELD_NAMES); returns the new events"""
+        events = []
+        with self._lock:
+            self._columns.evaluate(timestamp, values, events)
+
+            if frame is not None:
+                for rule in self._entity_rules:
+                    try:
+                        entities = ENTITY_METRICS[rule.metric](frame)
+                    except (KeyError, TypeError):
+                        continue
+                    for key, value, own_threshold in entities:
+                        threshold = own_threshold if rule.threshold == 0 and own_threshold else None
+                        event = rule.evaluate(timestamp, value, key, threshold)
+                        if event:
+                            events.append(event)
+
+            self.events.extend(events)
+
+        for event in events:
+            self._record(event)
+        return events
+
+    def _record(self, event: Dict):
+        print(f"[alert] {event['status']} {event['severity']}: {event['message']}")
+        if self.directory:
+            with open(os.path.join(self.directory, ALERT_LOG), 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        if self.on_event:
+            self.on_event(event)
+
+    def active(self) -> List[Dict]:
+        """Currently firing alerts"""
+        with self._lock:
+            result = []
+            for rule in self.rules:
+                for key, state in rule.states.items():
+                    if state.firing:
+                        result.append({'rule': rule.name, 'metric': rule.metric, 'key': key,
+                                       'severity': rule.severity, 'since': state.fired_at})
+            return result
+
+    def events_in(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        with self._lock:
+            return [e for e in self.events
+                    if (start is None or e['timestamp'] >= start) and (end is None or e['timestamp'] <= end)]
+
+    def intervals(self, start: float, end: float) -> Dict[str, List[Tuple[float, float, str]]]:
+        """Firing intervals overlapping [start, end] per chart column: {column: [(from, to, rule)]}"""
+        with self._lock:
+            events = list(self.events)
+            active = {(rule.name, key): state.fired_at
+                      for rule in self.rules for key, state in rule.states.items() if state.firing}
+
+        spans: Dict[str, List[Tuple[float, float, str]]] = {}
+        for event in events:
+            if event['status'] != RESOLVED or event['timestamp'] < start or event['fired_at'] > end:
+                continue
+            column = ENTITY_CHART_COLUMNS.get(event['metric'], event['metric'])
+            spans.setdefault(column, []).append((max(event['fired_at'], start), min(event['timestamp'], end),
+                                                 event['rule']))
+
+        metrics = {rule.name: rule.metric for rule in self.rules}
+        for (name, _), fired_at in active.items():
+            if fired_at is None or fired_at > end or name not in metrics:
+                continue
+            column = ENTITY_CHART_COLUMNS.get(metrics[name], metrics[name])
+            spans.setdefault(column, []).append((max(fired_at, start), end, name))
+        return spans
+
+    def summary(self) -> Dict:
+        return {
+            'rules': [rule.to_dict() for rule in self.rules],
+            'active': self.active(),
+            'events': list(self.events)[-100:],
+            'checked_at': time.time()
+        }
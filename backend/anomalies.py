@@ -0,0 +1,311 @@
+"""
+Anomaly Detection
+Scores every sample of the CPU, memory, disk and network rate columns against
+their recent and usual behaviour
+
+Three detectors run side by side, each vectorised across the scored columns,
+so a sample costs a fixed number of NumPy operations whatever the window:
+
+- zscore: distance from the mean of the last ``window`` samples in standard
+  deviations. Running sums over a ring buffer are re-summed once per lap, so
+  float error cannot build up (O(1) amortised).
+- seasonal: distance from the mean and deviation of the same time-of-day slot
+  on previous days, for load that follows a daily cycle.
+- cusum: two-sided CUSUM of the z-score. It catches level shifts that are
+  too small for a single sample to stand out.
+
+Scores are normalised so that 1.0 is the detector's limit. A column is
+flagged while its highest score is at or above 1 and cleared once that
+score falls below CLEAR_SCORE. Each flagged interval is recorded with its peak
+score and the detector that reached it.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from alerts import FIRING, RESOLVED
+from metrics_store import FIELD_NAMES
+
+# Scored columns and the smallest standard deviation assumed for each (so an
+# idle, perfectly flat series does not flag on its first small change)
+ANOMALY_COLUMNS = {
+    'cpu_percent': 2.0,
+    'memory_percent': 0.5,
+    'disk_read_kbps': 50.0,
+    'disk_write_kbps': 50.0,
+    'net_upload_kbps': 10.0,
+    'net_download_kbps': 10.0,
+}
+
+DETECTORS = ['zscore', 'seasonal', 'cusum']
+
+# Rolling window (samples; 5 minutes at the 0.5 s tick) and the samples needed before scoring
+ANOMALY_WINDOW = 600
+MIN_SAMPLES = 60
+
+# z-score limit, the CUSUM slack (k) and decision limit (h), and the clear level
+Z_LIMIT = 5.0
+CUSUM_SLACK = 0.5
+CUSUM_LIMIT = 12.0
+CLEAR_SCORE = 0.6
+
+# Time-of-day slots for the seasonal baseline, and the weight of the newest day
+SEASONAL_SLOTS = 96
+SEASONAL_DAY_WEIGHT = 0.3
+
+# Intervals and events kept in memory for /api/anomalies and reports
+MAX_INTERVALS = 1000
+MAX_EVENTS = 1000
+
+ANOMALY_LOG = 'anomalies.jsonl'
+
+_DAY = 86400.0
+
+
+class AnomalyDetector:
+    """Scores each sample with every detector and records flagged intervals"""
+
+    def __init__(self, columns: Optional[Dict[str, float]] = None, window: int = ANOMALY_WINDOW,
+                 directory: Optional[str] = None, on_event: Optional[Callable[[Dict], None]] = None):
+        columns = ANOMALY_COLUMNS if columns is None else columns
+        self.columns = list(columns)
+        self.window = window
+        self.directory = directory
+        self.on_event = on_event
+        self._indices = [FIELD_NAMES.index(name) for name in self.columns]
+        self._floor = np.array([columns[name] for name in self.columns], dtype=float)
+        # Scores divide by these so that 1.0 is each detector's limit
+        self._limits = np.array([[Z_LIMIT], [Z_LIMIT], [CUSUM_LIMIT]])
+
+        n = len(self.columns)
+        self._zeros = np.zeros(n)
+        self._zeros.flags.writeable = False
+        self._arange = np.arange(n)
+        # Rolling window: ring of the last `window` samples with running sums
+        self._ring = np.zeros((window, n))
+        self._position = 0
+        self._count = 0
+        self._sum = np.zeros(n)
+        self._sum_squares = np.zeros(n)
+        # CUSUM of the z-score upwards (row 0) and downwards (row 1)
+        self._cusum = np.zeros((2, n))
+
+        # Seasonal baseline per slot, and the sums of the slot in progress
+        self._slot_seconds = _DAY / SEASONAL_SLOTS
+        self._slot_mean = np.zeros((SEASONAL_SLOTS, n))
+        self._slot_std = np.zeros((SEASONAL_SLOTS, n))
+        self._slot_days = np.zeros(SEASONAL_SLOTS, dtype=int)
+        self._slot = None
+        self._slot_count = 0
+        self._slot_sum = np.zeros(n)
+        self._slot_sum_squares = np.zeros(n)
+
+        # Open intervals: flag, start time, peak score and the detector at the peak
+        self._flagged = np.zeros(n, dtype=bool)
+        self._started = np.zeros(n)
+        self._peak = np.zeros(n)
+        self._peak_detector = np.zeros(n, dtype=int)
+
+        self.latest: Optional[Tuple[float, np.ndarray, np.ndarray]] = None
+        self.closed: deque = deque(maxlen=MAX_INTERVALS)
+        self.events: deque = deque(maxlen=MAX_EVENTS)
+        self._lock = threading.Lock()
+
+    def evaluate(self, timestamp: float, values: List[float], frame: Optional[Dict] = None) -> List[Dict]:
+        """Score one sample (values ordered as FIELD_NAMES); returns the new events"""
+        x = np.array([values[i] for i in self._indices], dtype=float)
+        with self._lock:
+            scores = np.empty((3, len(self.columns)))
+            scores[0] = np.abs(self._zscore(x))
+            scores[1] = np.abs(self._seasonal(timestamp, x))
+            scores[2] = self._cusum.max(axis=0)
+            scores /= self._limits
+            detector = scores.argmax(axis=0)
+            score = scores[detector, self._arange]
+            self.latest = (timestamp, score, scores)
+            events = self._update_intervals(timestamp, x, score, detector)
+            self.events.extend(events)
+
+        for event in events:
+            self._record(event)
+        return events
+
+    def _zscore(self, x: np.ndarray) -> np.ndarray:
+        """z-score of x against the window (before x joins it); advances the CUSUM"""
+        count = self._count
+        if count >= MIN_SAMPLES:
+            mean = self._sum / count
+            std = np.sqrt(np.maximum(self._sum_squares / count - mean * mean, 0.0))
+            z = (x - mean) / np.maximum(std, self._floor)
+            # Clipped so one spike (the z-score's job) cannot push the CUSUM over on its own
+            step = np.minimum(np.maximum(z, -Z_LIMIT), Z_LIMIT)
+            cusum = self._cusum
+            np.maximum(cusum[0] + step - CUSUM_SLACK, 0.0, out=cusum[0])
+            np.maximum(cusum[1] - step - CUSUM_SLACK, 0.0, out=cusum[1])
+            # Capped, so a shift the window has absorbed clears within 2h/k samples
+            np.minimum(cusum, 2 * CUSUM_LIMIT, out=cusum)
+        else:
+            z = self._zeros
+
+        ring = self._ring
+        position = self._position
+        if count == self.window:
+            old = ring[position]
+            self._sum -= old
+            self._sum_squares -= old * old
+        else:
+            self._count = count + 1
+        ring[position] = x
+        self._sum += x
+        self._sum_squares += x * x
+        position += 1
+        if position == self.window:
+            # Once per lap: re-sum so the running sums do not drift
+            position = 0
+            self._sum = ring.sum(axis=0)
+            self._sum_squares = np.einsum('ij,ij->j', ring, ring)
+        self._position = position
+        return z
+
+    def _seasonal(self, timestamp: float, x: np.ndarray) -> np.ndarray:
+        """Deviation of x from its time-of-day slot on previous days"""
+        slot = int(timestamp % _DAY // self._slot_seconds)
+        if slot != self._slot:
+            self._close_slot()
+            self._slot = slot
+        self._slot_count += 1
+        self._slot_sum += x
+        self._slot_sum_squares += x * x
+
+        if not self._slot_days[slot]:
+            return self._zeros
+        return (x - self._slot_mean[slot]) / np.maximum(self._slot_std[slot], self._floor)
+
+    def _close_slot(self):
+        """Fold the finished slot's samples into its baseline"""
+        count = self._slot_count
+        if count >= MIN_SAMPLES:
+            slot = self._slot
+            mean = self._slot_sum / count
+            std = np.sqrt(np.maximum(self._slot_sum_squares / count - mean * mean, 0.0))
+            if self._slot_days[slot]:
+                weight = SEASONAL_DAY_WEIGHT
+                mean = weight * mean + (1 - weight) * self._slot_mean[slot]
+                std = weight * std + (1 - weight) * self._slot_std[slot]
+            self._slot_mean[slot] = mean
+            self._slot_std[slot] = std
+            self._slot_days[slot] += 1
+        self._slot_count = 0
+        self._slot_sum[:] = 0.0
+        self._slot_sum_squares[:] = 0.0
+
+    def _update_intervals(self, timestamp: float, x: np.ndarray, score: np.ndarray,
+                          detector: np.ndarray) -> List[Dict]:
+        flagged = self._flagged
+        raised = score >= 1.0
+        if not (raised | flagged).any():
+            return []
+
+        events = []
+        higher = flagged & (score > self._peak)
+        self._peak[higher] = score[higher]
+        self._peak_detector[higher] = detector[higher]
+
+        for i in np.flatnonzero(raised & ~flagged):
+            flagged[i] = True
+            self._started[i] = timestamp
+            self._peak[i] = score[i]
+            self._peak_detector[i] = detector[i]
+            events.append(self._event(FIRING, timestamp, i, x[i], score[i], DETECTORS[detector[i]]))
+
+        for i in np.flatnonzero(flagged & (score < CLEAR_SCORE)):
+            flagged[i] = False
+            interval = self._interval(i, timestamp)
+            self.closed.append(interval)
+            event = self._event(RESOLVED, timestamp, i, x[i], interval['peak'], interval['detector'])
+            event['started_at'] = interval['start']
+            events.append(event)
+        return events
+
+    def _interval(self, i: int, end: float) -> Dict:
+        return {'metric': self.columns[i], 'start': float(self._started[i]), 'end': end,
+                'peak': round(float(self._peak[i]), 2), 'detector': DETECTORS[self._peak_detector[i]]}
+
+    def _event(self, status: str, timestamp: float, i: int, value: float, score: float, detector: str) -> Dict:
+        metric = self.columns[i]
+        # Same shape as alert events, so dashboards can show both in one list
+        return {
+            'rule': 'anomaly',
+            'status': status,
+            'severity': 'anomaly',
+            'metric': metric,
+            'key': metric,
+            'value': round(float(value), 3),
+            'score': round(float(score), 2),
+            'detector': detector,
+            'timestamp': timestamp,
+            'message': f"anomaly: {metric} ({detector}, {float(score):.1f}x limit, value {float(value):.1f})"
+        }
+
+    def _record(self, event: Dict):
+        print(f"[anomaly] {event['status']}: {event['message']}")
+        if self.directory:
+            with open(os.path.join(self.directory, ANOMALY_LOG), 'a') as f:
+                f.write(json.dumps(event) + '\n')
+        if self.on_event:
+            self.on_event(event)
+
+    def scores(self) -> Optional[Dict]:
+        """Latest scores per column (1.0 = limit) and the flagged columns"""
+        with self._lock:
+            if self.latest is None:
+                return None
+            timestamp, score, scores = self.latest
+            return {
+                'timestamp': timestamp,
+                'scores': {name: round(float(s), 2) for name, s in zip(self.columns, score)},
+                'detectors': {name: dict(zip(DETECTORS, np.round(scores[:, i], 2).tolist()))
+                              for i, name in enumerate(self.columns)},
+                'flagged': [name for name, f in zip(self.columns, self._flagged) if f]
+            }
+
+    def intervals(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Flagged intervals overlapping [start, end], including ones still open (ending at `end`)"""
+        with self._lock:
+            result = [dict(interval) for interval in self.closed
+                      if (start is None or interval['end'] >= start) and (end is None or interval['start'] <= end)]
+            now = self.latest[0] if self.latest else time.time()
+            for i in np.flatnonzero(self._flagged):
+                if end is None or self._started[i] <= end:
+                    result.append(dict(self._interval(i, now if end is None else min(now, end)), open=True))
+        return result
+
+    def summary(self) -> Dict:
+        return {
+            'columns': self.columns,
+            'detectors': DETECTORS,
+            'window': self.window,
+            'latest': self.scores(),
+            'intervals': self.intervals()[-100:],
+            'checked_at': time.time()
+        }
+
+
+def summarize_intervals(intervals: Iterable[Dict]) -> Dict[str, Dict]:
+    """Per-column count, flagged seconds and peak score of a list of intervals"""
+    summary: Dict[str, Dict] = {}
+    for interval in intervals:
+        entry = summary.setdefault(interval['metric'], {'count': 0, 'seconds': 0.0, 'peak': 0.0,
+                                                        'detector': interval['detector']})
+        entry['count'] += 1
+        entry['seconds'] += interval['end'] - interval['start']
+        if interval['peak'] >= entry['peak']:
+            entry['peak'] = interval['peak']
+            entry['detector'] = interval['detector']
+    return summary
@@ -3,35 +3,266 @@ Flask Backend Server
 Provides real-time system monitoring via WebSocket and PDF generation
 """
 
-from flask import Flask, send_file, jsonify
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, send_file, jsonify, request
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
 import threading
 import time
 import os
-from system_monitor import SystemMonitor
-from pdf_generator import PDFGenerator
+from simulation import FrameRecorder, SimulatedHosts, create_monitor
+from frame_delta import DeltaEncoder
+from backfill import BackfillCache
+from frame_codec import PackedEncoder, PACKED_FIELDS, PACKED_TABLES
+from report_jobs import ReportJobManager, DONE
+from downsample import downsample
+from export import EXPORT_FORMATS, concat_blocks, export_stream, history_blocks
+from metrics_store import FIELD_NAMES
+from fleet import FleetAggregator
+from alerts import AlertEngine
+from anomalies import AnomalyDetector
+from instrumentation import REGISTRY, EMIT_SECONDS, TICK_SECONDS, TickProfiler
+from collection_worker import CollectionWorker
+from io import BytesIO
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'system-monitor-secret-key'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
-
-# Global instances
-monitor = SystemMonitor()
-pdf_gen = PDFGenerator()
+# Threading mode: frames, report notifications and fleet updates are emitted from
+# plain OS threads, which an un-monkey-patched eventlet hub never flushes
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+
+# Samples are persisted here and survive restarts
+DATA_DIR = os.environ.get('METRICS_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Global instances; MONITOR_SIMULATE / MONITOR_REPLAY swap in synthetic or recorded samples
+monitor, simulation = create_monitor(DATA_DIR)
+if simulation:
+    # Keep simulated alerts, anomalies and fleet hosts out of the machine's own data
+    DATA_DIR = simulation['data_dir']
+# MONITOR_RECORD appends every frame to a recording MONITOR_REPLAY can play back
+recorder = FrameRecorder(os.environ['MONITOR_RECORD']) if os.environ.get('MONITOR_RECORD') else None
+if recorder:
+    monitor.add_listener(recorder)
+pdf_gen = None
+pdf_gen_lock = threading.Lock()
 monitoring_active = False
 monitoring_thread = None
 
+# Point budget for /api/history responses
+HISTORY_DEFAULT_POINTS = 500
+HISTORY_MAX_POINTS = 5000
+
+
+def get_pdf_generator():
+    """The PDF stack (matplotlib, reportlab) is imported on the first report, not at startup"""
+    global pdf_gen
+    with pdf_gen_lock:
+        if pdf_gen is None:
+            from pdf_generator import PDFGenerator
+            pdf_gen = PDFGenerator()
+        return pdf_gen
+
+
+def notify_report_complete(job):
+    """Push report completion to dashboards"""
+    socketio.emit('report_status', job.to_dict(), namespace='/')
+
+
+def notify_alert(event):
+    """Push alert fire/resolve events to every connected dashboard"""
+    socketio.emit('alert', event, namespace='/')
+
+
+# Threshold alerts evaluated on every sample; ALERT_RULES_FILE replaces the default rules
+alert_engine = AlertEngine(directory=DATA_DIR, on_event=notify_alert)
+if os.environ.get('ALERT_RULES_FILE'):
+    alert_engine.load_rules(os.environ['ALERT_RULES_FILE'])
+monitor.add_listener(alert_engine.evaluate)
+
+
+def notify_anomaly(event):
+    """Push anomaly start/end events to every connected dashboard"""
+    socketio.emit('anomaly', event, namespace='/')
+
+
+# Anomaly scores of the CPU, memory, disk and network rates, computed on every sample
+anomaly_detector = AnomalyDetector(directory=DATA_DIR, on_event=notify_anomaly)
+monitor.add_listener(anomaly_detector.evaluate)
+
+report_jobs = ReportJobManager(get_pdf_generator, on_complete=notify_report_complete, rollups=monitor.rollups,
+                               alerts=alert_engine, anomalies=anomaly_detector)
+
+# Fleet mode: set FLEET_PORT to accept samples from remote agents (agent.py)
+FLEET_PORT = os.environ.get('FLEET_PORT')
+FLEET_ROOM = 'fleet'
+
+
+def host_room(name):
+    return f'host:{name}'
+
+
+def notify_host_batch(host):
+    """Fan a host's newest frame out to its subscribers and a summary to the fleet view"""
+    socketio.emit('host_data', {'host': host.name, 'data': host.store.latest},
+                  namespace='/', to=host_room(host.name))
+    socketio.emit('fleet_update', host.summary(), namespace='/', to=FLEET_ROOM)
+
+
+fleet = None
+if FLEET_PORT:
+    fleet = FleetAggregator(port=int(FLEET_PORT), data_dir=DATA_DIR, on_batch=notify_host_batch)
+
+# Simulation with hosts=N: the local monitor plus N-1 synthetic fleet hosts
+simulated_hosts = None
+if simulation and simulation['hosts'] > 1:
+    if fleet is None:
+        fleet = FleetAggregator(data_dir=DATA_DIR, on_batch=notify_host_batch)
+    simulated_hosts = SimulatedHosts(fleet, simulation['hosts'] - 1, monitor, simulation['speed'],
+                                     simulation['seed'])
+
+# Socket.IO rooms per protocol mode: full frames (default), snapshot + deltas,
+# or packed binary scalars + structure on change
+FULL_ROOM = 'protocol_full'
+DELTA_ROOM = 'protocol_delta'
+PACKED_ROOM = 'protocol_packed'
+PROTOCOL_ROOMS = {'full': FULL_ROOM, 'delta': DELTA_ROOM, 'packed': PACKED_ROOM}
+# Every subscriber, whatever its protocol, receives the per-tick anomaly scores
+ANOMALY_ROOM = 'anomaly_scores'
+delta_encoder = DeltaEncoder()
+packed_encoder = PackedEncoder()
+
+# Chart history sent to dashboards as they connect, encoded once per sample
+backfill_cache = BackfillCache(monitor.get_history())
+
+
+tick_profiler = TickProfiler()
+
+REGISTRY.gauge('monitor_active', 'Whether background monitoring is running', lambda: monitoring_active)
+REGISTRY.gauge('monitor_history_samples', 'Samples held in the in-memory history', lambda: len(monitor.get_history()))
+REGISTRY.gauge('monitor_history_bytes', 'Bytes allocated by the in-memory history',
+               lambda: monitor.get_history().memory_usage()['allocated_bytes'])
+REGISTRY.gauge('monitor_disk_store_bytes', 'Bytes of segment files on disk',
+               lambda: monitor.disk_store.disk_usage()['bytes'])
+REGISTRY.gauge('monitor_subscribers', 'Dashboards subscribed to the shared stream', lambda: len(subscriptions))
+REGISTRY.gauge('monitor_report_jobs', 'Report jobs retained in memory', lambda: len(report_jobs.jobs))
+REGISTRY.gauge('monitor_backfill_encodes', 'Chart backfills encoded (shared by every client of that sample)',
+               lambda: backfill_cache.encodes)
+
+
+# Metric group rooms: clients in 'groups' mode receive only the sections they
+# display, and only on ticks where one of the group's collectors ran
+METRIC_GROUPS = {
+    'cpu': ('cpu',),
+    'memory': ('memory',),
+    'disk': ('disk_partitions', 'disk_io'),
+    'network': ('network_io', 'interfaces'),
+    'temperature': ('temperature',),
+    'processes': ('processes',),
+}
+
+# Dashboards that called start_monitoring: sid -> {'mode': ..., 'groups': [...]}.
+# The shared collection loop runs while at least one is subscribed.
+subscriptions = {}
+client_protocols = {}
+subscriptions_lock = threading.Lock()
+
+
+def group_room(group):
+    return f'group:{group}'
+
+
+def room_has_members(room):
+    return next(socketio.server.manager.get_participants('/', room), None) is not None
+
+
+def monitoring_tick(data, updated):
+    """Push one collected frame to the rooms that have subscribers"""
+    updated = set(updated)
+
+    # Encoders only advance when someone listens; a later resync still matches their state
+    if room_has_members(FULL_ROOM):
+        with EMIT_SECONDS.time('system_data'):
+            socketio.emit('system_data', data, namespace='/', to=FULL_ROOM)
+    if room_has_members(DELTA_ROOM):
+        with EMIT_SECONDS.time('system_delta'):
+            delta = delta_encoder.encode(data)
+            socketio.emit('system_delta', delta, namespace='/', to=DELTA_ROOM)
+    if room_has_members(PACKED_ROOM):
+        with EMIT_SECONDS.time('system_packed'):
+            packed, structure, details = packed_encoder.encode(data)
+            if structure is not None:
+                socketio.emit('system_structure', structure, namespace='/', to=PACKED_ROOM)
+            if details is not None:
+                socketio.emit('system_details', details, namespace='/', to=PACKED_ROOM)
+            socketio.emit('system_packed', packed, namespace='/', to=PACKED_ROOM)
+
+    for group, collectors in METRIC_GROUPS.items():
+        room = group_room(group)
+        if updated.intersection(collectors) and room_has_members(room):
+            with EMIT_SECONDS.time('system_group'):
+                socketio.emit('system_group', {'group': group, 'timestamp': data['timestamp'],
+                                               'data': data[group]}, namespace='/', to=room)
+
+    if room_has_members(ANOMALY_ROOM):
+        scores = anomaly_detector.scores()
+        if scores:
+            with EMIT_SECONDS.time('anomaly_scores'):
+                socketio.emit('anomaly_scores', scores, namespace='/', to=ANOMALY_ROOM)
+
 
 def background_monitoring():
-    """Background thread for collecting system data"""
+    """Shared emit loop fed by the collection worker; exits once the last subscriber stops"""
+    global monitoring_thread
+
+    # Each collector runs on its own period (see COLLECTOR_PERIODS) on the worker's thread
+    worker = CollectionWorker(monitor, tick_profiler)
+    worker.start()
+    while True:
+        with subscriptions_lock:
+            active = monitoring_active
+        if not active:
+            worker.stop()
+            with subscriptions_lock:
+                if not monitoring_active:
+                    # Cleared under the lock so a new subscriber starts a fresh loop
+                    monitoring_thread = None
+                    return
+            # Someone subscribed while the worker was stopping
+            worker.start()
+
+        item = worker.get(timeout=0.5)
+        if item is not None:
+            with TICK_SECONDS.time():
+                monitoring_tick(*item)
+
+
+def stream_rooms(sid):
+    """Rooms that carry the stream in the client's chosen protocol"""
+    mode, groups = client_protocols.get(sid, ('full', None))
+    if mode == 'groups':
+        return [group_room(group) for group in groups]
+    return [PROTOCOL_ROOMS[mode]]
+
+
+def leave_stream_rooms(sid):
+    for room in list(PROTOCOL_ROOMS.values()) + [group_room(group) for group in METRIC_GROUPS]:
+        leave_room(room, sid=sid)
+
+
+def unsubscribe(sid):
+    """Drop a subscription; returns the number of remaining subscribers"""
     global monitoring_active
 
-    while monitoring_active:
-        data = monitor.get_all_info()
-        socketio.emit('system_data', data, namespace='/')
-        time.sleep(10)  # Collect data every 10 seconds
+    with subscriptions_lock:
+        subscriptions.pop(sid, None)
+        remaining = len(subscriptions)
+        if remaining == 0 and monitoring_active:
+            monitoring_active = False
+            print('Monitoring stopped (no subscribers)')
+    leave_stream_rooms(sid)
+    leave_room(ANOMALY_ROOM, sid=sid)
+    return remaining
 
 
 @socketio.on('connect')
@@ -41,66 +272,171 @@ def handle_connect():
     emit('connection_response', {'status': 'connected'})
 
 
+def emit_backfill():
+    """Send the cached chart backfill so the dashboard does not start empty"""
+    if monitor.get_history():
+        emit('system_backfill', backfill_cache.get())
+
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection"""
+    unsubscribe(request.sid)
+    client_protocols.pop(request.sid, None)
     print('Client disconnected')
 
 
+@socketio.on('set_protocol')
+def handle_set_protocol(data):
+    """Switch the client between full, delta, packed and per-group protocols"""
+    data = data or {}
+    mode = data.get('mode', 'full')
+    groups = None
+    if mode == 'groups':
+        groups = [g for g in data.get('groups') or METRIC_GROUPS if g in METRIC_GROUPS]
+    elif mode not in PROTOCOL_ROOMS:
+        mode = 'full'
+    client_protocols[request.sid] = (mode, groups)
+
+    subscribed = request.sid in subscriptions
+    if subscribed:
+        leave_stream_rooms(request.sid)
+        for room in stream_rooms(request.sid):
+            join_room(room)
+
+    status = {'mode': mode}
+    if mode == 'packed':
+        status['schema'] = PACKED_FIELDS
+        status['tables'] = PACKED_TABLES
+    if mode == 'groups':
+        status['groups'] = groups
+    emit('protocol_status', status)
+
+    # A client that is not subscribed yet gets its snapshot (and backfill) from start_monitoring
+    if subscribed:
+        handle_resync(mode)
+
+
+@socketio.on('resync')
+def handle_resync(mode='delta'):
+    """Send the latest state so a delta/packed/group client can rebuild its frame"""
+    if mode == 'packed':
+        snapshot = packed_encoder.snapshot()
+        if snapshot:
+            packed, structure, details = snapshot
+            emit('system_structure', structure)
+            emit('system_details', details)
+            emit('system_packed', packed)
+    elif mode == 'delta':
+        snapshot = delta_encoder.snapshot()
+        if snapshot:
+            emit('system_snapshot', snapshot)
+    elif mode == 'groups':
+        latest = monitor.get_history().latest
+        _, groups = client_protocols.get(request.sid, ('groups', None))
+        if latest:
+            for group in groups or METRIC_GROUPS:
+                emit('system_group', {'group': group, 'timestamp': latest['timestamp'], 'data': latest[group]})
+
+
+@socketio.on('subscribe_host')
+def handle_subscribe_host(data):
+    """Receive host_data frames of one fleet host, or fleet_update summaries with host='*'"""
+    name = (data or {}).get('host')
+    if fleet is None or not name:
+        emit('host_status', {'error': 'Fleet mode is not enabled' if fleet is None else 'host is required'})
+        return
+
+    if name == '*':
+        join_room(FLEET_ROOM)
+        emit('host_status', {'host': '*', 'hosts': fleet.list_hosts()})
+        return
+
+    join_room(host_room(name))
+    host = fleet.get(name)
+    emit('host_status', {'host': name, 'known': host is not None})
+    if host and host.store.latest:
+        emit('host_data', {'host': name, 'data': host.store.latest})
+
+
+@socketio.on('unsubscribe_host')
+def handle_unsubscribe_host(data):
+    name = (data or {}).get('host')
+    if name:
+        leave_room(FLEET_ROOM if name == '*' else host_room(name))
+
+
 @socketio.on('start_monitoring')
 def handle_start_monitoring():
-    """Start monitoring system resources"""
+    """Subscribe this client to the shared stream, starting the collector if needed"""
     global monitoring_active, monitoring_thread
 
-    if not monitoring_active:
+    sid = request.sid
+    with subscriptions_lock:
+        already = sid in subscriptions
+        subscriptions[sid] = client_protocols.get(sid, ('full', None))
+        count = len(subscriptions)
+        started = not monitoring_active
         monitoring_active = True
-        monitor.clear_history()
-
-        monitoring_thread = threading.Thread(target=background_monitoring)
-        monitoring_thread.daemon = True
-        monitoring_thread.start()
-
-        emit('monitoring_status', {'status': 'started', 'message': 'Monitoring started'})
+        if monitoring_thread is None:
+            monitoring_thread = threading.Thread(target=background_monitoring)
+            monitoring_thread.daemon = True
+            monitoring_thread.start()
+
+    for room in stream_rooms(sid):
+        join_room(room)
+    join_room(ANOMALY_ROOM)
+
+    if already:
+        emit('monitoring_status', {'status': 'already_running', 'message': 'Monitoring already running',
+                                   'subscribers': count})
+        return
+
+    emit('monitoring_status', {'status': 'started', 'message': 'Monitoring started', 'subscribers': count})
+    emit_backfill()
+    handle_resync(client_protocols.get(sid, ('full', None))[0])
+    if started:
         print('Monitoring started')
-    else:
-        emit('monitoring_status', {'status': 'already_running', 'message': 'Monitoring already running'})
 
 
 @socketio.on('stop_monitoring')
 def handle_stop_monitoring():
-    """Stop monitoring system resources"""
-    global monitoring_active
-
-    if monitoring_active:
-        monitoring_active = False
-        emit('monitoring_status', {'status': 'stopped', 'message': 'Monitoring stopped'})
-        print('Monitoring stopped')
-    else:
+    """Unsubscribe this client; the collector stops with the last subscriber"""
+    if request.sid not in subscriptions:
         emit('monitoring_status', {'status': 'already_stopped', 'message': 'Monitoring not running'})
+        return
+
+    remaining = unsubscribe(request.sid)
+    emit('monitoring_status', {'status': 'stopped', 'message': 'Monitoring stopped', 'subscribers': remaining})
 
 
 @socketio.on('get_current_data')
-def handle_get_current_data():
-    """Get current system data on demand"""
-    data = monitor.get_all_info()
-    emit('system_data', data)
+def handle_get_current_data(data=None):
+    """Latest cached frame (optionally only some groups); samples once if nothing is cached"""
+    frame = monitor.get_history().latest or monitor.get_all_info()
+    groups = (data or {}).get('groups')
+    if groups:
+        frame = {key: frame[key] for key in ['timestamp'] + [g for g in groups if g in METRIC_GROUPS]}
+    emit('system_data', frame)
 
 
 @app.route('/api/generate_pdf', methods=['POST'])
 def generate_pdf():
-    """Generate PDF report from collected data"""
+    """Generate PDF report from collected data (synchronous, kept for older clients)"""
     try:
-        data_history = monitor.get_history()
+        history = monitor.get_history()
 
-        if not data_history:
+        if not history:
             return jsonify({'error': 'No data available. Start monitoring first.'}), 400
 
-        # Generate PDF
-        pdf_path = os.path.join(os.path.dirname(__file__), 'system_report.pdf')
-        pdf_gen.generate_report(data_history, pdf_path)
+        # Generate PDF into memory so concurrent requests cannot clobber each other
+        pdf_buffer = BytesIO()
+        get_pdf_generator().generate_report(history.copy(), pdf_buffer, rollups=monitor.rollups, alerts=alert_engine,
+                                             anomalies=anomaly_detector)
+        pdf_buffer.seek(0)
 
         return send_file(
-            pdf_path,
+            pdf_buffer,
             mimetype='application/pdf',
             as_attachment=True,
             download_name=f'system_report_{int(time.time())}.pdf'
@@ -110,15 +446,284 @@ def generate_pdf():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/reports', methods=['POST'])
+def create_report():
+    """Queue a PDF report job over the current history or an optional from/to range.
+
+    In fleet mode ``host`` selects a remote host, or ``*`` for a fleet report.
+    ``appendix`` adds tables of the samples to the report.
+    """
+    body = request.get_json(silent=True) or {}
+    appendix = bool(body.get('appendix'))
+    start = end = None
+    if body.get('from') is not None or body.get('to') is not None:
+        try:
+            start = float(body['from']) if body.get('from') is not None else None
+            end = float(body['to']) if body.get('to') is not None else None
+        except (TypeError, ValueError):
+            return jsonify({'error': 'from/to must be epoch seconds'}), 400
+
+    name = body.get('host')
+    if name:
+        if fleet is None:
+            return jsonify({'error': 'Fleet mode is not enabled'}), 400
+        if name == '*':
+            hosts = {host.name: host.history(start, end) for host in list(fleet.hosts.values())}
+            if not hosts:
+                return jsonify({'error': 'No agents have reported yet'}), 400
+            return jsonify(report_jobs.submit_fleet(hosts).to_dict()), 202
+        host = fleet.get(name)
+        if host is None:
+            return jsonify({'error': f'Unknown host: {name}'}), 404
+        history = host.history(start, end)
+        if not history:
+            return jsonify({'error': 'No data available for this host.'}), 400
+        return jsonify(report_jobs.submit(history, rollups=host.rollups, host=name,
+                                           appendix=appendix).to_dict()), 202
+
+    if start is not None or end is not None:
+        history = monitor.get_range(start, end)
+    else:
+        history = monitor.get_history()
+
+    if not history:
+        return jsonify({'error': 'No data available. Start monitoring first.'}), 400
+
+    job = report_jobs.submit(history, appendix=appendix)
+    return jsonify(job.to_dict()), 202
+
+
+@app.route('/api/reports/<job_id>', methods=['GET'])
+def get_report(job_id):
+    """Get report job status"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/reports/<job_id>/download', methods=['GET'])
+def download_report(job_id):
+    """Stream a finished report"""
+    job = report_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown report job'}), 404
+    if job.status != DONE:
+        return jsonify(job.to_dict()), 409
+
+    return send_file(
+        BytesIO(job.data),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job.filename
+    )
+
+
+def range_args():
+    """from/to/metrics/step query arguments shared by history and export"""
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    step = request.args.get('step', type=float)
+    metrics = [m for m in request.args.get('metrics', '').split(',') if m] or FIELD_NAMES
+
+    unknown = [m for m in metrics if m not in FIELD_NAMES]
+    if unknown:
+        raise ValueError(f"Unknown metrics: {', '.join(unknown)}")
+    if step is not None and step <= 0:
+        raise ValueError('step must be positive')
+    return start, end, metrics, step
+
+
+def history_response(get_range):
+    """/api/history body for a range source (local monitor or a fleet host)"""
+    try:
+        start, end, metrics, step = range_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    points = request.args.get('points', HISTORY_DEFAULT_POINTS, type=int)
+    points = max(3, min(points, HISTORY_MAX_POINTS))
+    history = get_range(start, end)
+
+    if step:
+        # Fixed-step averages instead of LTTB; larger results belong to /api/export
+        first, last = history.first_timestamp, history.last_timestamp
+        if first is not None and (last - first) / step > HISTORY_MAX_POINTS:
+            return jsonify({'error': f'step too small: more than {HISTORY_MAX_POINTS} points, '
+                                     f'use /api/export for full-resolution ranges'}), 400
+        columns = concat_blocks(history_blocks(history, start, end, metrics, step), metrics)
+        timestamps = columns['timestamp']
+        result = {name: {'timestamps': timestamps.tolist(), 'values': columns[name].tolist()}
+                  for name in metrics}
+        return jsonify({
+            'from': float(timestamps[0]) if len(timestamps) else start,
+            'to': float(timestamps[-1]) if len(timestamps) else end,
+            'samples': len(history),
+            'step': step,
+            'metrics': result
+        })
+
+    columns = history.query(start, end, metrics)
+    timestamps = columns['timestamp']
+
+    result = {}
+    for name in metrics:
+        if len(timestamps) <= points:
+            result[name] = {'timestamps': timestamps.tolist(), 'values': columns[name].tolist()}
+            continue
+        reduced = downsample(timestamps, columns[name], points)
+        result[name] = {key: value.tolist() for key, value in reduced.items()}
+
+    return jsonify({
+        'from': float(timestamps[0]) if len(timestamps) else start,
+        'to': float(timestamps[-1]) if len(timestamps) else end,
+        'samples': len(timestamps),
+        'points': points,
+        'metrics': result
+    })
+
+
+def export_response(get_range, name):
+    """Streamed CSV/Arrow/Parquet download of a range source"""
+    try:
+        start, end, metrics, step = range_args()
+        fmt = request.args.get('format', 'csv')
+        blocks = history_blocks(get_range(start, end), start, end, metrics, step)
+        body = export_stream(fmt, blocks, metrics)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 501
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={name}_{int(time.time())}.{extension}'
+    })
+
+
+@app.route('/api/history', methods=['GET'])
+def get_history():
+    """Query a time range of history, downsampled to a point budget (or averaged per step) per metric"""
+    return history_response(monitor.get_range)
+
+
+@app.route('/api/export', methods=['GET'])
+def export_history():
+    """Stream a time range of history as CSV, Arrow or Parquet"""
+    return export_response(monitor.get_range, 'history')
+
+
+@app.route('/api/hosts', methods=['GET'])
+def get_hosts():
+    """Fleet hosts and aggregator counters"""
+    if fleet is None:
+        return jsonify({'error': 'Fleet mode is not enabled'}), 404
+    return jsonify({'aggregator': fleet.stats(), 'hosts': fleet.list_hosts()})
+
+
+@app.route('/api/hosts/<name>/history', methods=['GET'])
+def get_host_history(name):
+    """/api/history for one fleet host"""
+    host = fleet.get(name) if fleet else None
+    if host is None:
+        return jsonify({'error': f'Unknown host: {name}'}), 404
+    return history_response(host.history)
+
+
+@app.route('/api/hosts/<name>/export', methods=['GET'])
+def export_host_history(name):
+    """/api/export for one fleet host"""
+    host = fleet.get(name) if fleet else None
+    if host is None:
+        return jsonify({'error': f'Unknown host: {name}'}), 404
+    return export_response(host.history, f'history_{secure_filename(name)}')
+
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """min/max/avg/percentiles over the last N hours (or from/to) from rollup buckets"""
+    hours = request.args.get('hours', type=float)
+    start = request.args.get('from', type=float)
+    end = request.args.get('to', type=float)
+    if hours is not None:
+        end = time.time()
+        start = end - hours * 3600
+    metrics = [m for m in request.args.get('metrics', '').split(',') if m] or FIELD_NAMES
+
+    unknown = [m for m in metrics if m not in FIELD_NAMES]
+    if unknown:
+        return jsonify({'error': f"Unknown metrics: {', '.join(unknown)}"}), 400
+
+    return jsonify({
+        'from': start,
+        'to': end,
+        'metrics': monitor.rollups.stats(metrics, start, end)
+    })
+
+
+@app.route('/api/alerts', methods=['GET'])
+def get_alerts():
+    """Alert rules, currently firing alerts and recent events"""
+    return jsonify(alert_engine.summary())
+
+
+@app.route('/api/alerts/rules', methods=['PUT'])
+def set_alert_rules():
+    """Replace the alert rules with a JSON list"""
+    rules = request.get_json(silent=True)
+    if not isinstance(rules, list):
+        return jsonify({'error': 'Expected a JSON list of rules'}), 400
+    try:
+        alert_engine.set_rules(rules)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid rule: {e}'}), 400
+    return jsonify({'rules': [rule.to_dict() for rule in alert_engine.rules]})
+
+
+@app.route('/api/anomalies', methods=['GET'])
+def get_anomalies():
+    """Latest anomaly scores and recent flagged intervals"""
+    return jsonify(anomaly_detector.summary())
+
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get monitoring status"""
+    history = monitor.get_history()
     return jsonify({
         'monitoring_active': monitoring_active,
-        'data_count': len(monitor.get_history())
+        'subscribers': len(subscriptions),
+        'data_count': len(history),
+        'history': history.memory_usage(),
+        'disk_store': monitor.disk_store.disk_usage() if monitor.disk_store else None,
+        'fleet': fleet.stats() if fleet else None,
+        'collectors': monitor.scheduler.stats(),
+        'instrumentation': REGISTRY.summary()
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Monitor self-instrumentation in Prometheus text format"""
+    return Response(REGISTRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/profile', methods=['GET', 'POST'])
+def profile_tick():
+    """POST captures a cProfile of the next monitoring tick; GET returns the last capture"""
+    if request.method == 'POST':
+        tick_profiler.request()
+        if not monitoring_active:
+            # No background tick will come: profile one full collection now
+            with tick_profiler.maybe_profile():
+                monitor.get_all_info(inline=True)
+            return jsonify(tick_profiler.result)
+        return jsonify({'status': 'armed'}), 202
+
+    if tick_profiler.result is None:
+        return jsonify({'status': 'armed' if tick_profiler.pending else 'none'}), 404
+    return jsonify(tick_profiler.result)
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -135,7 +740,16 @@ def index():
             'websocket': 'ws://localhost:5001',
             'health': '/api/health',
             'status': '/api/status',
-            'generate_pdf': '/api/generate_pdf (POST)'
+            'history': '/api/history?from=&to=&metrics=&points=&step=',
+            'export': '/api/export?from=&to=&metrics=&step=&format=csv|arrow|parquet',
+            'stats': '/api/stats?hours=&metrics=',
+            'generate_pdf': '/api/generate_pdf (POST)',
+            'reports': '/api/reports (POST), /api/reports/<job_id>, /api/reports/<job_id>/download',
+            'hosts': '/api/hosts, /api/hosts/<host>/history, /api/hosts/<host>/export (fleet mode)',
+            'metrics': '/api/metrics (Prometheus text format)',
+            'alerts': '/api/alerts, /api/alerts/rules (PUT)',
+            'anomalies': '/api/anomalies',
+            'profile': '/api/profile (POST to capture one tick, GET for the result)'
         }
     })
 
@@ -143,4 +757,8 @@ def index():
 if __name__ == '__main__':
     print("Starting System Monitor Server...")
     print("Server running on http://localhost:5001")
+    if FLEET_PORT:
+        print(f"Fleet aggregator listening on port {fleet.start()}")
+    if simulated_hosts:
+        simulated_hosts.start()
     socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
@@ -0,0 +1,90 @@
+"""
+Chart Backfill
+The last few minutes of the chart series, pre-averaged and encoded once for
+every dashboard that connects
+
+A backfill is a binary message:
+
+    uint16 n | JSON header {"columns": [...], "step": s, "points": n} | padding to 8
+        | float64 x n timestamps | float32 x n per column
+
+The encoded bytes are cached until the next sample arrives, so any number
+of clients connecting in the same tick (e.g. reconnecting after a restart)
+cost one encode and are all sent the same buffer.
+"""
+
+import json
+import struct
+import threading
+from typing import Tuple
+
+import numpy as np
+
+from export import concat_blocks, history_blocks
+
+# Seconds of history sent (the dashboard charts show the last 3 minutes)
+BACKFILL_SECONDS = 180
+# Samples are averaged over this many seconds (about one point per dashboard tick)
+BACKFILL_STEP = 1.0
+
+# History columns the dashboard charts plot
+BACKFILL_COLUMNS = ['cpu_percent', 'memory_percent', 'net_upload_kbps', 'net_download_kbps',
+                    'cpu_temp', 'gpu_temp']
+
+_LENGTH = struct.Struct('<H')
+
+
+def encode_backfill(history, seconds: float = BACKFILL_SECONDS, step: float = BACKFILL_STEP) -> bytes:
+    """Binary backfill of the `seconds` before the newest sample, averaged over `step`"""
+    end = history.last_timestamp
+    if end is None:
+        columns = {name: np.empty(0) for name in ['timestamp'] + BACKFILL_COLUMNS}
+    else:
+        columns = concat_blocks(history_blocks(history, end - seconds, None, BACKFILL_COLUMNS, step),
+                                BACKFILL_COLUMNS)
+
+    points = len(columns['timestamp'])
+    header = json.dumps({'columns': BACKFILL_COLUMNS, 'step': step, 'points': points}).encode()
+    size = _LENGTH.size + len(header)
+    parts = [_LENGTH.pack(len(header)), header, b'\0' * ((-size) % 8),
+             columns['timestamp'].astype('<f8').tobytes()]
+    parts.extend(columns[name].astype('<f4').tobytes() for name in BACKFILL_COLUMNS)
+    return b''.join(parts)
+
+
+def decode_backfill(payload: bytes) -> Tuple[dict, dict]:
+    """(header, {column: array}) of a backfill message (reference decoder)"""
+    (length,) = _LENGTH.unpack_from(payload, 0)
+    header = json.loads(payload[_LENGTH.size:_LENGTH.size + length])
+    offset = _LENGTH.size + length
+    offset += (-offset) % 8
+    points = header['points']
+    columns = {'timestamp': np.frombuffer(payload, '<f8', points, offset)}
+    offset += 8 * points
+    for name in header['columns']:
+        columns[name] = np.frombuffer(payload, '<f4', points, offset)
+        offset += 4 * points
+    return header, columns
+
+
+class BackfillCache:
+    """Encoded backfill of a history, rebuilt only when a newer sample has arrived"""
+
+    def __init__(self, history, seconds: float = BACKFILL_SECONDS, step: float = BACKFILL_STEP):
+        self.history = history
+        self.seconds = seconds
+        self.step = step
+        self.encodes = 0
+        self._key = None
+        self._payload = b''
+        self._lock = threading.Lock()
+
+    def get(self) -> bytes:
+        key = (self.history.last_timestamp, len(self.history))
+        with self._lock:
+            # Concurrent connects wait here for the one encode instead of each running it
+            if key != self._key:
+                self._payload = encode_backfill(self.history, self.seconds, self.step)
+                self._key = key
+                self.encodes += 1
+            return self._payload
@@ -0,0 +1,68 @@
+"""
+Alert Engine Benchmark
+Time per sample of AlertEngine.evaluate() with hundreds of windowed rules
+
+Usage: python benchmarks/bench_alerts.py [rules] [samples]
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from alerts import AlertEngine
+from metrics_store import FIELD_NAMES
+
+WINDOWS = [0, 10, 60, 300]
+AGGREGATES = ['avg', 'max', 'min']
+
+
+def build_rules(count, seed=0):
+    """Rules spread over every column, window length and aggregate"""
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        threshold = rng.uniform(60, 95)
+        rules.append({
+            'name': f'rule_{i}',
+            'metric': FIELD_NAMES[i % len(FIELD_NAMES)],
+            'op': '>',
+            'threshold': threshold,
+            'clear': threshold - 5,
+            'for': rng.choice([0, 5, 30, 60]),
+            'window': rng.choice(WINDOWS),
+            'aggregate': rng.choice(AGGREGATES),
+        })
+    return rules
+
+
+def synthetic_samples(count, interval=0.5):
+    start = time.time() - count * interval
+    columns = range(len(FIELD_NAMES))
+    return [(start + i * interval, [60 + 35 * math.sin(i / 200.0 + k) for k in columns])
+            for i in range(count)]
+
+
+def main():
+    rule_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    sample_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    samples = synthetic_samples(sample_count)
+
+    for count in sorted({0, 100, rule_count}):
+        engine = AlertEngine(build_rules(count))
+        engine._record = lambda event: None  # keep printing out of the timing
+        events = 0
+        start = time.perf_counter()
+        for timestamp, values in samples:
+            events += len(engine.evaluate(timestamp, values))
+        elapsed = time.perf_counter() - start
+        windows = sum(window is not None for _, window in engine._columns.inputs)
+        print(f"{count:5d} rules ({windows:3d} shared windows)   "
+              f"{elapsed / sample_count * 1e6:8.2f} us/sample   {events} events")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Anomaly Detection Benchmark
+Time per sample of AnomalyDetector.evaluate() at several window lengths, the
+CPU it takes at 1 kHz aggregate input, and how many injected anomalies it flags
+
+Usage: python benchmarks/bench_anomalies.py [samples] [--realtime seconds]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from anomalies import ANOMALY_COLUMNS, ANOMALY_WINDOW, AnomalyDetector
+from metrics_store import FIELD_NAMES
+
+WINDOWS = [ANOMALY_WINDOW, 6000, 60000]
+
+# Aggregate input rate the detector has to sustain (samples per second)
+TARGET_RATE = 1000
+
+# Injected anomalies: (kind, column, size) every INJECT_EVERY samples
+INJECT_EVERY = 5000
+SPIKE_SAMPLES = 5
+SHIFT_SAMPLES = 400
+
+
+def synthetic_samples(count, interval=0.5, seed=0):
+    """(timestamps, rows ordered as FIELD_NAMES, injected (start, end, column) ranges)"""
+    rng = np.random.default_rng(seed)
+    rows = np.zeros((count, len(FIELD_NAMES)))
+    base = {'cpu_percent': (30, 4), 'memory_percent': (55, 0.3), 'disk_read_kbps': (800, 120),
+            'disk_write_kbps': (1500, 200), 'net_upload_kbps': (200, 30), 'net_download_kbps': (900, 90)}
+    for name, (mean, std) in base.items():
+        rows[:, FIELD_NAMES.index(name)] = np.maximum(rng.normal(mean, std, count), 0)
+
+    injected = []
+    columns = list(ANOMALY_COLUMNS)
+    for n, start in enumerate(range(INJECT_EVERY, count - SHIFT_SAMPLES, INJECT_EVERY)):
+        name = columns[n % len(columns)]
+        mean, std = base[name]
+        index = FIELD_NAMES.index(name)
+        if n % 2 == 0:
+            # Spike: 10 standard deviations for a few samples
+            end = start + SPIKE_SAMPLES
+            rows[start:end, index] += 10 * std
+        else:
+            # Level shift of 2 standard deviations, too small for the z-score alone
+            end = start + SHIFT_SAMPLES
+            rows[start:end, index] += 2 * std
+        injected.append((start, end, name))
+
+    timestamps = time.time() - count * interval + np.arange(count) * interval
+    return timestamps.tolist(), rows.tolist(), injected
+
+
+def run(window, timestamps, rows):
+    detector = AnomalyDetector(window=window)
+    detector._record = lambda event: None  # keep printing out of the timing
+    start = time.perf_counter()
+    for timestamp, values in zip(timestamps, rows):
+        detector.evaluate(timestamp, values)
+    return time.perf_counter() - start, detector
+
+
+def detections(detector, timestamps, injected):
+    """(injected anomalies overlapped by a flagged interval of their column, other intervals)"""
+    intervals = detector.intervals()
+    found = 0
+    matched = set()
+    for start, end, name in injected:
+        # Allow the interval to open up to a window after the injection ends
+        t0, t1 = timestamps[start], timestamps[min(end + 100, len(timestamps) - 1)]
+        hits = [i for i, interval in enumerate(intervals)
+                if interval['metric'] == name and interval['start'] <= t1 and interval['end'] >= t0]
+        if hits:
+            found += 1
+            matched.update(hits)
+    return found, len(intervals) - len(matched)
+
+
+def realtime(seconds, timestamps, rows):
+    """Feed samples paced at TARGET_RATE; returns (samples, worst lag behind schedule in ms)"""
+    detector = AnomalyDetector()
+    detector._record = lambda event: None
+    total = min(len(rows), int(seconds * TARGET_RATE))
+    begin = time.perf_counter()
+    worst = 0.0
+    for i in range(total):
+        due = begin + i / TARGET_RATE
+        now = time.perf_counter()
+        if now < due:
+            time.sleep(due - now)
+        else:
+            worst = max(worst, now - due)
+        detector.evaluate(timestamps[i], rows[i])
+    return total, worst * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('samples', nargs='?', type=int, default=100000)
+    parser.add_argument('--realtime', type=float, default=0, metavar='SECONDS',
+                        help=f'also feed samples paced at {TARGET_RATE}/s for this long')
+    args = parser.parse_args()
+
+    timestamps, rows, injected = synthetic_samples(args.samples)
+    print(f"{args.samples} samples, {len(ANOMALY_COLUMNS)} columns, {len(injected)} injected anomalies")
+
+    for window in WINDOWS:
+        elapsed, detector = run(window, timestamps, rows)
+        per_sample = elapsed / args.samples
+        found, other = detections(detector, timestamps, injected)
+        print(f"window {window:6d}   {per_sample * 1e6:7.2f} us/sample   "
+              f"{TARGET_RATE} Hz = {per_sample * TARGET_RATE * 100:5.1f}% of a core   "
+              f"max {1 / per_sample:8.0f} samples/s   flagged {found}/{len(injected)}, {other} other intervals")
+
+    if args.realtime:
+        total, lag = realtime(args.realtime, timestamps, rows)
+        print(f"realtime: {total} samples at {TARGET_RATE}/s, worst lag {lag:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
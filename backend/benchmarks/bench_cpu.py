@@ -0,0 +1,51 @@
+"""
+CPU Sampling Benchmark
+Compares the delta-based CpuSampler against blocking psutil.cpu_percent calls
+
+Usage: python benchmarks/bench_cpu.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import psutil
+from system_monitor import CpuSampler, SystemMonitor
+
+
+def measure(func, iterations):
+    """Return (mean, max) latency in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return sum(timings) / len(timings), max(timings)
+
+
+def legacy_sample():
+    """Sampling as done before CpuSampler (two 100 ms blocking reads)"""
+    psutil.cpu_percent(interval=0.1, percpu=True)
+    psutil.cpu_percent(interval=0.1)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    sampler = CpuSampler()
+    monitor = SystemMonitor()
+
+    results = [
+        ('CpuSampler.sample', measure(sampler.sample, iterations)),
+        ('SystemMonitor.get_cpu_info', measure(monitor.get_cpu_info, iterations)),
+        ('legacy cpu_percent(interval=0.1) x2', measure(legacy_sample, 5)),
+    ]
+
+    for name, (mean_ms, max_ms) in results:
+        print(f"{name:40s} mean {mean_ms:9.3f} ms   max {max_ms:9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Disk Store Benchmark
+Writes N days of 1 s records into a temporary DiskStore (exercising
+rotation and compaction) and times mmap range queries over it
+
+Usage: python benchmarks/bench_disk_store.py [days]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from disk_store import DiskStore
+from metrics_store import FIELD_NAMES
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 14
+    directory = tempfile.mkdtemp(prefix='bench_disk_store_')
+    store = DiskStore(directory)
+
+    try:
+        seconds = int(days * 86400)
+        end = time.time()
+        start = end - seconds
+        values = [float(i) for i in range(len(FIELD_NAMES))]
+
+        t0 = time.perf_counter()
+        for i in range(seconds):
+            store.append_values(start + i, values)
+        store.close()
+        write_time = time.perf_counter() - t0
+        usage = store.disk_usage()
+        print(f"wrote {seconds} records in {write_time:.1f} s "
+              f"({seconds / write_time:.0f} records/s), {usage['segments']} segments, "
+              f"{usage['bytes'] / 1024**2:.1f} MB")
+
+        for label, window in [('1 hour', 3600), ('1 day', 86400), ('full range', seconds)]:
+            t0 = time.perf_counter()
+            view = store.view(end - window, end)
+            cpu = view.column('cpu_percent')
+            elapsed = (time.perf_counter() - t0) * 1000
+            print(f"{label:12s} {len(cpu):9d} samples   {elapsed:8.2f} ms (view + one column)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
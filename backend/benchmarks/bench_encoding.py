@@ -0,0 +1,69 @@
+"""
+Frame Encoding Benchmark
+Compares bytes per frame and encode time of the socket stream encodings:
+full JSON, JSON deltas and the packed binary codec
+
+Usage: python benchmarks/bench_encoding.py [frames]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from system_monitor import SystemMonitor
+from frame_delta import DeltaEncoder
+from frame_codec import PackedEncoder, unpack_frame
+
+
+def collect_frames(count):
+    """Collect real frames at the scheduler's cadence"""
+    monitor = SystemMonitor()
+    frames = [monitor.get_all_info()]
+    while len(frames) < count:
+        time.sleep(monitor.next_due())
+        frames.append(monitor.collect())
+    return frames
+
+
+def run(name, frames, encode):
+    """Return (name, mean bytes per frame, mean encode time in microseconds)"""
+    sizes = []
+    start = time.perf_counter()
+    for frame in frames:
+        sizes.append(encode(frame))
+    elapsed = time.perf_counter() - start
+    return name, sum(sizes) / len(sizes), elapsed / len(frames) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    frames = collect_frames(count)
+
+    delta = DeltaEncoder()
+    packed = PackedEncoder()
+
+    def encode_packed(frame):
+        record, structure, details = packed.encode(frame)
+        return len(record) + sum(len(json.dumps(part)) for part in (structure, details) if part is not None)
+
+    results = [
+        run('json full frame', frames, lambda f: len(json.dumps(f))),
+        run('json delta', frames, lambda f: len(json.dumps(delta.encode(f)))),
+        run('packed binary (+structure/details on change)', frames, encode_packed),
+    ]
+
+    for name, size, micros in results:
+        print(f"{name:40s} {size:9.1f} bytes/frame   {micros:9.1f} us/frame")
+
+    # Round-trip check of the packed codec
+    record, structure, details = packed.snapshot()
+    _, decoded = unpack_frame(record, structure, details)
+    assert decoded['cpu']['thread_count'] == frames[-1]['cpu']['thread_count']
+    assert decoded['processes'] == frames[-1]['processes']
+
+
+if __name__ == '__main__':
+    main()
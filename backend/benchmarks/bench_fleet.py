@@ -0,0 +1,95 @@
+"""
+Fleet Load Generator
+Starts a FleetAggregator in this process and simulates many agents from
+worker processes, each agent holding its own connection and sending a
+batch of synthetic samples every batch interval
+
+Usage: python benchmarks/bench_fleet.py [agents] [seconds] [batch seconds]
+"""
+
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from agent import AgentConnection
+from fleet import FleetAggregator
+from metrics_store import FIELD_NAMES, extract_values
+from system_monitor import SystemMonitor
+
+WORKERS = 4
+SAMPLE_INTERVAL = 0.5
+
+
+def simulate_agents(port, names, seconds, batch_seconds, frame):
+    """Run a group of simulated agents until `seconds` have passed"""
+    connections = [AgentConnection(f"127.0.0.1:{port}", name) for name in names]
+    base = extract_values(frame)
+    rows_per_batch = int(batch_seconds / SAMPLE_INTERVAL)
+
+    # Spread the agents' batches over the interval like independent hosts
+    offsets = [random.uniform(0, batch_seconds) for _ in connections]
+    start = time.time()
+    sent = [0] * len(connections)
+
+    while time.time() - start < seconds:
+        now = time.time()
+        for i, connection in enumerate(connections):
+            if now - start < offsets[i] + sent[i] * batch_seconds:
+                continue
+            first = now - batch_seconds
+            for j in range(rows_per_batch):
+                values = [v * random.uniform(0.9, 1.1) for v in base]
+                connection.add(first + j * SAMPLE_INTERVAL, values, frame)
+            connection.flush()
+            sent[i] += 1
+        time.sleep(0.01)
+
+    for connection in connections:
+        connection.close()
+
+
+def main():
+    agents = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    batch_seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    frame = SystemMonitor(history_size=10).get_all_info()
+    aggregator = FleetAggregator(bind='127.0.0.1', port=0)
+    port = aggregator.start()
+
+    names = [f"sim-{i:04d}" for i in range(agents)]
+    workers = [
+        multiprocessing.Process(target=simulate_agents,
+                                args=(port, names[i::WORKERS], seconds, batch_seconds, frame))
+        for i in range(WORKERS)
+    ]
+
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    t0 = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    time.sleep(0.5)
+    elapsed = time.time() - t0
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    aggregator_cpu = (cpu_end.ru_utime - cpu_start.ru_utime) + (cpu_end.ru_stime - cpu_start.ru_stime)
+
+    stats = aggregator.stats()
+    expected = agents * int(seconds / batch_seconds) * int(batch_seconds / SAMPLE_INTERVAL)
+    print(f"{agents} agents, {len(FIELD_NAMES)} metrics, {batch_seconds:g} s batches, {elapsed:.1f} s")
+    print(f"hosts {stats['hosts']}   batches {stats['batches']}   samples {stats['samples']} "
+          f"(~{expected} expected)")
+    print(f"ingest {stats['samples'] / elapsed:.0f} samples/s   "
+          f"{stats['bytes_received'] / elapsed / 1024:.1f} KB/s compressed")
+    print(f"aggregator CPU {aggregator_cpu:.2f} s ({aggregator_cpu / elapsed * 100:.1f}% of one core)")
+    aggregator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Process Collection Benchmark
+Optionally spawns idle child processes, then times ProcessCollector ticks
+against the per-tick budget and counts how many ticks a full pass takes
+
+Usage: python benchmarks/bench_processes.py [extra processes] [ticks]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from process_monitor import ProcessCollector
+
+
+def main():
+    extra = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    children = [subprocess.Popen(['sleep', '300']) for _ in range(extra)]
+
+    try:
+        collector = ProcessCollector()
+        print(f"budget {collector.budget * 1000:.0f} ms per tick")
+
+        timings = []
+        covered = 0
+        full_pass = None
+        for tick in range(1, ticks + 1):
+            t0 = time.perf_counter()
+            result = collector.collect()
+            timings.append((time.perf_counter() - t0) * 1000)
+            covered += result['refreshed']
+            if full_pass is None and covered >= result['count']:
+                full_pass = tick
+            time.sleep(0.05)
+
+        timings.sort()
+        print(f"{result['count']} processes, {ticks} ticks")
+        print(f"tick time   median {timings[len(timings) // 2]:.2f} ms   max {timings[-1]:.2f} ms")
+        print(f"full pass   {full_pass or '>' + str(ticks)} ticks")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+
+if __name__ == '__main__':
+    main()
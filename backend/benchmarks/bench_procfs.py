@@ -0,0 +1,101 @@
+"""
+/proc Fast Path Benchmark
+Samples per second of the per-tick collectors with the psutil and procfs
+sources, and a check that both build frames of the same shape (Linux only)
+
+Usage: python benchmarks/bench_procfs.py [seconds per measurement]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from system_monitor import SystemMonitor
+
+# The collectors that run every tick (0.5-1 s) plus the sensor read
+COLLECTORS = ['cpu', 'memory', 'disk_io', 'network_io', 'temperature']
+
+
+def shape(value, path=''):
+    """{path: type name} of every leaf of a frame section (list items by position)"""
+    if isinstance(value, dict):
+        leaves = {}
+        for key, item in value.items():
+            leaves.update(shape(item, f'{path}.{key}'))
+        return leaves
+    if isinstance(value, list):
+        leaves = {}
+        for i, item in enumerate(value):
+            leaves.update(shape(item, f'{path}[{i}]'))
+        return leaves or {path: 'list'}
+    # int and float are interchangeable in the JSON frame
+    return {path: 'number' if isinstance(value, (int, float)) and not isinstance(value, bool)
+            else type(value).__name__}
+
+
+def collector(monitor, name):
+    if name in ('disk_io', 'network_io'):
+        # Separate consumer, so the monitor's own previous readings are left alone
+        return lambda: getattr(monitor, f'get_{name}_info')('bench')
+    return getattr(monitor, f'get_{name}_info')
+
+
+def rate(func, seconds):
+    """Calls per second of func over about `seconds`"""
+    func()
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(50):
+            func()
+        calls += 50
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - start)
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        print('The procfs source is Linux only')
+        return
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+
+    monitors = {name: SystemMonitor(collectors=['temperature'], source=name) for name in ('psutil', 'procfs')}
+    if type(monitors['procfs'].source).__name__ != 'ProcfsSource':
+        print('procfs source could not be opened')
+        return
+    for monitor in monitors.values():
+        # Every call reads the counters instead of sharing a reading within 50 ms
+        monitor.disk_counters.max_age = 0
+        monitor.net_counters.max_age = 0
+        monitor.get_disk_io_info('bench')
+        monitor.get_network_io_info('bench')
+
+    mismatched = 0
+    for name in COLLECTORS:
+        shapes = {source: shape(collector(monitor, name)()) for source, monitor in monitors.items()}
+        if shapes['psutil'] != shapes['procfs']:
+            mismatched += 1
+            differing = sorted(set(shapes['psutil'].items()) ^ set(shapes['procfs'].items()))
+            print(f"  {name}: frame sections differ: {differing[:6]}")
+    print(f"frame schema: {len(COLLECTORS) - mismatched}/{len(COLLECTORS)} collectors identical")
+
+    print(f"{'collector':12s} {'psutil/s':>10s} {'procfs/s':>10s} {'speedup':>8s}")
+    for name in COLLECTORS:
+        rates = {source: rate(collector(monitor, name), seconds) for source, monitor in monitors.items()}
+        print(f"{name:12s} {rates['psutil']:10.0f} {rates['procfs']:10.0f} {rates['procfs'] / rates['psutil']:7.1f}x")
+
+    # One sample: every per-tick collector once
+    samples = {}
+    for source, monitor in monitors.items():
+        funcs = [collector(monitor, name) for name in COLLECTORS if name != 'temperature']
+        samples[source] = rate(lambda: [func() for func in funcs], seconds)
+    print(f"{'sample':12s} {samples['psutil']:10.0f} {samples['procfs']:10.0f} "
+          f"{samples['procfs'] / samples['psutil']:7.1f}x   (cpu + memory + disk_io + network_io)")
+
+
+if __name__ == '__main__':
+    main()
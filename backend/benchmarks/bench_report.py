@@ -0,0 +1,60 @@
+"""
+PDF Report Benchmark
+Wall-clock time of PDFGenerator.generate_report() for a 1-hour history,
+cold (charts rendered) and warm (charts reused from the cache), with
+sequential and parallel chart rendering
+
+Usage: python benchmarks/bench_report.py [seconds_of_history] [sample_interval]
+"""
+
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics_store import MetricStore, FIELD_NAMES
+from system_monitor import SystemMonitor
+from pdf_generator import PDFGenerator
+
+
+def synthetic_history(seconds, interval):
+    """MetricStore filled with smooth synthetic values ending now"""
+    count = int(seconds / interval)
+    store = MetricStore(count)
+    template = SystemMonitor().get_all_info()
+    start = time.time() - seconds
+
+    for i in range(count):
+        phase = i / 50.0
+        values = [50 + 40 * math.sin(phase + k) for k in range(len(FIELD_NAMES))]
+        store.append_values(start + i * interval, values)
+    store.latest = template
+    return store
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3600
+    interval = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    history = synthetic_history(seconds, interval)
+    output = os.path.join(tempfile.mkdtemp(), 'bench_report.pdf')
+
+    print(f"history: {len(history)} samples ({seconds:.0f} s at {interval} s)")
+    for workers in (1, None):
+        generator = PDFGenerator(chart_workers=workers)
+        cold = timed(lambda: generator.generate_report(history, output))
+        warm = timed(lambda: generator.generate_report(history, output))
+        label = f"chart_workers={generator.chart_workers}"
+        print(f"{label:20s} cold {cold:7.3f} s   warm (cached charts) {warm:7.3f} s")
+
+
+if __name__ == '__main__':
+    main()
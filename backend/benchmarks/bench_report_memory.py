@@ -0,0 +1,120 @@
+"""
+Report Memory Benchmark
+Peak anonymous memory of PDFGenerator.generate_report() over on-disk
+histories of growing length (mmap-backed StoreView, as /api/reports uses
+for long ranges)
+
+RssAnon is sampled every few milliseconds, so pages of the mapped segment
+files (which the kernel can drop at any time) are not counted. Linux only.
+
+Usage: python benchmarks/bench_report_memory.py [sizes] [--appendix]
+       e.g. python benchmarks/bench_report_memory.py 100000,1000000,5000000
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = [100_000, 1_000_000, 5_000_000]
+
+
+def rss_anon_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class PeakSampler(threading.Thread):
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = 0.0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, rss_anon_mb())
+            time.sleep(self.interval)
+
+
+def write_segment(directory, count, block=1_000_000):
+    """One segment file of `count` smooth synthetic samples at 0.5 s ending now"""
+    import numpy as np
+    from disk_store import _encode_header, _record_dtype, _segment_name
+    from metrics_store import FIELD_NAMES
+
+    start = time.time() - count * 0.5
+    path = os.path.join(directory, _segment_name(int(start)))
+    dtype = _record_dtype(FIELD_NAMES)
+    with open(path, 'wb') as f:
+        f.write(_encode_header(FIELD_NAMES))
+        for first in range(0, count, block):
+            index = np.arange(first, min(first + block, count), dtype=np.float64)
+            records = np.empty(len(index), dtype=dtype)
+            records['timestamp'] = start + index * 0.5
+            for k, name in enumerate(FIELD_NAMES):
+                records[name] = 50 + 40 * np.sin(index / 50.0 + k)
+            records.tofile(f)
+
+
+def measure(size, appendix):
+    """Runs in a fresh process so peaks of earlier sizes do not carry over"""
+    import fake_psutil
+    fake_psutil.install()
+    from disk_store import DiskStore
+    from pdf_generator import PDFGenerator
+    from system_monitor import SystemMonitor
+
+    directory = tempfile.mkdtemp(prefix='bench_report_memory_')
+    write_segment(directory, size)
+    history = DiskStore(directory).view(latest=SystemMonitor(history_size=10).get_all_info())
+    generator = PDFGenerator(chart_workers=1)
+    output = os.path.join(directory, 'report.pdf')
+
+    baseline = rss_anon_mb()
+    sampler = PeakSampler()
+    sampler.start()
+    start = time.perf_counter()
+    generator.generate_report(history, output, appendix=appendix)
+    elapsed = time.perf_counter() - start
+    sampler.running = False
+    sampler.join()
+
+    result = {
+        'samples': size,
+        'seconds': round(elapsed, 2),
+        'peak_growth_mb': round(sampler.peak - baseline, 1),
+        'pdf_mb': round(os.path.getsize(output) / 1024 ** 2, 2)
+    }
+    shutil.rmtree(directory)
+    print(json.dumps(result))
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    appendix = '--appendix' in sys.argv
+    if '--child' in sys.argv:
+        measure(int(args[0]), appendix)
+        return
+
+    sizes = [int(s) for s in args[0].split(',')] if args else DEFAULT_SIZES
+    print(f"{'samples':>10} {'seconds':>8} {'peak MB':>8} {'pdf MB':>7}" + ('  (with appendix)' if appendix else ''))
+    for size in sizes:
+        command = [sys.executable, os.path.abspath(__file__), str(size), '--child'] + (['--appendix'] if appendix else [])
+        result = json.loads(subprocess.check_output(command).decode().strip().splitlines()[-1])
+        print(f"{result['samples']:>10} {result['seconds']:>8} {result['peak_growth_mb']:>8} {result['pdf_mb']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Simulation Load Benchmark
+Runs the server on a simulated machine at several speeds and measures what
+its dashboards see: system_data events per second, frame latency, and how
+long a PDF report over the accumulated history takes
+
+Usage: python benchmarks/bench_simulation.py [--speeds 1,10,100] [--clients 20] [--duration 10]
+                                             [--simulate "cores=16,partitions=6,nics=4,hosts=10"]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from report_jobs import DONE, FAILED
+from run_benchmarks import StreamClient, free_port, latency_stats
+
+REPORT_TIMEOUT = 300
+
+
+def serve(port):
+    """Run app.py's Socket.IO server on the MONITOR_SIMULATE machine"""
+    os.environ.setdefault('METRICS_DATA_DIR', tempfile.mkdtemp(prefix='bench_simulation_'))
+    import app
+    if app.simulated_hosts:
+        app.simulated_hosts.start()
+    app.socketio.run(app.app, host='127.0.0.1', port=port, log_output=False, allow_unsafe_werkzeug=True)
+
+
+def request(port, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def time_report(port):
+    """Seconds from POST /api/reports to the job being done, and the job's final state"""
+    start = time.perf_counter()
+    status, job = request(port, 'POST', '/api/reports', {})
+    if status != 202:
+        return None, job
+    while job['status'] not in (DONE, FAILED) and time.perf_counter() - start < REPORT_TIMEOUT:
+        time.sleep(0.1)
+        _, job = request(port, 'GET', f"/api/reports/{job['job_id']}")
+    return time.perf_counter() - start, job
+
+
+def run(speed, options, clients, duration):
+    port = free_port()
+    env = dict(os.environ, MONITOR_SIMULATE=f"speed={speed:g},{options}".rstrip(','))
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+        workers = [StreamClient(url, duration) for _ in range(clients)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(duration + 10)
+
+        connected = [w for w in workers if w.connect_time is not None]
+        latencies = [l for w in connected for l in w.latencies]
+        events = sum(w.events for w in connected)
+        report_seconds, job = time_report(port)
+        _, status = request(port, 'GET', '/api/status')
+
+        latency = latency_stats(latencies) if latencies else {}
+        hosts = 1 + (status['fleet']['hosts'] if status.get('fleet') else 0)
+        report = f"{report_seconds:.2f} s ({job['status']})" if report_seconds is not None else f"failed: {job}"
+        print(f"speed {speed:5g}x   {len(connected)}/{clients} clients   "
+              f"{events / duration / max(1, len(connected)):7.1f} events/s per client   "
+              f"latency p50 {latency.get('p50_ms', 0):6.1f} ms  p95 {latency.get('p95_ms', 0):6.1f} ms   "
+              f"{status['data_count']} samples, {hosts} hosts   report {report}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--speeds', default='1,10,100')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--simulate', default='cores=16,partitions=6,nics=4,hosts=10',
+                        help='MONITOR_SIMULATE options other than speed')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+    try:
+        import simple_websocket  # noqa: F401
+    except ImportError:
+        print("simple-websocket is not installed")
+        return
+
+    for speed in (float(s) for s in args.speeds.split(',')):
+        run(speed, args.simulate, args.clients, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Deterministic psutil / GPUtil stand-ins for offline benchmarks
+
+install() registers fake ``psutil`` and ``GPUtil`` modules in sys.modules,
+so it must run before system_monitor is imported. Counters advance by a
+fixed step per call and values come from a seeded RNG, so two runs on
+different machines exercise exactly the same code paths and frame sizes.
+"""
+
+import random
+import sys
+import time
+import types
+from collections import namedtuple
+from contextlib import contextmanager
+
+scputimes = namedtuple('scputimes', 'user nice system idle iowait irq softirq steal guest guest_nice')
+scpufreq = namedtuple('scpufreq', 'current min max')
+svmem = namedtuple('svmem', 'total available percent used free')
+sswap = namedtuple('sswap', 'total used free percent sin sout')
+sdiskpart = namedtuple('sdiskpart', 'device mountpoint fstype opts')
+sdiskusage = namedtuple('sdiskusage', 'total used free percent')
+sdiskio = namedtuple('sdiskio', 'read_count write_count read_bytes write_bytes read_time write_time busy_time')
+snetio = namedtuple('snetio', 'bytes_sent bytes_recv packets_sent packets_recv errin errout dropin dropout')
+snicaddr = namedtuple('snicaddr', 'family address netmask broadcast ptp')
+snicstats = namedtuple('snicstats', 'isup duplex speed mtu flags')
+shwtemp = namedtuple('shwtemp', 'label current high critical')
+pcputimes = namedtuple('pcputimes', 'user system children_user children_system')
+pmem = namedtuple('pmem', 'rss vms')
+pio = namedtuple('pio', 'read_count write_count read_bytes write_bytes')
+
+GB = 1024 ** 3
+
+
+class FakeSystem:
+    """Shared state behind the fake psutil functions"""
+
+    def __init__(self, seed: int = 0, cores: int = 8, partitions: int = 4,
+                 interfaces: int = 4, processes: int = 200, sensor_delay: float = 0.0):
+        self.rng = random.Random(seed)
+        # Seconds sensors_temperatures() blocks, to simulate a hung probe
+        self.sensor_delay = sensor_delay
+        self.cores = cores
+        self.partitions = partitions
+        self.interfaces = interfaces
+        self.pids = list(range(1, processes + 1))
+        self.calls = 0
+        self.cpu = [[0.0] * 10 for _ in range(cores)]
+        # Whole disks and their partitions (partitions are listed by perdisk=True, like on Linux)
+        self.disk_names = ['sda', 'sda1', 'sda2', 'nvme0n1', 'nvme0n1p1']
+        self.disk = {name: [0] * 7 for name in self.disk_names}
+        self.nic_names = ['lo'] + [f"eth{i}" for i in range(interfaces)]
+        self.net = {name: [0] * 8 for name in self.nic_names}
+        self.proc_ticks = {}
+
+    def tick(self) -> int:
+        self.calls += 1
+        return self.calls
+
+    def cpu_times(self, percpu=False):
+        for times in self.cpu:
+            busy = self.rng.uniform(0.05, 0.6)
+            times[0] += busy * 0.7
+            times[2] += busy * 0.3
+            times[3] += 1.0 - busy
+        per_core = [scputimes(*times) for times in self.cpu]
+        if percpu:
+            return per_core
+        return scputimes(*[sum(column) for column in zip(*self.cpu)])
+
+    def virtual_memory(self):
+        total = 32 * GB
+        used = int(total * self.rng.uniform(0.3, 0.7))
+        return svmem(total, total - used, round(used / total * 100, 1), used, total - used)
+
+    def swap_memory(self):
+        total = 8 * GB
+        used = int(total * self.rng.uniform(0.0, 0.1))
+        return sswap(total, used, total - used, round(used / total * 100, 1), 0, 0)
+
+    def disk_io_counters(self, perdisk=False, nowrap=True):
+        for counters in self.disk.values():
+            reads, writes = self.rng.randint(0, 200), self.rng.randint(0, 400)
+            counters[0] += reads
+            counters[1] += writes
+            counters[2] += reads * 16 * 1024
+            counters[3] += writes * 16 * 1024
+            counters[4] += reads // 4
+            counters[5] += writes // 2
+            counters[6] += self.rng.randint(0, 100)
+        disks = {name: sdiskio(*counters) for name, counters in self.disk.items()}
+        if perdisk:
+            return disks
+        return sdiskio(*[sum(column) for column in zip(*(disks[name] for name in ('sda', 'nvme0n1')))])
+
+    def net_io_counters(self, pernic=False, nowrap=True):
+        for counters in self.net.values():
+            counters[0] += self.rng.randint(0, 512 * 1024)
+            counters[1] += self.rng.randint(0, 2 * 1024 ** 2)
+            counters[2] += 100
+            counters[3] += 300
+        nics = {name: snetio(*counters) for name, counters in self.net.items()}
+        if pernic:
+            return nics
+        return snetio(*[sum(column) for column in zip(*nics.values())])
+
+    def sensors_temperatures(self, fahrenheit=False):
+        if self.sensor_delay:
+            time.sleep(self.sensor_delay)
+        return {
+            'coretemp': [shwtemp(f"Core {i}", 45.0 + self.rng.uniform(0, 20), 90.0, 100.0)
+                         for i in range(min(self.cores, 4))]
+        }
+
+
+def _build_psutil(system: FakeSystem) -> types.ModuleType:
+    module = types.ModuleType('psutil')
+    module.__fake__ = True
+
+    class Error(Exception):
+        pass
+
+    class NoSuchProcess(Error):
+        pass
+
+    class ZombieProcess(NoSuchProcess):
+        pass
+
+    class AccessDenied(Error):
+        pass
+
+    class Process:
+        def __init__(self, pid):
+            if pid not in system.pids:
+                raise NoSuchProcess(pid)
+            self.pid = pid
+
+        @contextmanager
+        def oneshot(self):
+            yield
+
+        def name(self):
+            return f"proc-{self.pid}"
+
+        def cpu_times(self):
+            ticks = system.proc_ticks.get(self.pid, 0.0) + (self.pid % 7) * 0.01
+            system.proc_ticks[self.pid] = ticks
+            return pcputimes(ticks * 0.8, ticks * 0.2, 0.0, 0.0)
+
+        def memory_info(self):
+            return pmem((self.pid % 50 + 1) * 8 * 1024 ** 2, 0)
+
+        def io_counters(self):
+            volume = int(system.proc_ticks.get(self.pid, 0.0) * 1024 ** 2)
+            return pio(0, 0, volume, volume // 2)
+
+    module.Error = Error
+    module.NoSuchProcess = NoSuchProcess
+    module.ZombieProcess = ZombieProcess
+    module.AccessDenied = AccessDenied
+    module.Process = Process
+    module.pids = lambda: list(system.pids)
+
+    module.cpu_times = system.cpu_times
+    module.cpu_count = lambda logical=True: system.cores if logical else system.cores // 2
+    module.cpu_freq = lambda percpu=False: scpufreq(2400.0 + system.rng.uniform(-200, 800), 800.0, 4800.0)
+    module.cpu_percent = lambda interval=None, percpu=False: (
+        [system.rng.uniform(5, 60) for _ in range(system.cores)] if percpu else system.rng.uniform(5, 60))
+    module.virtual_memory = system.virtual_memory
+    module.swap_memory = system.swap_memory
+    module.disk_partitions = lambda all=False: [
+        sdiskpart(f"/dev/sd{chr(97 + i)}1", '/' if i == 0 else f"/mnt/data{i}", 'ext4', 'rw')
+        for i in range(system.partitions)
+    ]
+    module.disk_usage = lambda path: sdiskusage(500 * GB, 200 * GB, 300 * GB, 40.0)
+    module.disk_io_counters = system.disk_io_counters
+    module.net_io_counters = system.net_io_counters
+    module.net_if_addrs = lambda: {
+        f"eth{i}": [snicaddr(2, f"10.0.{i}.10", '255.255.255.0', None, None)]
+        for i in range(system.interfaces)
+    }
+    module.net_if_stats = lambda: {
+        f"eth{i}": snicstats(True, 2, 1000, 1500, 'up') for i in range(system.interfaces)
+    }
+    module.sensors_temperatures = system.sensors_temperatures
+    return module
+
+
+def _build_gputil(system: FakeSystem) -> types.ModuleType:
+    module = types.ModuleType('GPUtil')
+    GPU = namedtuple('GPU', 'name temperature load memoryUsed memoryTotal')
+    module.getGPUs = lambda: [GPU('Fake GPU', 55.0 + system.rng.uniform(0, 15),
+                                  system.rng.uniform(0, 1), 2048.0, 8192.0)]
+    return module
+
+
+def install(seed: int = 0, **options) -> FakeSystem:
+    """Replace psutil and GPUtil in sys.modules; call before importing system_monitor"""
+    if 'system_monitor' in sys.modules:
+        raise RuntimeError('fake_psutil.install() must run before system_monitor is imported')
+    system = FakeSystem(seed, **options)
+    sys.modules['psutil'] = _build_psutil(system)
+    sys.modules['GPUtil'] = _build_gputil(system)
+    return system
@@ -0,0 +1,530 @@
+"""
+Benchmark Suite
+Reproducible latency / memory / throughput figures for server startup,
+collection, frame serialization, PDF reports, the Socket.IO stream and the
+subscribe-time chart backfill,
+written to a JSON results file that can be compared between commits
+
+psutil and GPUtil are replaced by the seeded stand-ins in fake_psutil.py
+unless --real-psutil is given, so results do not depend on the host's
+sensors or load.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 100,10000,1000000] [--clients 50]
+                                        [--output FILE] [--compare BASELINE.json]
+    python benchmarks/run_benchmarks.py --quick --compare benchmarks/results/<commit>.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from io import BytesIO
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+QUICK_SIZES = [100, 10_000]
+
+# A metric counts as regressed when it is this much worse than the baseline
+REGRESSION_THRESHOLD = 0.20
+
+# Cold starts measured per run
+STARTUP_RUNS = 5
+
+
+def latency_stats(timings, **extra):
+    """mean/p50/p95/max in milliseconds from a list of seconds"""
+    ordered = sorted(timings)
+    result = {
+        'iterations': len(ordered),
+        'mean_ms': sum(ordered) / len(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p95_ms': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+        'max_ms': ordered[-1] * 1000
+    }
+    result.update(extra)
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def measure(func, iterations, **extra):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return latency_stats(timings, **extra)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def synthetic_store(count, template):
+    """MetricStore of `count` smooth synthetic samples at 0.5 s ending now"""
+    from metrics_store import MetricStore, FIELD_NAMES
+
+    store = MetricStore(count)
+    start = time.time() - count * 0.5
+    columns = range(len(FIELD_NAMES))
+    for i in range(count):
+        phase = i / 50.0
+        store.append_values(start + i * 0.5, [50 + 40 * math.sin(phase + k) for k in columns])
+    store.latest = template
+    return store
+
+
+def bench_collection(results, iterations):
+    from system_monitor import SystemMonitor
+
+    monitor = SystemMonitor()
+    monitor.get_all_info()
+    results['get_all_info'] = measure(monitor.get_all_info, iterations)
+    for name, collector in monitor.scheduler.collectors.items():
+        results[f'collector.{name}'] = measure(collector.func, iterations)
+    return monitor
+
+
+def bench_serialization(results, monitor, iterations):
+    from frame_delta import DeltaEncoder
+    from frame_codec import PackedEncoder
+
+    frame = monitor.get_all_info()
+    encoded = json.dumps(frame)
+    results['frame.json_dumps'] = measure(lambda: json.dumps(frame), iterations, bytes=len(encoded))
+
+    delta, packed = DeltaEncoder(), PackedEncoder()
+    frames = [monitor.get_all_info() for _ in range(50)]
+    rounds = max(5, iterations // 10)
+    results['frame.delta_encode'] = measure(lambda: [delta.encode(f) for f in frames], rounds, frames=len(frames))
+    results['frame.packed_encode'] = measure(lambda: [packed.encode(f) for f in frames], rounds, frames=len(frames))
+
+
+def bench_reports(results, monitor, sizes):
+    from pdf_generator import PDFGenerator
+
+    template = monitor.get_all_info()
+    for size in sizes:
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        history = synthetic_store(size, template)
+        fill_time = time.perf_counter() - start
+
+        # A fresh generator per size so no chart comes from the PNG cache
+        generator = PDFGenerator(chart_workers=1)
+        buffer = BytesIO()
+        start = time.perf_counter()
+        generator.generate_report(history, buffer, rollups=None)
+        elapsed = time.perf_counter() - start
+        generator.close()
+
+        results[f'report.{size}'] = {
+            'samples': size,
+            'fill_ms': round(fill_time * 1000, 3),
+            'mean_ms': round(elapsed * 1000, 3),
+            'pdf_bytes': len(buffer.getvalue()),
+            'history_bytes': history.memory_usage()['allocated_bytes'],
+            'peak_rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+            'samples_per_s': round(size / elapsed, 1)
+        }
+        print(f"  report {size:>9} samples  {elapsed:7.3f} s")
+
+
+# ---------------------------------------------------------------------------
+# Socket.IO load test: a server subprocess plus N minimal Engine.IO v4 clients
+
+
+def serve(port, sensor_delay=0.0):
+    """Run app.py's Socket.IO server with the fake psutil"""
+    import fake_psutil
+    fake_psutil.install(sensor_delay=sensor_delay)
+    os.environ.setdefault('METRICS_DATA_DIR', tempfile.mkdtemp(prefix='bench_socketio_'))
+
+    import app
+    app.socketio.run(app.app, host='127.0.0.1', port=port, log_output=False, allow_unsafe_werkzeug=True)
+
+
+class StreamClient(threading.Thread):
+    """Counts system_data events, their latency and the gaps between them over one websocket"""
+
+    def __init__(self, url, duration):
+        super().__init__(daemon=True)
+        self.url = url
+        self.duration = duration
+        self.connect_time = None
+        self.events = 0
+        self.bytes = 0
+        self.latencies = []
+        self.gaps = []
+        self.error = None
+
+    def run(self):
+        import simple_websocket
+
+        try:
+            start = time.perf_counter()
+            ws = simple_websocket.Client(self.url)
+            ws.receive(timeout=5)   # Engine.IO open packet
+            ws.send('40')           # connect to the default namespace
+            ws.receive(timeout=5)
+            ws.send('42["start_monitoring"]')
+            self.connect_time = time.perf_counter() - start
+
+            deadline = time.time() + self.duration
+            last_event = None
+            while time.time() < deadline:
+                message = ws.receive(timeout=1)
+                if message is None:
+                    continue
+                if message == '2':  # Engine.IO ping
+                    ws.send('3')
+                    continue
+                self.bytes += len(message)
+                if isinstance(message, str) and message.startswith('42["system_data"'):
+                    self.events += 1
+                    frame = json.loads(message[2:])[1]
+                    sent = datetime.fromisoformat(frame['timestamp']).timestamp()
+                    self.latencies.append(max(0.0, time.time() - sent))
+                    if last_event is not None:
+                        self.gaps.append(time.perf_counter() - last_event)
+                    last_event = time.perf_counter()
+            ws.close()
+        except Exception as e:
+            self.error = str(e)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_rss_mb(pid):
+    """Resident set size of another process (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def bench_startup(results, runs=STARTUP_RUNS):
+    """Cold start of the server: time until /api/health answers, and its RSS at that point"""
+    timings = []
+    rss = []
+    for _ in range(runs):
+        port = free_port()
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                try:
+                    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+                    conn.request('GET', '/api/health')
+                    if conn.getresponse().status == 200:
+                        break
+                except OSError:
+                    if server.poll() is not None:
+                        raise RuntimeError('server exited during startup')
+                    time.sleep(0.01)
+            timings.append(time.perf_counter() - start)
+            rss.append(process_rss_mb(server.pid))
+        finally:
+            server.terminate()
+            server.wait()
+
+    extra = {}
+    if all(value is not None for value in rss):
+        extra['rss_mb'] = sorted(rss)[len(rss) // 2]
+    results['startup'] = latency_stats(timings, **extra)
+    print(f"  startup to health check  {results['startup']['p50_ms']:.0f} ms"
+          + (f", {extra['rss_mb']:.1f} MB RSS" if extra else ''))
+
+
+def bench_socketio(results, clients, duration, sensor_delay=0.0):
+    try:
+        import simple_websocket  # noqa: F401
+    except ImportError:
+        print("  simple-websocket is not installed; skipping the Socket.IO load test")
+        return
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port),
+                               '--sensor-delay', str(sensor_delay)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+        workers = [StreamClient(url, duration) for _ in range(clients)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(duration + 10)
+
+        connected = [w for w in workers if w.connect_time is not None]
+        latencies = [l for w in connected for l in w.latencies]
+        gaps = [g for w in connected for g in w.gaps]
+        events = sum(w.events for w in connected)
+        entry = {
+            'clients': clients,
+            'connected': len(connected),
+            'errors': sum(1 for w in workers if w.error),
+            'duration_s': duration,
+            'sensor_delay_s': sensor_delay,
+            'events_per_s': round(events / duration, 1),
+            'bytes_per_s': round(sum(w.bytes for w in connected) / duration, 1),
+        }
+        if connected:
+            entry['connect'] = latency_stats([w.connect_time for w in connected])
+        if latencies:
+            entry['latency'] = latency_stats(latencies)
+        if gaps:
+            entry['gap'] = latency_stats(gaps)
+        suffix = f".sensor_delay_{sensor_delay:g}s" if sensor_delay else ''
+        results[f'socketio.{clients}_clients{suffix}'] = entry
+        print(f"  socketio {clients} clients{suffix}  {entry['events_per_s']} events/s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+class BackfillClient(threading.Thread):
+    """Subscribes once the storm starts and times the arrival of the system_backfill message"""
+
+    def __init__(self, url, go):
+        super().__init__(daemon=True)
+        self.url = url
+        self.go = go
+        self.elapsed = None
+        self.bytes = 0
+        self.error = None
+
+    def run(self):
+        import simple_websocket
+
+        try:
+            self.go.wait()
+            start = time.perf_counter()
+            ws = simple_websocket.Client(self.url)
+            ws.receive(timeout=5)
+            ws.send('40')
+            ws.receive(timeout=5)
+            ws.send('42["start_monitoring"]')
+            deadline = time.time() + 10
+            while time.time() < deadline:
+                message = ws.receive(timeout=1)
+                if message == '2':
+                    ws.send('3')
+                elif isinstance(message, bytes):  # binary attachment of system_backfill
+                    self.elapsed = time.perf_counter() - start
+                    self.bytes = len(message)
+                    break
+            ws.close()
+        except Exception as e:
+            self.error = str(e)
+
+
+def backfill_encodes(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    connection.request('GET', '/api/metrics')
+    for line in connection.getresponse().read().decode().splitlines():
+        if line.startswith('monitor_backfill_encodes '):
+            return float(line.split()[1])
+    return 0.0
+
+
+def bench_backfill(results, clients):
+    """Reconnect storm: `clients` dashboards connect at once while the stream is running"""
+    try:
+        import simple_websocket  # noqa: F401
+    except ImportError:
+        return
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+
+        url = f"ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket"
+        streamer = StreamClient(url, 8)
+        streamer.start()
+        time.sleep(4)  # a few seconds of history to backfill
+
+        go = threading.Event()
+        storm = [BackfillClient(url, go) for _ in range(clients)]
+        for client in storm:
+            client.start()
+        encodes = backfill_encodes(port)
+        go.set()
+        for client in storm:
+            client.join(15)
+        encodes = backfill_encodes(port) - encodes
+        streamer.join(15)
+
+        received = [c for c in storm if c.elapsed is not None]
+        entry = {
+            'clients': clients,
+            'received': len(received),
+            'bytes': received[0].bytes if received else 0,
+            'encodes': encodes,
+        }
+        if received:
+            entry['wait'] = latency_stats([c.elapsed for c in received])
+        results[f'backfill.{clients}_clients'] = entry
+        print(f"  backfill {clients} clients  {len(received)} received, {entry['bytes']} bytes, "
+              f"{encodes:g} encodes")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+# ---------------------------------------------------------------------------
+# Comparison
+
+# Keys where larger is better; every other *_ms / *_mb / bytes key is lower-is-better
+HIGHER_IS_BETTER = ('_per_s', 'connected', 'received')
+
+
+def _flatten(results, prefix=''):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name + '.')
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """Print changed metrics and return the names that regressed beyond threshold"""
+    old = dict(_flatten(baseline['results']))
+    regressions = []
+    for name, value in _flatten(current['results']):
+        if name not in old or old[name] == 0 or name.endswith(('iterations', 'samples', 'clients', 'frames')):
+            continue
+        change = (value - old[name]) / abs(old[name])
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        marker = ''
+        # Single worst samples are too noisy to gate on
+        if worse > threshold and not name.endswith('max_ms'):
+            marker = '  REGRESSION'
+            regressions.append(name)
+        if abs(change) > threshold / 2 or marker:
+            print(f"  {name:50s} {old[name]:>14.3f} -> {value:>14.3f} ({change:+.0%}){marker}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='System monitor benchmark suite')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='history sizes for report benchmarks')
+    parser.add_argument('--quick', action='store_true', help=f'report sizes {QUICK_SIZES}, fewer iterations')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=50, help='simulated Socket.IO clients (0 to skip)')
+    parser.add_argument('--duration', type=float, default=10, help='Socket.IO load test seconds')
+    parser.add_argument('--sensor-delay', type=float, default=0.0,
+                        help='also run the load test with a fake temperature probe that blocks this many seconds')
+    parser.add_argument('--real-psutil', action='store_true', help='benchmark against the live system')
+    parser.add_argument('--output', help='results file (default benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='baseline results file to compare against')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.sensor_delay)
+        return
+
+    if not args.real_psutil:
+        import fake_psutil
+        fake_psutil.install()
+
+    sizes = QUICK_SIZES if args.quick else [int(s) for s in args.sizes.split(',') if s]
+    iterations = max(10, args.iterations // 4) if args.quick else args.iterations
+
+    results = {}
+    print("startup")
+    bench_startup(results)
+    print("collection")
+    monitor = bench_collection(results, iterations)
+    print("serialization")
+    bench_serialization(results, monitor, iterations)
+    print("reports")
+    bench_reports(results, monitor, sizes)
+    if args.clients > 0:
+        print("socketio")
+        bench_socketio(results, args.clients, args.duration)
+        if args.sensor_delay:
+            bench_socketio(results, args.clients, args.duration, args.sensor_delay)
+        bench_backfill(results, args.clients)
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'psutil': 'real' if args.real_psutil else 'fake',
+            'sizes': sizes,
+            'iterations': iterations,
+            'peak_rss_mb': round(peak_rss_mb(), 1)
+        },
+        'results': results
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {baseline['meta']['commit']}:")
+        regressions = compare(report, baseline)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {REGRESSION_THRESHOLD:.0%}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Collection Worker
+Samples on a dedicated thread and hands finished frames to the emitter
+through a bounded queue, so probe latency never delays socket traffic and
+a slow emit never delays sampling
+"""
+
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import COLLECT_SECONDS, QUEUE_SECONDS
+
+# Frames waiting for the emitter; older ones are dropped when it falls behind
+FRAME_QUEUE_SIZE = 4
+
+# Pause after a pass that raised, so a persistent failure cannot spin the thread
+FAILED_PASS_DELAY = 1.0
+
+
+class CollectionWorker:
+    """Runs monitor.collect() on its own sampling schedule.
+
+    Every sample is recorded in the monitor's history by collect(); a frame
+    dropped from the full queue only means subscribers skip one update. A
+    pass that raises (a required collector with no value yet) is logged and
+    skipped, and sampling carries on.
+    """
+
+    def __init__(self, monitor, profiler=None, maxsize: int = FRAME_QUEUE_SIZE):
+        self.monitor = monitor
+        self.profiler = profiler
+        self.frames: queue.Queue = queue.Queue(maxsize)
+        self.dropped = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='collection', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop sampling and wait for the pass in progress to finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._collect()
+            except Exception as e:
+                self.failed += 1
+                print(f"Collection pass failed: {e!r}")
+                self._stop.wait(FAILED_PASS_DELAY)
+                continue
+            self._stop.wait(self.monitor.next_due())
+
+    def _collect(self):
+        # A requested profile runs the collectors inline so cProfile sees them
+        profiling = self.profiler is not None and self.profiler.pending
+        if profiling:
+            with self.profiler.maybe_profile(), COLLECT_SECONDS.time():
+                data = self.monitor.collect(inline=True)
+        else:
+            with COLLECT_SECONDS.time():
+                data = self.monitor.collect()
+        self._put((data, list(self.monitor.last_updated), time.perf_counter()))
+
+    def _put(self, item):
+        while True:
+            try:
+                self.frames.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float) -> Optional[Tuple[Dict, List[str]]]:
+        """Next (frame, updated collectors), or None if nothing arrived within timeout"""
+        try:
+            data, updated, queued = self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        QUEUE_SECONDS.observe(time.perf_counter() - queued)
+        return data, updated
@@ -0,0 +1,362 @@
+"""
+Disk Metrics Store
+Append-only segment files of fixed-width metric records, read back through mmap
+
+Each segment file starts with a small header followed by float64 records:
+
+    b'SMSTORE1' | uint32 header size | uint32 record size | JSON field list | padding
+    record = timestamp, FIELD_NAMES... (float64 each)
+
+Segments are rotated every SEGMENT_SECONDS. Once a whole day is older
+than COMPACT_AFTER_SECONDS its hourly segments are merged into one segment
+for the day, and segments older than the retention period are deleted.
+Compaction runs on a background thread started at rotation, and the merged
+segment replaces the day's first file before the others are removed, so
+a crash never loses records. Reads map the files with mmap and slice them
+with numpy, so a range query only copies the requested columns of the
+overlapping segments.
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from metrics_store import FIELD_NAMES, MetricStore
+
+MAGIC = b'SMSTORE1'
+_HEADER = struct.Struct('<8sII')
+HEADER_ALIGN = 64
+
+SEGMENT_SECONDS = 3600
+COMPACT_SEGMENT_SECONDS = 86400
+COMPACT_AFTER_SECONDS = 86400
+DEFAULT_RETENTION_SECONDS = 30 * 86400
+
+SEGMENT_PREFIX = 'segment_'
+SEGMENT_SUFFIX = '.bin'
+
+
+def _segment_name(start: int) -> str:
+    return f"{SEGMENT_PREFIX}{start:012d}{SEGMENT_SUFFIX}"
+
+
+def _segment_start(filename: str) -> Optional[int]:
+    if not (filename.startswith(SEGMENT_PREFIX) and filename.endswith(SEGMENT_SUFFIX)):
+        return None
+    try:
+        return int(filename[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+    except ValueError:
+        return None
+
+
+def _encode_header(fields: List[str]) -> bytes:
+    names = json.dumps(fields).encode('utf-8')
+    size = _HEADER.size + len(names)
+    size += (-size) % HEADER_ALIGN
+    record_size = 8 * (len(fields) + 1)
+    return (_HEADER.pack(MAGIC, size, record_size) + names).ljust(size, b'\0')
+
+
+def _record_dtype(fields: List[str]) -> np.dtype:
+    return np.dtype([('timestamp', '<f8')] + [(name, '<f8') for name in fields])
+
+
+def _map_segment(path: str) -> Optional[np.ndarray]:
+    """Structured record array backed by an mmap of the segment file (None if empty or gone)"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        # Removed by compaction or retention since the directory was listed
+        return None
+    with f:
+        size = os.fstat(f.fileno()).st_size
+        if size < _HEADER.size:
+            return None
+        magic, header_size, record_size = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            return None
+        fields = json.loads(f.read(header_size - _HEADER.size).rstrip(b'\0'))
+        count = (size - header_size) // record_size
+        if count <= 0:
+            return None
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return np.frombuffer(mapped, dtype=_record_dtype(fields), count=count, offset=header_size)
+
+
+class StoreView:
+    """Read-only, mmap-backed history over a time range.
+
+    Offers the same read interface as MetricStore (timestamps, column,
+    query, chunks, first/last timestamp, latest, copy) so PDFGenerator,
+    the report jobs and the exports can use either.
+    """
+
+    def __init__(self, parts: List[np.ndarray], latest: Optional[Dict] = None):
+        self._parts = [p for p in parts if len(p)]
+        self.latest = latest
+
+    def __len__(self) -> int:
+        return sum(len(p) for p in self._parts)
+
+    def _parts_in(self, start: Optional[float], end: Optional[float]) -> List[np.ndarray]:
+        if start is None and end is None:
+            return self._parts
+        parts = []
+        for part in self._parts:
+            ts = part['timestamp']
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+            hi = len(part) if end is None else int(np.searchsorted(ts, end, side='right'))
+            if hi > lo:
+                parts.append(part[lo:hi])
+        return parts
+
+    @staticmethod
+    def _gather(parts: List[np.ndarray], name: str) -> np.ndarray:
+        if not parts:
+            return np.empty(0)
+        return np.concatenate([
+            part[name] if name in part.dtype.names else np.zeros(len(part))
+            for part in parts
+        ])
+
+    def timestamps(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        return self._gather(self._parts_in(start, end), 'timestamp')
+
+    def column(self, name: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        if name not in FIELD_NAMES:
+            raise KeyError(f"Unknown metric: {name}")
+        return self._gather(self._parts_in(start, end), name)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              metrics: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        parts = self._parts_in(start, end)
+        result = {'timestamp': self._gather(parts, 'timestamp')}
+        for name in (metrics or FIELD_NAMES):
+            if name not in FIELD_NAMES:
+                raise KeyError(f"Unknown metric: {name}")
+            result[name] = self._gather(parts, name)
+        return result
+
+    def chunks(self, start: Optional[float] = None, end: Optional[float] = None,
+               metrics: Optional[Iterable[str]] = None, rows: int = 10000) -> Iterator[Dict[str, np.ndarray]]:
+        """query() over [start, end] split into blocks of at most `rows` records,
+        copying one block at a time out of the mapped segments"""
+        metrics = list(metrics or FIELD_NAMES)
+        for name in metrics:
+            if name not in FIELD_NAMES:
+                raise KeyError(f"Unknown metric: {name}")
+        for part in self._parts_in(start, end):
+            for first in range(0, len(part), rows):
+                block = part[first:first + rows]
+                chunk = {'timestamp': np.ascontiguousarray(block['timestamp'])}
+                for name in metrics:
+                    chunk[name] = (np.ascontiguousarray(block[name]) if name in block.dtype.names
+                                   else np.zeros(len(block)))
+                yield chunk
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return float(self._parts[0]['timestamp'][0]) if self._parts else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return float(self._parts[-1]['timestamp'][-1]) if self._parts else None
+
+    def copy(self, start: Optional[float] = None, end: Optional[float] = None) -> 'StoreView':
+        """Views are immutable; copying only narrows the range"""
+        return StoreView(self._parts_in(start, end), self.latest)
+
+
+def _rows(records: np.ndarray) -> np.ndarray:
+    """[timestamp, *FIELD_NAMES] float rows of a mapped segment (missing fields are 0)"""
+    columns = StoreView([records]).query()
+    return np.column_stack([columns['timestamp']] + [columns[name] for name in FIELD_NAMES])
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _fsync_directory(directory: str):
+    """Make a rename durable before the files it supersedes are removed"""
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DiskStore:
+    """Append-only segmented metric store in a directory"""
+
+    def __init__(self, directory: str, retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        self.directory = directory
+        self.retention_seconds = retention_seconds
+        self._file = None
+        self._segment_start = None
+        self._record = struct.Struct('<' + 'd' * (len(FIELD_NAMES) + 1))
+        self._compaction: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def segments(self) -> List[Tuple[int, str]]:
+        """(start, path) of every segment, oldest first"""
+        found = []
+        for filename in os.listdir(self.directory):
+            start = _segment_start(filename)
+            if start is not None:
+                found.append((start, os.path.join(self.directory, filename)))
+        return sorted(found)
+
+    def _open_segment(self, timestamp: float):
+        self._close_file()
+        start = int(timestamp // SEGMENT_SECONDS * SEGMENT_SECONDS)
+        path = os.path.join(self.directory, _segment_name(start))
+
+        header = _encode_header(FIELD_NAMES)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                existing = f.read(len(header))
+            if existing != header:
+                # Schema changed since this segment was written: start a fresh one
+                start = int(timestamp)
+                path = os.path.join(self.directory, _segment_name(start))
+
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(header)
+        else:
+            # Drop a partial trailing record left by a crash
+            body = self._file.tell() - len(header)
+            self._file.truncate(len(header) + body - body % self._record.size)
+            self._file.seek(0, os.SEEK_END)
+        self._segment_start = start
+
+        self._start_compaction()
+
+    def append_values(self, timestamp: float, values: Iterable[float]):
+        """Append one record (values ordered as FIELD_NAMES)"""
+        if self._file is None or timestamp >= self._segment_start + SEGMENT_SECONDS:
+            self._open_segment(timestamp)
+        self._file.write(self._record.pack(timestamp, *values))
+        self._file.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Close the open segment and wait for a compaction in progress"""
+        self._close_file()
+        compaction = self._compaction
+        if compaction is not None:
+            compaction.join()
+
+    def _start_compaction(self):
+        """Compact on a background thread, so rotation never stalls the sampling thread"""
+        if self._compaction is not None and self._compaction.is_alive():
+            return
+        self._compaction = threading.Thread(target=self._compact_logged, name='disk-store-compaction', daemon=True)
+        self._compaction.start()
+
+    def _compact_logged(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"Disk store compaction failed in {self.directory}: {e!r}")
+
+    def view(self, start: Optional[float] = None, end: Optional[float] = None,
+             latest: Optional[Dict] = None) -> StoreView:
+        """mmap-backed view of the records within [start, end]"""
+        segments = self.segments()
+        parts = []
+        for i, (seg_start, path) in enumerate(segments):
+            next_start = segments[i + 1][0] if i + 1 < len(segments) else float('inf')
+            if end is not None and seg_start > end:
+                break
+            if start is not None and next_start <= start:
+                continue
+            records = _map_segment(path)
+            if records is not None:
+                parts.append(records)
+        return StoreView(parts, latest).copy(start, end)
+
+    def load_recent(self, store: MetricStore):
+        """Fill an in-memory store with the newest records that fit in it"""
+        parts = []
+        needed = store.capacity
+        for _, path in reversed(self.segments()):
+            records = _map_segment(path)
+            if records is None:
+                continue
+            parts.insert(0, records[-needed:])
+            needed -= len(parts[0])
+            if needed <= 0:
+                break
+
+        view = StoreView(parts)
+        columns = view.query()
+        for i, timestamp in enumerate(columns['timestamp']):
+            store.append_values(timestamp, [columns[name][i] for name in FIELD_NAMES])
+
+    def compact(self, now: Optional[float] = None):
+        """Merge old hourly segments into daily ones and drop expired segments"""
+        now = time.time() if now is None else now
+        segments = self.segments()
+
+        # Retention: a segment expires once the following one starts before the cutoff
+        cutoff = now - self.retention_seconds
+        for i, (_, path) in enumerate(segments[:-1]):
+            if segments[i + 1][0] <= cutoff:
+                _remove(path)
+        segments = [s for s in segments if os.path.exists(s[1])]
+
+        # Group the segments of days that ended more than COMPACT_AFTER_SECONDS ago,
+        # so each day is merged once rather than at every rotation
+        by_day: Dict[int, List[Tuple[int, str]]] = {}
+        for start, path in segments:
+            day = start // COMPACT_SEGMENT_SECONDS * COMPACT_SEGMENT_SECONDS
+            if day + COMPACT_SEGMENT_SECONDS > now - COMPACT_AFTER_SECONDS or start == self._segment_start:
+                continue
+            by_day.setdefault(day, []).append((start, path))
+
+        for day, group in by_day.items():
+            if len(group) < 2:
+                continue
+            records = [r for r in (_map_segment(path) for _, path in group) if r is not None]
+            if not records:
+                continue
+            rows = np.concatenate([_rows(part) for part in records])
+            # A merge interrupted after the replace leaves copies of some records in the
+            # hourly files; keep one of each timestamp (np.unique also sorts them)
+            _, first = np.unique(rows[:, 0], return_index=True)
+            target = os.path.join(self.directory, _segment_name(day))
+            tmp_path = target + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(_encode_header(FIELD_NAMES))
+                f.write(rows[first].astype('<f8').tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, target)
+            _fsync_directory(self.directory)
+            for _, path in group:
+                if path != target:
+                    _remove(path)
+
+    def disk_usage(self) -> Dict:
+        """Segment count and bytes on disk for /api/status"""
+        segments = self.segments()
+        return {
+            'directory': self.directory,
+            'segments': len(segments),
+            'bytes': sum(os.path.getsize(path) for _, path in segments)
+        }
@@ -0,0 +1,122 @@
+"""
+Downsampling
+Reduces a time series to a point budget for charts: Largest-Triangle-Three-Buckets
+for the line shape plus per-bucket min/max envelopes so spikes are never lost
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    """Start indices of `buckets` contiguous buckets over n points, plus n"""
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: keep `threshold` points that preserve the visual shape"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    edges = _bucket_edges(n - 2, threshold - 2) + 1
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Twice the triangle area between point a, each candidate and the next bucket's average
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return x[selected], y[selected]
+
+
+def minmax_envelope(x: Sequence[float], y: Sequence[float], buckets: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-bucket (mean x, min y, max y) over `buckets` equal-count buckets"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+
+    if n == 0:
+        return x, y, y
+    if buckets >= n:
+        return x, y, y
+
+    starts = _bucket_edges(n, buckets)[:-1]
+    counts = np.diff(np.append(starts, n))
+    centers = np.add.reduceat(x, starts) / counts
+    return centers, np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+
+def downsample(x: Sequence[float], y: Sequence[float], points: int) -> Dict[str, np.ndarray]:
+    """LTTB line plus min/max envelope, each at most `points` long"""
+    line_x, line_y = lttb(x, y, points)
+    env_x, env_min, env_max = minmax_envelope(x, y, points)
+    return {
+        'timestamps': line_x,
+        'values': line_y,
+        'envelope_timestamps': env_x,
+        'min': env_min,
+        'max': env_max
+    }
+
+
+def bucket_envelope(chunks: Iterable[Dict], metrics: List[str], start: float, end: float,
+                    buckets: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """downsample() output per metric from a single pass over column blocks.
+
+    For series too long to hold in memory: [start, end] is split into
+    `buckets` equal time buckets, each keeping its mean x and mean/min/max
+    y, so the line is the bucket mean rather than an LTTB selection.
+    Blocks must be in timestamp order (as MetricStore/StoreView.chunks yield them).
+    """
+    width = (end - start) / buckets or 1.0
+    counts = np.zeros(buckets)
+    x_sums = np.zeros(buckets)
+    sums = {name: np.zeros(buckets) for name in metrics}
+    mins = {name: np.full(buckets, np.inf) for name in metrics}
+    maxs = {name: np.full(buckets, -np.inf) for name in metrics}
+
+    for chunk in chunks:
+        x = np.asarray(chunk['timestamp'], dtype=np.float64)
+        if not len(x):
+            continue
+        index = np.clip(((x - start) / width).astype(np.int64), 0, buckets - 1)
+        starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        # Sorted input: every bucket appears once per block, so fancy-index updates are safe
+        keys = index[starts]
+        counts[keys] += np.diff(np.r_[starts, len(x)])
+        x_sums[keys] += np.add.reduceat(x, starts)
+        for name in metrics:
+            y = np.asarray(chunk[name], dtype=np.float64)
+            sums[name][keys] += np.add.reduceat(y, starts)
+            mins[name][keys] = np.minimum(mins[name][keys], np.minimum.reduceat(y, starts))
+            maxs[name][keys] = np.maximum(maxs[name][keys], np.maximum.reduceat(y, starts))
+
+    filled = counts > 0
+    centers = x_sums[filled] / counts[filled]
+    return {
+        name: {
+            'timestamps': centers,
+            'values': sums[name][filled] / counts[filled],
+            'envelope_timestamps': centers,
+            'min': mins[name][filled],
+            'max': maxs[name][filled]
+        }
+        for name in metrics
+    }
@@ -0,0 +1,338 @@
+"""
+Fleet Aggregator
+Receives batched samples from remote agents (see agent.py) and keeps a
+history store per host
+
+Agents hold one persistent TCP connection and send length-prefixed
+messages, each a zlib-compressed body:
+
+    uint8 kind | uint32 payload length | zlib(body)
+
+    HELLO  body = JSON {"host": name, "fields": [FIELD_NAMES...]}
+    BATCH  body = uint32 JSON length | JSON latest frame | float64 rows
+
+A row is timestamp followed by the agent's fields. The aggregator maps the
+agent's field order onto its own FIELD_NAMES, so agents and aggregator
+of different versions can still talk. All connections are served by one
+selector thread, so hundreds of agents cost one thread and a small
+receive buffer each.
+"""
+
+import json
+import os
+import re
+import selectors
+import socket
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from metrics_store import FIELD_NAMES, MetricStore
+from disk_store import DiskStore
+from rollups import RollupEngine
+
+DEFAULT_PORT = 5002
+
+HELLO = 1
+BATCH = 2
+
+_FRAME = struct.Struct('<BI')
+_JSON_LENGTH = struct.Struct('<I')
+
+# Largest accepted message, compressed or decompressed; anything bigger drops the connection
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# One hour per host at a 1 s agent tick
+HOST_CAPACITY = 3600
+
+# Hosts without a batch for this long are reported as stale
+STALE_SECONDS = 30
+
+
+def encode_message(kind: int, body: bytes) -> bytes:
+    payload = zlib.compress(body)
+    return _FRAME.pack(kind, len(payload)) + payload
+
+
+def encode_hello(host: str, fields: List[str] = FIELD_NAMES) -> bytes:
+    return encode_message(HELLO, json.dumps({'host': host, 'fields': fields}).encode('utf-8'))
+
+
+def encode_batch(rows: List[List[float]], latest: Optional[Dict]) -> bytes:
+    """rows are [timestamp, *values]; latest is the newest full frame (may be None)"""
+    frame = json.dumps(latest).encode('utf-8')
+    body = _JSON_LENGTH.pack(len(frame)) + frame + np.asarray(rows, dtype='<f8').tobytes()
+    return encode_message(BATCH, body)
+
+
+def decompress_body(payload: bytes, limit: int = MAX_MESSAGE_BYTES) -> bytes:
+    """Inflate one message body, refusing to produce more than `limit` bytes"""
+    inflater = zlib.decompressobj()
+    body = inflater.decompress(payload, limit)
+    if inflater.unconsumed_tail:
+        raise ValueError(f"message inflates beyond {limit} bytes")
+    if not inflater.eof:
+        raise ValueError('truncated message')
+    return body
+
+
+def _safe_name(host: str) -> str:
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', host)[:128] or 'unknown'
+
+
+class HostState:
+    """History, rollups and latest frame of one monitored host"""
+
+    def __init__(self, name: str, capacity: int = HOST_CAPACITY, data_dir: Optional[str] = None):
+        self.name = name
+        self.store = MetricStore(capacity)
+        directory = os.path.join(data_dir, 'hosts', _safe_name(name)) if data_dir else None
+        self.disk_store = DiskStore(directory) if directory else None
+        if self.disk_store:
+            self.disk_store.load_recent(self.store)
+        self.rollups = RollupEngine(directory)
+        self.lock = threading.Lock()
+        self.address = None
+        self.connected = False
+        self.last_seen = None
+        self.batches = 0
+        self.samples = 0
+
+    def add_rows(self, rows: np.ndarray, latest: Optional[Dict]):
+        """Append [timestamp, *FIELD_NAMES] rows, skipping any not newer than the store"""
+        with self.lock:
+            last = self.store.last_timestamp
+            for row in rows:
+                timestamp = float(row[0])
+                if last is not None and timestamp <= last:
+                    continue
+                values = row[1:].tolist()
+                self.store.append_values(timestamp, values)
+                if self.disk_store:
+                    self.disk_store.append_values(timestamp, values)
+                self.rollups.add(timestamp, values)
+                last = timestamp
+                self.samples += 1
+            if latest is not None:
+                self.store.latest = latest
+            self.batches += 1
+            self.last_seen = time.time()
+
+    def history(self, start: Optional[float] = None, end: Optional[float] = None):
+        """Copy of the in-memory history, or the on-disk view for older ranges"""
+        with self.lock:
+            first = self.store.first_timestamp
+            if self.disk_store and start is not None and (first is None or start < first):
+                return self.disk_store.view(start, end, self.store.latest)
+            return self.store.copy(start, end)
+
+    def summary(self) -> Dict:
+        latest = self.store.latest or {}
+        return {
+            'host': self.name,
+            'address': self.address,
+            'connected': self.connected,
+            'stale': self.last_seen is None or time.time() - self.last_seen > STALE_SECONDS,
+            'last_seen': self.last_seen,
+            'samples': len(self.store),
+            'batches': self.batches,
+            'cpu_percent': latest.get('cpu', {}).get('percent'),
+            'memory_percent': latest.get('memory', {}).get('virtual', {}).get('percent')
+        }
+
+    def close(self):
+        if self.disk_store:
+            self.disk_store.close()
+
+
+class _Connection:
+    """Receive buffer and handshake state of one agent socket"""
+
+    __slots__ = ('sock', 'address', 'buffer', 'host', 'columns', 'width')
+
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        self.buffer = bytearray()
+        self.host: Optional[HostState] = None
+        self.columns = None
+        self.width = 0
+
+
+class FleetAggregator:
+    """Accepts agent connections and routes their batches into per-host stores"""
+
+    def __init__(self, bind: str = '0.0.0.0', port: int = DEFAULT_PORT,
+                 data_dir: Optional[str] = None, capacity: int = HOST_CAPACITY,
+                 on_batch: Optional[Callable[[HostState], None]] = None):
+        self.bind = bind
+        self.port = port
+        self.data_dir = data_dir
+        self.capacity = capacity
+        self.on_batch = on_batch
+        self.hosts: Dict[str, HostState] = {}
+        self._hosts_lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._server = None
+        self._thread = None
+        self._running = False
+        self.connections = 0
+        self.bytes_received = 0
+        self.batches = 0
+        self.samples = 0
+
+    def start(self) -> int:
+        """Listen and serve in a daemon thread; returns the bound port"""
+        self._server = socket.create_server((self.bind, self.port), backlog=1024)
+        self._server.setblocking(False)
+        self.port = self._server.getsockname()[1]
+        self._selector.register(self._server, selectors.EVENT_READ)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='fleet-aggregator', daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+        for host in self.hosts.values():
+            host.close()
+
+    def _serve(self):
+        while self._running:
+            for key, _ in self._selector.select(timeout=0.5):
+                if key.data is None:
+                    self._accept()
+                else:
+                    self._receive(key.data)
+
+    def _accept(self):
+        try:
+            sock, address = self._server.accept()
+        except BlockingIOError:
+            return
+        except OSError as e:
+            # Out of descriptors and the like: keep serving the agents already connected
+            print(f"Fleet accept failed: {e!r}")
+            return
+        sock.setblocking(False)
+        self._selector.register(sock, selectors.EVENT_READ, _Connection(sock, address))
+        self.connections += 1
+
+    def _drop(self, conn: _Connection):
+        self._selector.unregister(conn.sock)
+        conn.sock.close()
+        self.connections -= 1
+        if conn.host:
+            conn.host.connected = False
+
+    def _receive(self, conn: _Connection):
+        try:
+            chunk = conn.sock.recv(256 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            chunk = b''
+        if not chunk:
+            self._drop(conn)
+            return
+
+        self.bytes_received += len(chunk)
+        conn.buffer += chunk
+
+        offset = 0
+        try:
+            while len(conn.buffer) - offset >= _FRAME.size:
+                kind, length = _FRAME.unpack_from(conn.buffer, offset)
+                if length > MAX_MESSAGE_BYTES:
+                    raise ValueError(f"message of {length} bytes")
+                end = offset + _FRAME.size + length
+                if len(conn.buffer) < end:
+                    break
+                body = decompress_body(bytes(conn.buffer[offset + _FRAME.size:end]))
+                offset = end
+                self._handle(conn, kind, body)
+        except Exception as e:
+            # Whatever one agent sends costs only its own connection, never the serving thread
+            print(f"Dropping agent {conn.address}: {e!r}")
+            self._drop(conn)
+            return
+        del conn.buffer[:offset]
+
+    def _handle(self, conn: _Connection, kind: int, body: bytes):
+        if kind == HELLO:
+            hello = json.loads(body)
+            if not isinstance(hello, dict) or 'host' not in hello:
+                raise ValueError('hello is not an object with a host')
+            fields = hello.get('fields', FIELD_NAMES)
+            if not isinstance(fields, list) or not all(isinstance(name, str) for name in fields):
+                raise ValueError('hello fields are not a list of names')
+            conn.host = self.get_or_create(str(hello['host']))
+            conn.host.address = conn.address
+            conn.host.connected = True
+            # Column in the agent row for each local field (None when the agent lacks it)
+            conn.columns = [fields.index(name) + 1 if name in fields else None for name in FIELD_NAMES]
+            conn.width = len(fields) + 1
+        elif kind == BATCH:
+            if conn.host is None:
+                raise ValueError('batch before hello')
+            if len(body) < _JSON_LENGTH.size:
+                raise ValueError(f"batch of {len(body)} bytes")
+            (frame_length,) = _JSON_LENGTH.unpack_from(body)
+            start = _JSON_LENGTH.size
+            if start + frame_length > len(body):
+                raise ValueError(f"batch frame of {frame_length} bytes overruns the body")
+            latest = json.loads(body[start:start + frame_length])
+            if latest is not None and not isinstance(latest, dict):
+                raise ValueError('batch frame is not an object')
+            raw = np.frombuffer(body, dtype='<f8', offset=start + frame_length)
+            raw = raw[:len(raw) // conn.width * conn.width].reshape(-1, conn.width)
+
+            rows = np.zeros((len(raw), len(FIELD_NAMES) + 1))
+            rows[:, 0] = raw[:, 0]
+            for i, column in enumerate(conn.columns):
+                if column is not None:
+                    rows[:, i + 1] = raw[:, column]
+
+            conn.host.add_rows(rows, latest)
+            self.batches += 1
+            self.samples += len(rows)
+            if self.on_batch:
+                # The rows are stored; a failing listener must not cost the agent its connection
+                try:
+                    self.on_batch(conn.host)
+                except Exception as e:
+                    print(f"Fleet batch listener failed for {conn.host.name}: {e!r}")
+        else:
+            raise ValueError(f"unknown message kind {kind}")
+
+    def get_or_create(self, name: str) -> HostState:
+        with self._hosts_lock:
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = HostState(name, self.capacity, self.data_dir)
+            return host
+
+    def get(self, name: str) -> Optional[HostState]:
+        return self.hosts.get(name)
+
+    def list_hosts(self) -> List[Dict]:
+        return [host.summary() for host in sorted(self.hosts.values(), key=lambda h: h.name)]
+
+    def stats(self) -> Dict:
+        return {
+            'port': self.port,
+            'hosts': len(self.hosts),
+            'connections': self.connections,
+            'batches': self.batches,
+            'samples': self.samples,
+            'bytes_received': self.bytes_received
+        }
@@ -0,0 +1,245 @@
+"""
+Packed Frame Codec
+Fixed-schema binary encoding of the scalar metrics in a system_data frame
+
+A packed frame is a little-endian struct:
+
+    uint32 seq | float64 timestamp | PACKED_FIELDS values | uint16 n | float32 x n per-core %
+        | per PACKED_TABLES entry: uint16 rows | float32 x rows x keys
+
+The rest of the frame is sent as JSON in two parts, each only when it
+changes:
+
+- structure: core counts, interfaces and the device names of the tables,
+  which change only when devices come or go;
+- details: the DETAIL_SECTIONS (processes, temperature readings, partition
+  usage, plugin results), which change whenever their collector runs; a
+  details message carries only the sections that changed.
+
+Derived unit fields (``*_gb``, ``*_mb``, ``mb_*``, ``*_mbps``) are stripped
+and recomputed by the client.
+"""
+
+import copy
+import struct
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from io_counters import DISK_RATE_KEYS, NIC_RATE_KEYS
+
+# (dotted path, struct code): 'd' for byte counters, 'f' for percentages and rates
+PACKED_FIELDS: List[Tuple[str, str]] = [
+    ('cpu.percent', 'f'),
+    ('cpu.frequency.current', 'f'),
+    ('memory.virtual.total', 'd'),
+    ('memory.virtual.available', 'd'),
+    ('memory.virtual.used', 'd'),
+    ('memory.virtual.percent', 'f'),
+    ('memory.swap.total', 'd'),
+    ('memory.swap.used', 'd'),
+    ('memory.swap.percent', 'f'),
+    ('disk.io.read_bytes', 'd'),
+    ('disk.io.write_bytes', 'd'),
+    ('disk.io.read_kbps', 'f'),
+    ('disk.io.write_kbps', 'f'),
+    ('disk.io.read_iops', 'f'),
+    ('disk.io.write_iops', 'f'),
+    ('network.total.bytes_sent', 'd'),
+    ('network.total.bytes_recv', 'd'),
+    ('network.total.packets_sent', 'd'),
+    ('network.total.packets_recv', 'd'),
+    ('network.speed.upload_kbps', 'f'),
+    ('network.speed.download_kbps', 'f'),
+]
+
+PER_CORE_PATH = 'cpu.percent_per_core'
+
+# Per-device lists whose rates change every tick: (dotted path, packed keys of each row).
+# The rows (with their names) stay in the structure, the rates are packed.
+PACKED_TABLES: List[Tuple[str, List[str]]] = [
+    ('disk.io.disks', DISK_RATE_KEYS),
+    ('network.nics', NIC_RATE_KEYS),
+]
+_TABLE_KEYS = {path: set(keys) for path, keys in PACKED_TABLES}
+
+# Sections refreshed by the slower collectors: sent as details, not structure
+DETAIL_SECTIONS = ['processes', 'temperature', 'disk.partitions', 'plugins']
+
+_HEADER = struct.Struct('<Id')
+_FIELDS = struct.Struct('<' + ''.join(code for _, code in PACKED_FIELDS))
+_COUNT = struct.Struct('<H')
+
+# Derived fields recomputed on the client: path suffix -> (source key, divisor)
+_GB = 1024 ** 3
+_MB = 1024 ** 2
+DERIVED_FIELDS = {
+    'total_gb': ('total', _GB),
+    'used_gb': ('used', _GB),
+    'available_gb': ('available', _GB),
+    'free_gb': ('free', _GB),
+    'read_mb': ('read_bytes', _MB),
+    'write_mb': ('write_bytes', _MB),
+    'mb_sent': ('bytes_sent', _MB),
+    'mb_recv': ('bytes_recv', _MB),
+    'upload_mbps': ('upload_kbps', 128),
+    'download_mbps': ('download_kbps', 128),
+}
+
+
+def _get(frame: Dict, path: str) -> Any:
+    node = frame
+    for part in path.split('.'):
+        node = node[part]
+    return node
+
+
+def _set(frame: Dict, path: str, value: Any):
+    *parents, leaf = path.split('.')
+    node = frame
+    for part in parents:
+        node = node.setdefault(part, {})
+    node[leaf] = value
+
+
+_SKIPPED_PATHS = {path for path, _ in PACKED_FIELDS} | {PER_CORE_PATH, 'timestamp'} | set(DETAIL_SECTIONS)
+
+
+def _copy_structure(node: Any, prefix: str = '') -> Any:
+    """Copy node without packed paths and derived fields"""
+    if isinstance(node, dict):
+        return {
+            key: _copy_structure(value, f"{prefix}{key}.")
+            for key, value in node.items()
+            if key not in DERIVED_FIELDS and f"{prefix}{key}" not in _SKIPPED_PATHS
+        }
+    if isinstance(node, list):
+        packed = _TABLE_KEYS.get(prefix[:-1])
+        if packed:
+            return [{key: value for key, value in row.items() if key not in packed} for row in node]
+        # Keys inside list items are never top-level paths
+        return [_copy_structure(item, f"{prefix}[].") for item in node]
+    return node
+
+
+def _table(frame: Dict, path: str) -> List[Dict]:
+    try:
+        return _get(frame, path)
+    except (KeyError, TypeError):
+        return []
+
+
+def _restore_derived(node: Any):
+    if isinstance(node, dict):
+        for key, (source, divisor) in DERIVED_FIELDS.items():
+            if key not in node and isinstance(node.get(source), (int, float)):
+                node[key] = round(node[source] / divisor, 2)
+        for value in node.values():
+            _restore_derived(value)
+    elif isinstance(node, list):
+        for item in node:
+            _restore_derived(item)
+
+
+def frame_structure(frame: Dict) -> Dict:
+    """The frame minus packed scalars, per-core list, detail sections and derived fields"""
+    return _copy_structure(frame)
+
+
+def frame_details(frame: Dict) -> Dict[str, Any]:
+    """{dotted path: section} of the DETAIL_SECTIONS present in frame"""
+    details = {}
+    for path in DETAIL_SECTIONS:
+        try:
+            details[path] = _copy_structure(_get(frame, path), path + '.')
+        except (KeyError, TypeError):
+            continue
+    return details
+
+
+def pack_frame(seq: int, frame: Dict) -> bytes:
+    """Encode the scalar metrics of frame as a packed binary record"""
+    timestamp = datetime.fromisoformat(frame['timestamp']).timestamp()
+    values = [_get(frame, path) or 0 for path, _ in PACKED_FIELDS]
+    per_core = _get(frame, PER_CORE_PATH)
+
+    parts = [
+        _HEADER.pack(seq, timestamp),
+        _FIELDS.pack(*values),
+        _COUNT.pack(len(per_core)),
+        struct.pack(f'<{len(per_core)}f', *per_core)
+    ]
+    for path, keys in PACKED_TABLES:
+        rows = _table(frame, path)
+        parts.append(_COUNT.pack(len(rows)))
+        parts.append(struct.pack(f'<{len(rows) * len(keys)}f', *[row.get(key) or 0 for row in rows for key in keys]))
+    return b''.join(parts)
+
+
+def unpack_frame(payload: bytes, structure: Dict, details: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict]:
+    """Decode a packed record on top of the structure and details messages (reference decoder)"""
+    seq, timestamp = _HEADER.unpack_from(payload, 0)
+    offset = _HEADER.size
+    values = _FIELDS.unpack_from(payload, offset)
+    offset += _FIELDS.size
+    (count,) = _COUNT.unpack_from(payload, offset)
+    offset += _COUNT.size
+    per_core = struct.unpack_from(f'<{count}f', payload, offset)
+    offset += 4 * count
+
+    frame = copy.deepcopy(structure)
+    for path, section in copy.deepcopy(details or {}).items():
+        _set(frame, path, section)
+    frame['timestamp'] = datetime.fromtimestamp(timestamp).isoformat()
+    for (path, _), value in zip(PACKED_FIELDS, values):
+        _set(frame, path, value)
+    _set(frame, PER_CORE_PATH, list(per_core))
+    for path, keys in PACKED_TABLES:
+        (rows,) = _COUNT.unpack_from(payload, offset)
+        offset += _COUNT.size
+        table = _table(frame, path)
+        for i in range(rows):
+            row = struct.unpack_from(f'<{len(keys)}f', payload, offset)
+            offset += 4 * len(keys)
+            if i < len(table):
+                table[i].update(zip(keys, row))
+    _restore_derived(frame)
+    return seq, frame
+
+
+class PackedEncoder:
+    """Packs each frame and emits the structure and details parts only when they change.
+
+    Like DeltaEncoder, the state snapshot() returns is replaced as a whole
+    under a lock, so a resync never mixes parts of two frames.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.structure = None
+        self.details = None
+        self.packed = None
+        self._lock = threading.Lock()
+
+    def encode(self, frame: Dict) -> Tuple[bytes, Optional[Dict], Optional[Dict]]:
+        """Return (packed record, structure if changed else None, changed detail sections or None)"""
+        seq = self.seq + 1
+        structure = frame_structure(frame)
+        details = frame_details(frame)
+        structure_changed = structure != self.structure
+        previous = self.details or {}
+        changed = {path: section for path, section in details.items() if previous.get(path) != section}
+        packed = pack_frame(seq, frame)
+        with self._lock:
+            self.seq = seq
+            self.structure = structure
+            self.details = details
+            self.packed = packed
+        return packed, structure if structure_changed else None, changed or None
+
+    def snapshot(self) -> Optional[Tuple[bytes, Dict, Dict]]:
+        """Latest (packed record, structure, details) for a newly subscribed client"""
+        with self._lock:
+            if self.packed is None:
+                return None
+            return self.packed, self.structure, self.details
@@ -0,0 +1,120 @@
+"""
+Frame Delta Encoding
+Computes compact path-keyed patches between consecutive system_data frames
+
+A path joins the keys (and list indices) down to a value with '.'. Keys are
+escaped as in JSON Pointer, '~' as '~0' and '.' as '~1', so plugin keys
+that contain dots stay one path segment.
+"""
+
+import copy
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+PATH_SEPARATOR = '.'
+
+
+def escape_key(key: Any) -> str:
+    return str(key).replace('~', '~0').replace(PATH_SEPARATOR, '~1')
+
+
+def unescape_key(part: str) -> str:
+    return part.replace('~1', PATH_SEPARATOR).replace('~0', '~')
+
+
+def split_path(path: str) -> List[str]:
+    return [unescape_key(part) for part in path.split(PATH_SEPARATOR)]
+
+
+def diff_frames(old: Any, new: Any, prefix: str = '') -> Tuple[Dict[str, Any], List[str]]:
+    """Return (changed, removed): dotted paths whose values changed or disappeared.
+
+    Dicts and equal-length lists are compared element by element; a list
+    whose length changed is replaced as a whole.
+    """
+    changed: Dict[str, Any] = {}
+    removed: List[str] = []
+
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key, value in new.items():
+            path = f"{prefix}{escape_key(key)}"
+            if key not in old:
+                changed[path] = value
+            else:
+                sub_changed, sub_removed = diff_frames(old[key], value, path + PATH_SEPARATOR)
+                changed.update(sub_changed)
+                removed.extend(sub_removed)
+        removed.extend(f"{prefix}{escape_key(key)}" for key in old if key not in new)
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for index, (old_item, new_item) in enumerate(zip(old, new)):
+            sub_changed, sub_removed = diff_frames(old_item, new_item, f"{prefix}{index}{PATH_SEPARATOR}")
+            changed.update(sub_changed)
+            removed.extend(sub_removed)
+    elif old != new or type(old) is not type(new):
+        changed[prefix[:-len(PATH_SEPARATOR)]] = new
+
+    return changed, removed
+
+
+def _walk(frame: Any, parts: List[str]) -> Any:
+    node = frame
+    for part in parts:
+        node = node[int(part)] if isinstance(node, list) else node[part]
+    return node
+
+
+def apply_delta(frame: Dict, changed: Dict[str, Any], removed: Optional[List[str]] = None) -> Dict:
+    """Apply a patch produced by diff_frames to a copy of frame"""
+    frame = copy.deepcopy(frame)
+
+    for path, value in changed.items():
+        *parents, leaf = split_path(path)
+        node = _walk(frame, parents)
+        if isinstance(node, list):
+            node[int(leaf)] = value
+        else:
+            node[leaf] = value
+
+    for path in removed or []:
+        *parents, leaf = split_path(path)
+        _walk(frame, parents).pop(leaf, None)
+
+    return frame
+
+
+class DeltaEncoder:
+    """Turns a stream of full frames into a snapshot plus sequenced deltas.
+
+    encode() runs on the monitoring thread and snapshot() on socket handler
+    threads; seq and frame change together under a lock, so a snapshot never
+    pairs a new seq with the previous frame.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self.frame = None
+        self._lock = threading.Lock()
+
+    def encode(self, frame: Dict) -> Dict:
+        """Advance to frame and return the delta message against the previous one"""
+        if self.frame is None:
+            changed, removed = dict(frame), []
+        else:
+            changed, removed = diff_frames(self.frame, frame)
+
+        with self._lock:
+            self.seq += 1
+            self.frame = frame
+            seq = self.seq
+
+        message = {'seq': seq, 'set': changed}
+        if removed:
+            message['del'] = removed
+        return message
+
+    def snapshot(self) -> Optional[Dict]:
+        """Full-state message a client can resync from"""
+        with self._lock:
+            if self.frame is None:
+                return None
+            return {'seq': self.seq, 'data': self.frame}
@@ -0,0 +1,211 @@
+"""
+Self Instrumentation
+Timing histograms and gauges for the monitor's own cost, rendered in the
+Prometheus text exposition format, plus a one-tick cProfile capture
+"""
+
+import cProfile
+import io
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Upper bounds in seconds: 100 us .. 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rows of pstats output kept from a profiled tick
+PROFILE_ROWS = 40
+
+
+class _Series:
+    """Bucket counts, sum and max of one label combination"""
+
+    __slots__ = ('counts', 'sum', 'count', 'max')
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one series per label value"""
+
+    def __init__(self, name: str, help_text: str, label: Optional[str] = None,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = buckets
+        self.series: Dict[Optional[str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, label_value: Optional[str] = None):
+        with self._lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = _Series(len(self.buckets) + 1)
+            series.counts[bisect_left(self.buckets, value)] += 1
+            series.sum += value
+            series.count += 1
+            if value > series.max:
+                series.max = value
+
+    @contextmanager
+    def time(self, label_value: Optional[str] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, label_value)
+
+    def _quantile(self, series: _Series, q: float) -> float:
+        """Upper bound of the bucket holding quantile q (capped at the observed max)"""
+        rank = q * series.count
+        seen = 0
+        for bound, count in zip(self.buckets, series.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, series.max)
+        return series.max
+
+    def summary(self) -> Dict:
+        """count/avg/p50/p95/max in milliseconds per label value"""
+        with self._lock:
+            return {
+                str(label): {
+                    'count': s.count,
+                    'avg_ms': round(s.sum / s.count * 1000, 3) if s.count else 0.0,
+                    'p50_ms': round(self._quantile(s, 0.5) * 1000, 3),
+                    'p95_ms': round(self._quantile(s, 0.95) * 1000, 3),
+                    'max_ms': round(s.max * 1000, 3)
+                }
+                for label, s in self.series.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self.series.items(), key=lambda item: str(item[0])):
+                labels = f'{self.label}="{label_value}"' if self.label else ''
+                sep = ',' if labels else ''
+                cumulative = 0
+                for bound, count in zip(self.buckets, series.counts):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{labels}{sep}le="+Inf"}} {series.count}')
+                suffix = f'{{{labels}}}' if labels else ''
+                lines.append(f'{self.name}_sum{suffix} {series.sum:.9f}')
+                lines.append(f'{self.name}_count{suffix} {series.count}')
+        return lines
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, func: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.func = func
+
+    def value(self) -> Optional[float]:
+        try:
+            return float(self.func())
+        except Exception:
+            return None
+
+    def render(self) -> List[str]:
+        value = self.value()
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+
+class Registry:
+    """Named histograms and gauges exposed together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+
+    def histogram(self, name: str, help_text: str, label: Optional[str] = None) -> Histogram:
+        if name not in self.metrics:
+            self.metrics[name] = Histogram(name, help_text, label)
+        return self.metrics[name]
+
+    def gauge(self, name: str, help_text: str, func: Callable[[], float]) -> Gauge:
+        self.metrics[name] = Gauge(name, help_text, func)
+        return self.metrics[name]
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        """Histogram summaries and gauge values for /api/status"""
+        result = {}
+        for name, metric in self.metrics.items():
+            result[name] = metric.summary() if isinstance(metric, Histogram) else metric.value()
+        return result
+
+
+REGISTRY = Registry()
+
+COLLECTOR_SECONDS = REGISTRY.histogram(
+    'monitor_collector_seconds', 'Time spent in each get_*_info collector', 'collector')
+EMIT_SECONDS = REGISTRY.histogram(
+    'monitor_emit_seconds', 'Time spent encoding and emitting frames per protocol', 'event')
+COLLECT_SECONDS = REGISTRY.histogram(
+    'monitor_collect_seconds', 'Time for one collection pass over the due collectors')
+QUEUE_SECONDS = REGISTRY.histogram(
+    'monitor_frame_queue_seconds', 'Time a collected frame waits before it is emitted')
+TICK_SECONDS = REGISTRY.histogram(
+    'monitor_tick_seconds', 'Time to encode and emit one collected frame')
+REPORT_STAGE_SECONDS = REGISTRY.histogram(
+    'monitor_report_stage_seconds', 'Time spent in each PDF report stage', 'stage')
+
+
+class TickProfiler:
+    """Captures a cProfile of the next tick once requested"""
+
+    def __init__(self, rows: int = PROFILE_ROWS):
+        self.rows = rows
+        self._armed = threading.Event()
+        self.result: Optional[Dict] = None
+
+    def request(self):
+        self._armed.set()
+
+    @property
+    def pending(self) -> bool:
+        return self._armed.is_set()
+
+    @contextmanager
+    def maybe_profile(self):
+        """Profile the enclosed block if a capture was requested"""
+        if not self._armed.is_set():
+            yield
+            return
+
+        self._armed.clear()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(self.rows)
+            self.result = {
+                'captured': time.time(),
+                'duration_ms': round(elapsed * 1000, 3),
+                'stats': out.getvalue()
+            }
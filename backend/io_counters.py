@@ -0,0 +1,143 @@
+"""
+I/O Counter Rates
+Per-disk and per-interface rates from cumulative I/O counters
+
+psutil's disk and network counters are totals since boot. CounterRates turns
+two readings into per-second rates, keeping the previous reading separately
+for each consumer (so an extra on-demand sample does not shorten the
+interval another consumer measures over) and stamping readings with
+time.monotonic() (so wall clock steps cannot produce negative or huge rates).
+A reading is shared by every consumer that asks within SNAPSHOT_MAX_AGE,
+which keeps the cost at one counter read per tick.
+
+A counter that goes backwards has either wrapped at 32 bits (some NIC
+drivers and platforms) or been reset (device re-attached, driver reloaded).
+It is unwrapped only when the unwrapped increase is a plausible rate for the
+interval; otherwise it is taken as a reset and contributes nothing.
+"""
+
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+COUNTER_WRAP = 2 ** 32
+
+# Highest per-second increase an unwrapped 32-bit counter may show (10 Gbit/s
+# in bytes; faster links report 64-bit counters). A larger "wrap" is a reset.
+MAX_WRAP_RATE = 1.25e9
+
+# Consumers asking within this many seconds share one counter read
+SNAPSHOT_MAX_AGE = 0.05
+
+# Per-second rates of each disk / interface, as they appear in the frame
+DISK_RATE_KEYS = ['read_iops', 'write_iops', 'read_kbps', 'write_kbps',
+                  'read_latency_ms', 'write_latency_ms', 'busy_percent']
+NIC_RATE_KEYS = ['upload_kbps', 'download_kbps', 'packets_sent_per_sec', 'packets_recv_per_sec',
+                 'errors_per_sec', 'drops_per_sec']
+
+# Partition suffix of a device name; devices ending in a digit use a 'p' separator (nvme0n1p2)
+_PARTITION_SUFFIX = re.compile(r'\d+')
+_PARTITION_SUFFIX_P = re.compile(r'p\d+')
+
+
+def counter_delta(previous: float, current: float, elapsed: float) -> float:
+    """Increase of a cumulative counter over `elapsed` seconds, unwrapping 32-bit wraps and ignoring resets"""
+    if current >= previous:
+        return current - previous
+    if previous < COUNTER_WRAP:
+        unwrapped = current + COUNTER_WRAP - previous
+        if unwrapped <= MAX_WRAP_RATE * elapsed:
+            return unwrapped
+    return 0.0
+
+
+@lru_cache(maxsize=8)
+def partition_names(names: FrozenSet[str]) -> Set[str]:
+    """Names that are partitions of another listed device (sda1 of sda, nvme0n1p2 of nvme0n1)"""
+    return {name for name in names
+            for device in names
+            if name != device and name.startswith(device)
+            and (_PARTITION_SUFFIX_P if device[-1].isdigit() else _PARTITION_SUFFIX).fullmatch(name[len(device):])}
+
+
+class CounterRates:
+    """Deltas of a {key: counters namedtuple} reading since each consumer's previous call"""
+
+    def __init__(self, read: Callable[[], Dict[str, Tuple]], max_age: float = SNAPSHOT_MAX_AGE):
+        self.read = read
+        self.max_age = max_age
+        self._snapshot: Optional[Tuple[float, Dict[str, Tuple]]] = None
+        # consumer -> (reading time, counters, elapsed, deltas) of its last call
+        self._previous: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Tuple[float, Dict[str, Tuple]]:
+        """(monotonic time, counters) of the latest reading, reading again when it is stale"""
+        with self._lock:
+            now = time.monotonic()
+            if self._snapshot is None or now - self._snapshot[0] > self.max_age:
+                self._snapshot = (now, self.read() or {})
+            return self._snapshot
+
+    def deltas(self, consumer: str = 'default') -> Tuple[float, Dict[str, Tuple], Dict[str, Dict[str, float]]]:
+        """(elapsed seconds, counters, {key: {field: increase}}) since this consumer's last call.
+
+        Keys without a previous reading (first call, newly attached devices)
+        are missing from the deltas. Asking again before a new reading is
+        taken returns the previous answer.
+        """
+        now, counters = self.snapshot()
+        with self._lock:
+            last = self._previous.get(consumer)
+            if last is not None and last[0] == now:
+                return last[2], counters, last[3]
+
+            elapsed, deltas = 0.0, {}
+            if last is not None:
+                elapsed = now - last[0]
+                previous = last[1]
+                for key, current in counters.items():
+                    before = previous.get(key)
+                    if before is not None:
+                        deltas[key] = {field: counter_delta(old, new, elapsed)
+                                       for field, old, new in zip(current._fields, before, current)}
+            self._previous[consumer] = (now, counters, elapsed, deltas)
+        return elapsed, counters, deltas
+
+
+def disk_rates(name: str, delta: Dict[str, float], elapsed: float) -> Dict:
+    """IOPS, throughput, average latency and utilisation of one disk over an interval"""
+    reads = delta['read_count']
+    writes = delta['write_count']
+    busy = delta.get('busy_time')
+    return {
+        'name': name,
+        'read_iops': round(reads / elapsed, 1),
+        'write_iops': round(writes / elapsed, 1),
+        'read_kbps': round(delta['read_bytes'] / elapsed / 1024, 2),
+        'write_kbps': round(delta['write_bytes'] / elapsed / 1024, 2),
+        # read_time/write_time are milliseconds spent on the completed requests
+        'read_latency_ms': round(delta.get('read_time', 0) / reads, 2) if reads else 0.0,
+        'write_latency_ms': round(delta.get('write_time', 0) / writes, 2) if writes else 0.0,
+        'busy_percent': round(min(100.0, busy / elapsed / 10), 1) if busy is not None else 0.0
+    }
+
+
+def nic_rates(name: str, delta: Dict[str, float], elapsed: float) -> Dict:
+    """Throughput, packet, error and drop rates of one interface over an interval"""
+    return {
+        'name': name,
+        'upload_kbps': round(delta['bytes_sent'] / elapsed / 1024, 2),
+        'download_kbps': round(delta['bytes_recv'] / elapsed / 1024, 2),
+        'packets_sent_per_sec': round(delta['packets_sent'] / elapsed, 1),
+        'packets_recv_per_sec': round(delta['packets_recv'] / elapsed, 1),
+        'errors_per_sec': round((delta.get('errin', 0) + delta.get('errout', 0)) / elapsed, 2),
+        'drops_per_sec': round((delta.get('dropin', 0) + delta.get('dropout', 0)) / elapsed, 2)
+    }
+
+
+def idle_rates(name: str, keys) -> Dict:
+    """Rates of a device with no previous reading yet"""
+    return {'name': name, **dict.fromkeys(keys, 0.0)}
@@ -0,0 +1,205 @@
+"""
+Metrics Store
+Fixed-capacity columnar ring buffer for scalar time-series metrics
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+def _first(items, key, default=0.0):
+    """Return items[0][key] or a default when the list is empty/missing the key"""
+    try:
+        value = items[0].get(key)
+    except (IndexError, AttributeError, TypeError):
+        return default
+    return value if value else default
+
+
+# Scalar metrics kept per sample: (column name, extractor over a get_all_info() frame)
+FIELDS: List[Tuple[str, Callable[[Dict], float]]] = [
+    ('cpu_percent', lambda d: d['cpu']['percent']),
+    ('cpu_freq', lambda d: d['cpu']['frequency']['current']),
+    ('memory_percent', lambda d: d['memory']['virtual']['percent']),
+    ('memory_used', lambda d: d['memory']['virtual']['used']),
+    ('swap_percent', lambda d: d['memory']['swap']['percent']),
+    ('disk_percent', lambda d: _first(d['disk']['partitions'], 'percent')),
+    ('disk_read_bytes', lambda d: d['disk']['io']['read_bytes']),
+    ('disk_write_bytes', lambda d: d['disk']['io']['write_bytes']),
+    ('disk_read_kbps', lambda d: d['disk']['io']['read_kbps']),
+    ('disk_write_kbps', lambda d: d['disk']['io']['write_kbps']),
+    ('net_bytes_sent', lambda d: d['network']['total']['bytes_sent']),
+    ('net_bytes_recv', lambda d: d['network']['total']['bytes_recv']),
+    ('net_upload_kbps', lambda d: d['network']['speed']['upload_kbps']),
+    ('net_download_kbps', lambda d: d['network']['speed']['download_kbps']),
+    ('cpu_temp', lambda d: _first(d['temperature']['cpu'], 'current')),
+    ('gpu_temp', lambda d: _first(d['temperature']['gpu'], 'temperature')),
+    ('gpu_load', lambda d: _first(d['temperature']['gpu'], 'load')),
+]
+
+FIELD_NAMES = [name for name, _ in FIELDS]
+
+
+def extract_values(data: Dict) -> List[float]:
+    """Scalar metrics of one get_all_info() frame, ordered as FIELD_NAMES"""
+    values = []
+    for _, extract in FIELDS:
+        try:
+            values.append(float(extract(data) or 0.0))
+        except (KeyError, IndexError, TypeError, ValueError):
+            values.append(0.0)
+    return values
+
+
+# Three hours of samples at the default 0.5 second collection tick
+DEFAULT_CAPACITY = 21600
+
+
+class MetricStore:
+    """Ring buffer of typed columns (array('d')) indexed by sample timestamp.
+
+    Appends are O(1) and overwrite the oldest sample once ``capacity`` is
+    reached. Timestamps are epoch seconds kept non-decreasing, which lets
+    range queries binary-search the buffer: a sample stamped earlier than the
+    previous one (the wall clock stepped back) is stored at the previous
+    sample's timestamp.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._columns = {name: array('d', bytes(8 * capacity)) for name in FIELD_NAMES}
+        self._start = 0
+        self._size = 0
+        self.latest = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, data: Dict) -> List[float]:
+        """Append the scalar metrics of one get_all_info() frame and return them"""
+        values = extract_values(data)
+        self.append_values(timestamp, values)
+        self.latest = data
+        return values
+
+    def append_values(self, timestamp: float, values: Iterable[float]):
+        """Append a row of column values ordered as FIELD_NAMES"""
+        if self._size:
+            timestamp = max(timestamp, self._timestamp_at(self._size - 1))
+        if self._size < self.capacity:
+            pos = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            pos = self._start
+            self._start = (self._start + 1) % self.capacity
+
+        self._timestamps[pos] = timestamp
+        for name, value in zip(FIELD_NAMES, values):
+            self._columns[name][pos] = value
+
+    def clear(self):
+        """Drop all samples (allocated columns are reused)"""
+        self._start = 0
+        self._size = 0
+        self.latest = None
+
+    def _timestamp_at(self, index: int) -> float:
+        return self._timestamps[(self._start + index) % self.capacity]
+
+    def _bisect(self, timestamp: float, right: bool) -> int:
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._timestamp_at(mid)
+            if value < timestamp or (right and value == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def index_range(self, start: Optional[float] = None, end: Optional[float] = None) -> Tuple[int, int]:
+        """Logical [lo, hi) sample indices with start <= timestamp <= end"""
+        lo = 0 if start is None else self._bisect(start, right=False)
+        hi = self._size if end is None else self._bisect(end, right=True)
+        return lo, max(lo, hi)
+
+    def _slice(self, column: array, lo: int, hi: int) -> array:
+        first = (self._start + lo) % self.capacity
+        last = first + (hi - lo)
+        if last <= self.capacity:
+            return column[first:last]
+        return column[first:] + column[:last - self.capacity]
+
+    def timestamps(self, start: Optional[float] = None, end: Optional[float] = None) -> array:
+        """Sample timestamps within [start, end]"""
+        lo, hi = self.index_range(start, end)
+        return self._slice(self._timestamps, lo, hi)
+
+    def column(self, name: str, start: Optional[float] = None, end: Optional[float] = None) -> array:
+        """Values of one metric within [start, end]"""
+        if name not in self._columns:
+            raise KeyError(f"Unknown metric: {name}")
+        lo, hi = self.index_range(start, end)
+        return self._slice(self._columns[name], lo, hi)
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              metrics: Optional[Iterable[str]] = None) -> Dict[str, array]:
+        """Timestamps plus the requested metric columns within [start, end]"""
+        lo, hi = self.index_range(start, end)
+        result = {'timestamp': self._slice(self._timestamps, lo, hi)}
+        for name in (metrics or FIELD_NAMES):
+            if name not in self._columns:
+                raise KeyError(f"Unknown metric: {name}")
+            result[name] = self._slice(self._columns[name], lo, hi)
+        return result
+
+    def chunks(self, start: Optional[float] = None, end: Optional[float] = None,
+               metrics: Optional[Iterable[str]] = None, rows: int = 10000) -> Iterator[Dict[str, array]]:
+        """query() over [start, end] split into blocks of at most `rows` samples"""
+        metrics = list(metrics or FIELD_NAMES)
+        for name in metrics:
+            if name not in self._columns:
+                raise KeyError(f"Unknown metric: {name}")
+        lo, hi = self.index_range(start, end)
+        for first in range(lo, hi, rows):
+            last = min(first + rows, hi)
+            chunk = {'timestamp': self._slice(self._timestamps, first, last)}
+            for name in metrics:
+                chunk[name] = self._slice(self._columns[name], first, last)
+            yield chunk
+
+    def copy(self, start: Optional[float] = None, end: Optional[float] = None) -> 'MetricStore':
+        """Independent store holding only the samples within [start, end]"""
+        lo, hi = self.index_range(start, end)
+        snapshot = MetricStore(max(1, hi - lo))
+        snapshot._timestamps[:hi - lo] = self._slice(self._timestamps, lo, hi)
+        for name, column in self._columns.items():
+            snapshot._columns[name][:hi - lo] = self._slice(column, lo, hi)
+        snapshot._size = hi - lo
+        snapshot.latest = self.latest
+        return snapshot
+
+    @property
+    def first_timestamp(self) -> Optional[float]:
+        return self._timestamp_at(0) if self._size else None
+
+    @property
+    def last_timestamp(self) -> Optional[float]:
+        return self._timestamp_at(self._size - 1) if self._size else None
+
+    @staticmethod
+    def bytes_per_sample() -> int:
+        """Column storage used by a single sample"""
+        return 8 * (len(FIELD_NAMES) + 1)
+
+    def memory_usage(self) -> Dict:
+        """Memory statistics for /api/status"""
+        return {
+            'samples': self._size,
+            'capacity': self.capacity,
+            'bytes_per_sample': self.bytes_per_sample(),
+            'allocated_bytes': self.bytes_per_sample() * self.capacity
+        }
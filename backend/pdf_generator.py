@@ -10,16 +10,153 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import matplotlib.dates as mdates
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
+import math
+import multiprocessing
 import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from downsample import bucket_envelope, downsample
+from export import history_blocks
+from instrumentation import REPORT_STAGE_SECONDS
+from rollups import QuantileSketch
+from anomalies import summarize_intervals
+
+# Charts in the report: (metric column, y-axis label, title, line color)
+CHART_SPECS = [
+    ('cpu_percent', 'CPU Usage (%)', 'CPU Usage', '#E74C3C'),
+    ('memory_percent', 'Memory Usage (%)', 'Memory Usage', '#3498DB'),
+    ('net_upload_kbps', 'Upload Speed (KB/s)', 'Network Upload', '#2ECC71'),
+    ('net_download_kbps', 'Download Speed (KB/s)', 'Network Download', '#9B59B6'),
+    ('cpu_temp', 'Temperature (°C)', 'CPU Temperature', '#F39C12'),
+    ('gpu_temp', 'Temperature (°C)', 'GPU Temperature', '#E67E22'),
+]
+
+# Rendered PNGs kept for reuse by later reports over the same window
+CHART_CACHE_SIZE = 32
+
+# Chart workers are started from a fork server (or spawned), never forked
+# directly from the multi-threaded server, whose locks a fork could copy held
+CHART_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+# Statistics table rows: (metric column, label, decimals)
+STATISTICS_ROWS = [
+    ('cpu_percent', 'CPU Usage (%)', 1),
+    ('memory_percent', 'Memory Usage (%)', 1),
+    ('net_upload_kbps', 'Upload Speed (KB/s)', 2),
+    ('net_download_kbps', 'Download Speed (KB/s)', 2),
+]
+
+# Ranges at least this long (seconds) take statistics from rollups when available
+ROLLUP_MIN_SPAN = 3600
+
+# Point budget per chart line (the PNG is ~1500 px wide); longer series are downsampled
+CHART_POINTS = 1000
+
+# Series up to this length are drawn with per-sample markers
+MARKER_MAX_POINTS = 120
+
+# Histories longer than this are read in STREAM_CHUNK_ROWS blocks for charts and
+# statistics instead of loading whole columns
+STREAM_MIN_SAMPLES = 200_000
+STREAM_CHUNK_ROWS = 50_000
+
+# Flowables produced ahead of the layout engine while the document is built
+STORY_LOOKAHEAD = 64
+
+# Raw sample appendix: (metric column, header, decimals), rows per table and the
+# most rows printed (longer ranges are averaged down to this many)
+APPENDIX_COLUMNS = [
+    ('cpu_percent', 'CPU %', 1),
+    ('memory_percent', 'Mem %', 1),
+    ('disk_percent', 'Disk %', 1),
+    ('net_upload_kbps', 'Up KB/s', 2),
+    ('net_download_kbps', 'Down KB/s', 2),
+    ('cpu_temp', 'CPU °C', 1),
+]
+APPENDIX_PAGE_ROWS = 40
+APPENDIX_MAX_ROWS = 10000
+
+
+class _LazyStory(list):
+    """Story list that is filled from a flowable generator as the document is built.
+
+    SimpleDocTemplate.build() checks len() before taking each flowable, so
+    only a few sections exist at a time instead of the whole report.
+    """
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def __len__(self):
+        size = super().__len__()
+        if size < STORY_LOOKAHEAD and self._source is not None:
+            for flowable in self._source:
+                self.append(flowable)
+                size += 1
+                if size >= STORY_LOOKAHEAD:
+                    break
+            else:
+                self._source = None
+        return size
+
+
+def render_chart(timestamps, values, ylabel, title, color='blue', envelope=None, alerts=None):
+    """Render a line chart to PNG bytes.
+
+    Uses the object-oriented Figure API (no pyplot global state) so it is
+    safe to call from worker processes and threads. ``envelope`` is an
+    optional (timestamps, mins, maxs) band drawn behind a downsampled line;
+    ``alerts`` is a list of (start, end, rule) intervals shaded on the chart.
+    """
+    if len(timestamps) == 0 or len(values) == 0:
+        return None
+
+    fig = Figure(figsize=(10, 4))
+    ax = fig.add_subplot()
+
+    times = [datetime.fromtimestamp(ts) for ts in timestamps]
+    if envelope is not None:
+        env_times = [datetime.fromtimestamp(ts) for ts in envelope[0]]
+        ax.fill_between(env_times, envelope[1], envelope[2], color=color, alpha=0.2, linewidth=0)
+    if len(values) <= MARKER_MAX_POINTS:
+        ax.plot(times, values, color=color, linewidth=2, marker='o', markersize=4)
+    else:
+        ax.plot(times, values, color=color, linewidth=1.5)
+    for i, (start, end, rule) in enumerate(alerts or []):
+        ax.axvspan(datetime.fromtimestamp(start), datetime.fromtimestamp(end), color='#C0392B', alpha=0.15,
+                   label='Alert' if i == 0 else None)
+        ax.annotate(rule, (datetime.fromtimestamp(start), 1), xycoords=('data', 'axes fraction'),
+                    fontsize=7, color='#C0392B', rotation=90, va='top', ha='right')
+    if alerts:
+        ax.legend(loc='upper left', fontsize=8)
+    ax.set_xlabel('Time', fontsize=10)
+    ax.set_ylabel(ylabel, fontsize=10)
+    ax.set_title(title, fontsize=12, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+
+    # Format x-axis
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+
+    img_buffer = BytesIO()
+    fig.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
+    return img_buffer.getvalue()
 
 
 class PDFGenerator:
-    def __init__(self):
+    def __init__(self, chart_workers=None):
         self.styles = getSampleStyleSheet()
         self.title_style = ParagraphStyle(
             'CustomTitle',
@@ -37,78 +174,121 @@ class PDFGenerator:
             spaceAfter=12,
             spaceBefore=12
         )
-
-    def create_chart(self, data_history, metric_name, ylabel, title, color='blue'):
-        """Create a line chart for a specific metric"""
-        if not data_history:
+        self.chart_workers = chart_workers if chart_workers is not None else min(len(CHART_SPECS), os.cpu_count() or 1)
+        self.chart_cache = OrderedDict()
+        self._pool = None
+        self._lock = threading.Lock()  # reports may be built from several worker threads
+
+    def _chart_key(self, history, metric_name, ylabel, title, color, alerts=None, source=None):
+        # `source` (the fleet host) keeps hosts with matching ranges from sharing charts
+        return (source, metric_name, ylabel, title, color,
+                history.first_timestamp, history.last_timestamp, len(history), tuple(alerts or ()))
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.chart_workers,
+                                                 mp_context=multiprocessing.get_context(CHART_POOL_START_METHOD))
+            return self._pool
+
+    def close(self):
+        """Shut down the chart rendering pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _cache_get(self, key):
+        with self._lock:
+            png = self.chart_cache.get(key)
+            if png is not None:
+                self.chart_cache.move_to_end(key)
+            return png
+
+    def _cache_put(self, key, png):
+        with self._lock:
+            self.chart_cache[key] = png
+            self.chart_cache.move_to_end(key)
+            while len(self.chart_cache) > CHART_CACHE_SIZE:
+                self.chart_cache.popitem(last=False)
+
+    @staticmethod
+    def _chart_args(timestamps, values, ylabel, title, color, alerts=None):
+        """render_chart() arguments, downsampled to CHART_POINTS when longer"""
+        if len(values) <= CHART_POINTS:
+            return (timestamps, values, ylabel, title, color, None, alerts)
+
+        reduced = downsample(timestamps, values, CHART_POINTS)
+        envelope = (reduced['envelope_timestamps'], reduced['min'], reduced['max'])
+        return (reduced['timestamps'], reduced['values'], ylabel, title, color, envelope, alerts)
+
+    def render_charts(self, history, specs=CHART_SPECS, alert_spans=None, source=None):
+        """Render several charts in parallel, reusing cached PNGs for the same data range.
+
+        ``alert_spans`` maps a metric column to (start, end, rule) intervals to shade.
+        ``source`` names the host the history belongs to (None for the local monitor).
+        """
+        charts = {}
+        pending = {}
+        missing = []
+        alert_spans = alert_spans or {}
+
+        for metric_name, ylabel, title, color in specs:
+            alerts = alert_spans.get(metric_name)
+            key = self._chart_key(history, metric_name, ylabel, title, color, alerts, source)
+            cached = self._cache_get(key)
+            if cached is not None:
+                charts[metric_name] = cached
+            else:
+                missing.append((key, metric_name, ylabel, title, color, alerts))
+
+        if missing and len(history) > STREAM_MIN_SAMPLES:
+            # One chunked pass computes every missing chart's bucket envelope
+            names = [spec[1] for spec in missing]
+            reduced = bucket_envelope(history.chunks(None, None, names, STREAM_CHUNK_ROWS), names,
+                                      history.first_timestamp, history.last_timestamp, CHART_POINTS)
+            for key, metric_name, ylabel, title, color, alerts in missing:
+                series = reduced[metric_name]
+                envelope = (series['envelope_timestamps'], series['min'], series['max'])
+                pending[metric_name] = (key, (series['timestamps'], series['values'], ylabel, title, color,
+                                              envelope, alerts))
+        elif missing:
+            timestamps = history.timestamps()
+            for key, metric_name, ylabel, title, color, alerts in missing:
+                args = self._chart_args(timestamps, history.column(metric_name), ylabel, title, color, alerts)
+                pending[metric_name] = (key, args)
+
+        if pending:
+            if self.chart_workers > 1 and len(pending) > 1:
+                try:
+                    pool = self._get_pool()
+                    futures = {name: pool.submit(render_chart, *args) for name, (_, args) in pending.items()}
+                    rendered = {name: future.result() for name, future in futures.items()}
+                except BrokenProcessPool:
+                    self._pool = None
+                    rendered = {name: render_chart(*args) for name, (_, args) in pending.items()}
+            else:
+                rendered = {name: render_chart(*args) for name, (_, args) in pending.items()}
+
+            for name, png in rendered.items():
+                self._cache_put(pending[name][0], png)
+                charts[name] = png
+
+        return {name: BytesIO(png) if png else None for name, png in charts.items()}
+
+    def create_chart(self, history, metric_name, ylabel, title, color='blue'):
+        """Create a line chart for a specific metric of the history store"""
+        if not history:
             return None
 
-        fig, ax = plt.subplots(figsize=(10, 4))
-
-        timestamps = []
-        values = []
-
-        for entry in data_history:
-            try:
-                timestamp = datetime.fromisoformat(entry['timestamp'])
-                timestamps.append(timestamp)
-
-                # Extract value based on metric_name
-                if metric_name == 'cpu_percent':
-                    values.append(entry['cpu']['percent'])
-                elif metric_name == 'memory_percent':
-                    values.append(entry['memory']['virtual']['percent'])
-                elif metric_name == 'disk_percent':
-                    if entry['disk']['partitions']:
-                        values.append(entry['disk']['partitions'][0]['percent'])
-                    else:
-                        values.append(0)
-                elif metric_name == 'network_upload':
-                    values.append(entry['network']['speed']['upload_kbps'])
-                elif metric_name == 'network_download':
-                    values.append(entry['network']['speed']['download_kbps'])
-                elif metric_name == 'cpu_temp':
-                    if entry['temperature']['cpu']:
-                        values.append(entry['temperature']['cpu'][0]['current'])
-                    else:
-                        values.append(0)
-                elif metric_name == 'gpu_temp':
-                    if entry['temperature']['gpu'] and entry['temperature']['gpu'][0].get('temperature'):
-                        values.append(entry['temperature']['gpu'][0]['temperature'])
-                    else:
-                        values.append(0)
-            except (KeyError, IndexError, TypeError):
-                continue
-
-        if timestamps and values:
-            ax.plot(timestamps, values, color=color, linewidth=2, marker='o', markersize=4)
-            ax.set_xlabel('Time', fontsize=10)
-            ax.set_ylabel(ylabel, fontsize=10)
-            ax.set_title(title, fontsize=12, fontweight='bold')
-            ax.grid(True, alpha=0.3)
-
-            # Format x-axis
-            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
-            plt.xticks(rotation=45)
-            plt.tight_layout()
+        spec = (metric_name, ylabel, title, color)
+        return self.render_charts(history, [spec])[metric_name]
 
-            # Save to BytesIO
-            img_buffer = BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=150, bbox_inches='tight')
-            img_buffer.seek(0)
-            plt.close()
-
-            return img_buffer
-
-        plt.close()
-        return None
-
-    def create_summary_table(self, data_history):
+    def create_summary_table(self, history):
         """Create summary statistics table"""
-        if not data_history:
+        if not history or history.latest is None:
             return None
 
-        latest = data_history[-1]
+        latest = history.latest
 
         data = [
             ['Metric', 'Current Value', 'Details'],
@@ -153,29 +333,154 @@ class PDFGenerator:
 
         return table
 
-    def create_statistics_table(self, data_history):
-        """Create statistics table with min, max, avg values"""
-        if not data_history:
+    def create_alert_table(self, events):
+        """Create table of alert fire/resolve events"""
+        if not events:
             return None
 
-        # Calculate statistics
-        cpu_values = [d['cpu']['percent'] for d in data_history]
-        mem_values = [d['memory']['virtual']['percent'] for d in data_history]
+        data = [['Time', 'Status', 'Severity', 'Alert']]
+        for event in events[-50:]:
+            data.append([datetime.fromtimestamp(event['timestamp']).strftime('%m-%d %H:%M:%S'),
+                         event['status'], event['severity'], event['message'][:60]])
 
-        data = [
-            ['Metric', 'Minimum', 'Maximum', 'Average'],
-            ['CPU Usage (%)', f"{min(cpu_values):.1f}", f"{max(cpu_values):.1f}", f"{sum(cpu_values)/len(cpu_values):.1f}"],
-            ['Memory Usage (%)', f"{min(mem_values):.1f}", f"{max(mem_values):.1f}", f"{sum(mem_values)/len(mem_values):.1f}"],
+        table = Table(data, colWidths=[1.2*inch, 0.8*inch, 0.8*inch, 4.2*inch])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#C0392B')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ]))
+
+        return table
+
+    def create_anomaly_tables(self, intervals):
+        """Create a per-metric summary and a list of flagged anomaly intervals"""
+        if not intervals:
+            return None
+
+        style = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#D35400')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
         ]
 
-        # Network stats
-        upload_values = [d['network']['speed']['upload_kbps'] for d in data_history]
-        download_values = [d['network']['speed']['download_kbps'] for d in data_history]
+        data = [['Metric', 'Intervals', 'Flagged (s)', 'Peak Score', 'Detector']]
+        for metric, entry in sorted(summarize_intervals(intervals).items()):
+            data.append([metric, str(entry['count']), f"{entry['seconds']:.0f}", f"{entry['peak']:.1f}x",
+                         entry['detector']])
+        summary = Table(data, colWidths=[2*inch, 1*inch, 1.2*inch, 1.2*inch, 1.2*inch])
+        summary.setStyle(TableStyle(style))
+
+        data = [['Start', 'Duration (s)', 'Metric', 'Peak Score', 'Detector']]
+        for interval in intervals[-50:]:
+            data.append([datetime.fromtimestamp(interval['start']).strftime('%m-%d %H:%M:%S'),
+                         f"{interval['end'] - interval['start']:.0f}" + ('+' if interval.get('open') else ''),
+                         interval['metric'], f"{interval['peak']:.1f}x", interval['detector']])
+        listing = Table(data, colWidths=[1.3*inch, 1*inch, 2*inch, 1.1*inch, 1.2*inch])
+        listing.setStyle(TableStyle(style))
+
+        return summary, listing
+
+    def create_process_table(self, history):
+        """Create table of the top processes in the latest sample"""
+        latest = history.latest if history else None
+        processes = (latest or {}).get('processes')
+        if not processes or not processes.get('top_cpu'):
+            return None
 
-        data.append(['Upload Speed (KB/s)', f"{min(upload_values):.2f}", f"{max(upload_values):.2f}", f"{sum(upload_values)/len(upload_values):.2f}"])
-        data.append(['Download Speed (KB/s)', f"{min(download_values):.2f}", f"{max(download_values):.2f}", f"{sum(download_values)/len(download_values):.2f}"])
+        data = [['PID', 'Process', 'CPU (%)', 'Memory (MB)', 'Disk I/O (KB/s)']]
+        for proc in processes['top_cpu']:
+            data.append([str(proc['pid']), proc['name'][:40], f"{proc['cpu_percent']:.1f}",
+                         f"{proc['rss_mb']:.1f}", f"{proc['io_kbps']:.2f}"])
 
-        table = Table(data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
+        table = Table(data, colWidths=[0.8*inch, 2.6*inch, 1*inch, 1.2*inch, 1.4*inch])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#9B59B6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ]))
+
+        return table
+
+    def _range_statistics(self, history, rollups=None):
+        """min/max/avg/p95 per statistics metric, from rollups for long ranges"""
+        metrics = [name for name, _, _ in STATISTICS_ROWS]
+        span = (history.last_timestamp or 0) - (history.first_timestamp or 0)
+
+        if rollups is not None and span >= ROLLUP_MIN_SPAN:
+            stats = rollups.stats(metrics, history.first_timestamp, history.last_timestamp,
+                                  quantiles=(0.95,))
+            if all(stats[name]['count'] for name in metrics):
+                return stats
+
+        if len(history) > STREAM_MIN_SAMPLES:
+            return self._chunked_statistics(history, metrics)
+
+        stats = {}
+        for name in metrics:
+            values = np.asarray(history.column(name))
+            stats[name] = {
+                'min': values.min(),
+                'max': values.max(),
+                'avg': values.mean(),
+                'p95': np.percentile(values, 95)
+            }
+        return stats
+
+    @staticmethod
+    def _chunked_statistics(history, metrics):
+        """min/max/avg in one pass over blocks; p95 from a quantile sketch (1% relative error)"""
+        mins = dict.fromkeys(metrics, math.inf)
+        maxs = dict.fromkeys(metrics, -math.inf)
+        sums = dict.fromkeys(metrics, 0.0)
+        sketches = {name: QuantileSketch() for name in metrics}
+        count = 0
+        for chunk in history.chunks(None, None, metrics, STREAM_CHUNK_ROWS):
+            count += len(chunk['timestamp'])
+            for name in metrics:
+                values = np.asarray(chunk[name], dtype=np.float64)
+                mins[name] = min(mins[name], values.min())
+                maxs[name] = max(maxs[name], values.max())
+                sums[name] += values.sum()
+                sketches[name].add_array(values)
+
+        return {name: {'min': mins[name], 'max': maxs[name], 'avg': sums[name] / count,
+                       'p95': sketches[name].quantile(0.95)}
+                for name in metrics}
+
+    def create_statistics_table(self, history, rollups=None):
+        """Create statistics table with min, max, avg and 95th percentile values"""
+        if not history:
+            return None
+
+        stats = self._range_statistics(history, rollups)
+
+        data = [['Metric', 'Minimum', 'Maximum', 'Average', '95th Pct']]
+        for name, label, precision in STATISTICS_ROWS:
+            entry = stats[name]
+            data.append([label] + [f"{entry[key]:.{precision}f}" for key in ('min', 'max', 'avg', 'p95')])
+
+        table = Table(data, colWidths=[2.2*inch, 1.2*inch, 1.2*inch, 1.2*inch, 1.2*inch])
         table.setStyle(TableStyle([
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2ECC71')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
@@ -192,92 +497,241 @@ class PDFGenerator:
 
         return table
 
-    def generate_report(self, data_history, output_path='system_report.pdf'):
-        """Generate complete PDF report"""
+    def _appendix_table(self, rows):
+        """One page of the raw sample appendix"""
+        header = ['Time'] + [label for _, label, _ in APPENDIX_COLUMNS]
+        table = Table([header] + rows, colWidths=[1.3*inch] + [0.85*inch] * len(APPENDIX_COLUMNS), repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495E')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F2F3F4')])
+        ]))
+        return table
+
+    def create_appendix(self, history):
+        """Yield the raw sample appendix page by page, reading the store in blocks.
+
+        Ranges with more than APPENDIX_MAX_ROWS samples are averaged over a
+        step long enough to stay within it.
+        """
+        if not history:
+            return
+
+        metrics = [name for name, _, _ in APPENDIX_COLUMNS]
+        span = history.last_timestamp - history.first_timestamp
+        step = math.ceil(span / APPENDIX_MAX_ROWS) if len(history) > APPENDIX_MAX_ROWS else None
+
+        yield PageBreak()
+        yield Paragraph("Appendix: Samples", self.heading_style)
+        if step:
+            yield Paragraph(f"Averaged over {step} second intervals ({len(history)} samples)",
+                            self.styles['Normal'])
+            yield Spacer(1, 0.1*inch)
+
+        rows = []
+        formats = ['%.{}f'.format(precision) for _, _, precision in APPENDIX_COLUMNS]
+        for block in history_blocks(history, None, None, metrics, step):
+            columns = [block[name].tolist() for name in metrics]
+            for i, timestamp in enumerate(block['timestamp'].tolist()):
+                rows.append([datetime.fromtimestamp(timestamp).strftime('%m-%d %H:%M:%S')] +
+                            [fmt % column[i] for fmt, column in zip(formats, columns)])
+                if len(rows) == APPENDIX_PAGE_ROWS:
+                    yield self._appendix_table(rows)
+                    rows = []
+        if rows:
+            yield self._appendix_table(rows)
+
+    @staticmethod
+    def _chart_image(chart, directory, name):
+        """Image flowable for a rendered chart, spilled to a temp file that is only
+        read while its page is drawn"""
+        if not chart:
+            return None
+        path = os.path.join(directory, f'{name}.png')
+        with open(path, 'wb') as f:
+            f.write(chart.getvalue())
+        return Image(path, width=6.5*inch, height=2.6*inch, lazy=2)
+
+    def generate_report(self, history, output_path='system_report.pdf', rollups=None, host=None, alerts=None,
+                        appendix=False, anomalies=None):
+        """Generate complete PDF report from a MetricStore into a path or file-like object.
+
+        When a RollupEngine is given, statistics over long ranges come from
+        its buckets instead of scanning every sample. ``host`` names the
+        monitored machine in the title (fleet mode). With an AlertEngine,
+        alerts in the report period are listed and shaded on the charts, and
+        with an AnomalyDetector its flagged intervals are summarised.
+        ``appendix`` adds tables of the samples themselves.
+
+        The document is built section by section (see _LazyStory) and chart
+        images are spilled to a temporary directory, so long histories are
+        never held in memory as a whole.
+        """
+        report_start = time.perf_counter()
         doc = SimpleDocTemplate(output_path, pagesize=letter)
-        story = []
 
+        with tempfile.TemporaryDirectory(prefix='report_charts_') as spill:
+            story = self._report_story(history, rollups, host, alerts, anomalies, appendix, spill)
+            # 'build' includes the sections produced on demand while laying out
+            with REPORT_STAGE_SECONDS.time('build'):
+                doc.build(_LazyStory(story))
+        REPORT_STAGE_SECONDS.observe(time.perf_counter() - report_start, 'total')
+
+        return output_path
+
+    def _report_story(self, history, rollups, host, alerts, anomalies, appendix, spill):
+        """Flowables of the report, generated in document order"""
         # Title
-        title = Paragraph("System Resource Monitoring Report", self.title_style)
-        story.append(title)
+        heading = "System Resource Monitoring Report"
+        if host:
+            heading += f" - {host}"
+        yield Paragraph(heading, self.title_style)
 
         # Report info
-        if data_history:
-            start_time = datetime.fromisoformat(data_history[0]['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-            end_time = datetime.fromisoformat(data_history[-1]['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-            duration = len(data_history) * 10  # 10 seconds interval
+        if history:
+            start_time = datetime.fromtimestamp(history.first_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            end_time = datetime.fromtimestamp(history.last_timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            duration = int(history.last_timestamp - history.first_timestamp)
 
             info_text = f"<b>Report Period:</b> {start_time} to {end_time}<br/>"
-            info_text += f"<b>Duration:</b> {duration} seconds ({len(data_history)} samples)<br/>"
+            info_text += f"<b>Duration:</b> {duration} seconds ({len(history)} samples)<br/>"
             info_text += f"<b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
 
-            info = Paragraph(info_text, self.styles['Normal'])
-            story.append(info)
-            story.append(Spacer(1, 0.3*inch))
+            yield Paragraph(info_text, self.styles['Normal'])
+            yield Spacer(1, 0.3*inch)
 
         # Current Status Summary
-        story.append(Paragraph("Current System Status", self.heading_style))
-        summary_table = self.create_summary_table(data_history)
+        tables_start = time.perf_counter()
+        section = []
+        section.append(Paragraph("Current System Status", self.heading_style))
+        summary_table = self.create_summary_table(history)
         if summary_table:
-            story.append(summary_table)
-            story.append(Spacer(1, 0.3*inch))
+            section.append(summary_table)
+            section.append(Spacer(1, 0.3*inch))
 
         # Statistics Summary
-        story.append(Paragraph("Statistics Summary", self.heading_style))
-        stats_table = self.create_statistics_table(data_history)
+        section.append(Paragraph("Statistics Summary", self.heading_style))
+        stats_table = self.create_statistics_table(history, rollups)
         if stats_table:
-            story.append(stats_table)
-            story.append(Spacer(1, 0.3*inch))
-
-        # CPU Chart
-        story.append(PageBreak())
-        story.append(Paragraph("CPU Usage Over Time", self.heading_style))
-        cpu_chart = self.create_chart(data_history, 'cpu_percent', 'CPU Usage (%)',
-                                      'CPU Usage', color='#E74C3C')
-        if cpu_chart:
-            story.append(Image(cpu_chart, width=6.5*inch, height=2.6*inch))
-            story.append(Spacer(1, 0.2*inch))
-
-        # Memory Chart
-        story.append(Paragraph("Memory Usage Over Time", self.heading_style))
-        mem_chart = self.create_chart(data_history, 'memory_percent', 'Memory Usage (%)',
-                                      'Memory Usage', color='#3498DB')
-        if mem_chart:
-            story.append(Image(mem_chart, width=6.5*inch, height=2.6*inch))
-            story.append(Spacer(1, 0.2*inch))
-
-        # Network Charts
-        story.append(PageBreak())
-        story.append(Paragraph("Network Upload Speed Over Time", self.heading_style))
-        upload_chart = self.create_chart(data_history, 'network_upload', 'Upload Speed (KB/s)',
-                                         'Network Upload', color='#2ECC71')
-        if upload_chart:
-            story.append(Image(upload_chart, width=6.5*inch, height=2.6*inch))
-            story.append(Spacer(1, 0.2*inch))
-
-        story.append(Paragraph("Network Download Speed Over Time", self.heading_style))
-        download_chart = self.create_chart(data_history, 'network_download', 'Download Speed (KB/s)',
-                                           'Network Download', color='#9B59B6')
-        if download_chart:
-            story.append(Image(download_chart, width=6.5*inch, height=2.6*inch))
-            story.append(Spacer(1, 0.2*inch))
-
-        # Temperature Charts
-        story.append(PageBreak())
-        story.append(Paragraph("Temperature Monitoring", self.heading_style))
-
-        cpu_temp_chart = self.create_chart(data_history, 'cpu_temp', 'Temperature (°C)',
-                                           'CPU Temperature', color='#F39C12')
-        if cpu_temp_chart:
-            story.append(Image(cpu_temp_chart, width=6.5*inch, height=2.6*inch))
-            story.append(Spacer(1, 0.2*inch))
-
-        gpu_temp_chart = self.create_chart(data_history, 'gpu_temp', 'Temperature (°C)',
-                                           'GPU Temperature', color='#E67E22')
-        if gpu_temp_chart:
-            story.append(Image(gpu_temp_chart, width=6.5*inch, height=2.6*inch))
-
-        # Build PDF
+            section.append(stats_table)
+            section.append(Spacer(1, 0.3*inch))
+
+        # Alerts
+        alert_spans = {}
+        if alerts is not None and history:
+            start, end = history.first_timestamp, history.last_timestamp
+            alert_spans = alerts.intervals(start, end)
+            alert_table = self.create_alert_table(alerts.events_in(start, end))
+            if alert_table:
+                section.append(Paragraph("Alerts", self.heading_style))
+                section.append(alert_table)
+                section.append(Spacer(1, 0.3*inch))
+
+        # Anomalies
+        if anomalies is not None and history:
+            tables = self.create_anomaly_tables(anomalies.intervals(history.first_timestamp,
+                                                                    history.last_timestamp))
+            if tables:
+                section.append(Paragraph("Anomalies", self.heading_style))
+                section.append(Paragraph("Scores are multiples of each detector's limit (1.0x flags a metric).",
+                                         self.styles['Normal']))
+                for table in tables:
+                    section.append(Spacer(1, 0.1*inch))
+                    section.append(table)
+                section.append(Spacer(1, 0.3*inch))
+
+        # Top Processes
+        process_table = self.create_process_table(history)
+        if process_table:
+            section.append(Paragraph("Top Processes by CPU", self.heading_style))
+            section.append(process_table)
+            section.append(Spacer(1, 0.3*inch))
+
+        REPORT_STAGE_SECONDS.observe(time.perf_counter() - tables_start, 'tables')
+        yield from section
+
+        with REPORT_STAGE_SECONDS.time('charts'):
+            charts = self.render_charts(history, alert_spans=alert_spans, source=host) if history else {}
+            images = {name: self._chart_image(chart, spill, name) for name, chart in charts.items()}
+        del charts
+
+        # (page heading, [(chart column, chart heading)]) per chart page
+        pages = [
+            (None, [('cpu_percent', "CPU Usage Over Time"), ('memory_percent', "Memory Usage Over Time")]),
+            (None, [('net_upload_kbps', "Network Upload Speed Over Time"),
+                    ('net_download_kbps', "Network Download Speed Over Time")]),
+            ("Temperature Monitoring", [('cpu_temp', None), ('gpu_temp', None)]),
+        ]
+        for page_heading, entries in pages:
+            yield PageBreak()
+            if page_heading:
+                yield Paragraph(page_heading, self.heading_style)
+            for name, chart_heading in entries:
+                if chart_heading:
+                    yield Paragraph(chart_heading, self.heading_style)
+                image = images.get(name)
+                if image:
+                    yield image
+                    yield Spacer(1, 0.2*inch)
+
+        if appendix:
+            yield from self.create_appendix(history)
+
+    def create_fleet_table(self, hosts):
+        """Create one row of CPU/memory/disk statistics per host"""
+        data = [['Host', 'Samples', 'Avg CPU', 'Max CPU', 'Avg Mem', 'Max Mem', 'Disk']]
+        for name, history in sorted(hosts.items()):
+            if not history:
+                data.append([name[:32], '0', '-', '-', '-', '-', '-'])
+                continue
+            cpu = np.asarray(history.column('cpu_percent'))
+            mem = np.asarray(history.column('memory_percent'))
+            disk = history.column('disk_percent')
+            data.append([
+                name[:32], str(len(history)),
+                f"{cpu.mean():.1f}%", f"{cpu.max():.1f}%",
+                f"{mem.mean():.1f}%", f"{mem.max():.1f}%",
+                f"{disk[-1]:.1f}%"
+            ])
+
+        table = Table(data, colWidths=[2.2*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.7*inch],
+                      repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2C3E50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ]))
+
+        return table
+
+    def generate_fleet_report(self, hosts, output_path='fleet_report.pdf'):
+        """Generate a fleet overview PDF from {host name: history}"""
+        doc = SimpleDocTemplate(output_path, pagesize=letter)
+        story = []
+
+        story.append(Paragraph("Fleet Resource Monitoring Report", self.title_style))
+
+        samples = sum(len(history) for history in hosts.values())
+        info_text = f"<b>Hosts:</b> {len(hosts)} ({samples} samples)<br/>"
+        info_text += f"<b>Generated:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        story.append(Paragraph(info_text, self.styles['Normal']))
+        story.append(Spacer(1, 0.3*inch))
+
+        story.append(Paragraph("Host Statistics", self.heading_style))
+        story.append(self.create_fleet_table(hosts))
+
         doc.build(story)
 
         return output_path
@@ -0,0 +1,131 @@
+"""
+Process Monitor
+Top-N processes by CPU, memory (RSS) and disk I/O with a bounded per-tick cost
+"""
+
+import heapq
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+DEFAULT_TOP_N = 10
+
+# Wall-clock budget for refreshing process stats in one tick (seconds)
+DEFAULT_BUDGET = 0.02
+
+
+class _TrackedProcess:
+    """Cached psutil.Process plus the counters needed for CPU and I/O deltas"""
+
+    __slots__ = ('proc', 'pid', 'name', 'last_cpu', 'last_io', 'last_time',
+                 'cpu_percent', 'rss', 'io_rate')
+
+    def __init__(self, pid: int):
+        self.proc = psutil.Process(pid)
+        self.pid = pid
+        try:
+            self.name = self.proc.name()
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            self.name = '?'
+        self.last_cpu = None
+        self.last_io = None
+        self.last_time = None
+        self.cpu_percent = 0.0
+        self.rss = 0
+        self.io_rate = 0.0
+
+    def refresh(self, now: float):
+        """Read cpu_times/memory_info/io_counters in one oneshot() and update deltas"""
+        with self.proc.oneshot():
+            cpu_times = self.proc.cpu_times()
+            self.rss = self.proc.memory_info().rss
+            try:
+                io = self.proc.io_counters()
+                io_total = io.read_bytes + io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                io_total = None
+
+        cpu_total = cpu_times.user + cpu_times.system
+        if self.last_time is not None and now > self.last_time:
+            elapsed = now - self.last_time
+            self.cpu_percent = round(max(0.0, cpu_total - self.last_cpu) / elapsed * 100, 1)
+            if io_total is not None and self.last_io is not None:
+                self.io_rate = max(0.0, io_total - self.last_io) / elapsed
+
+        self.last_cpu = cpu_total
+        self.last_io = io_total
+        self.last_time = now
+
+    def to_dict(self) -> Dict:
+        return {
+            'pid': self.pid,
+            'name': self.name,
+            'cpu_percent': self.cpu_percent,
+            'rss': self.rss,
+            'rss_mb': round(self.rss / (1024**2), 1),
+            'io_kbps': round(self.io_rate / 1024, 2)
+        }
+
+
+class ProcessCollector:
+    """Keeps Process objects between ticks and refreshes them round-robin.
+
+    Each call lists PIDs (cheap), then refreshes as many cached processes as
+    fit in ``budget`` seconds, continuing where the previous tick stopped.
+    Top-N lists are picked with heaps from the latest known figures, so on a
+    host with thousands of processes every process is still revisited within
+    a few ticks while no tick exceeds the budget by more than one refresh.
+    """
+
+    def __init__(self, top_n: int = DEFAULT_TOP_N, budget: float = DEFAULT_BUDGET):
+        self.top_n = top_n
+        self.budget = budget
+        self.tracked: Dict[int, Optional[_TrackedProcess]] = {}
+        self._queue: List[int] = []
+
+    def _sync_pids(self):
+        """Forget exited PIDs; new PIDs are queued and only opened when refreshed"""
+        pids = set(psutil.pids())
+        for pid in [pid for pid in self.tracked if pid not in pids]:
+            del self.tracked[pid]
+        new = [pid for pid in pids if pid not in self.tracked]
+        for pid in new:
+            self.tracked[pid] = None
+        # New processes are refreshed first (the queue is consumed from the end)
+        self._queue.extend(new)
+
+    def collect(self, now: Optional[float] = None) -> Dict:
+        """Refresh within the budget and return top-N by CPU, RSS and I/O"""
+        start = time.perf_counter()
+        now = time.monotonic() if now is None else now
+        self._sync_pids()
+
+        if not self._queue:
+            self._queue = list(self.tracked)
+
+        refreshed = 0
+        while self._queue and time.perf_counter() - start < self.budget:
+            pid = self._queue.pop()
+            if pid not in self.tracked:
+                continue
+            try:
+                entry = self.tracked[pid]
+                if entry is None:
+                    entry = self.tracked[pid] = _TrackedProcess(pid)
+                entry.refresh(now)
+                refreshed += 1
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                self.tracked.pop(pid, None)
+            except psutil.AccessDenied:
+                continue
+
+        entries = [entry for entry in self.tracked.values() if entry is not None]
+        return {
+            'count': len(self.tracked),
+            'refreshed': refreshed,
+            'collect_ms': round((time.perf_counter() - start) * 1000, 2),
+            'top_cpu': [p.to_dict() for p in heapq.nlargest(self.top_n, entries, key=lambda p: p.cpu_percent)],
+            'top_memory': [p.to_dict() for p in heapq.nlargest(self.top_n, entries, key=lambda p: p.rss)],
+            'top_io': [p.to_dict() for p in heapq.nlargest(self.top_n, entries, key=lambda p: p.io_rate)]
+        }
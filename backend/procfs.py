@@ -0,0 +1,300 @@
+"""
+Linux /proc Fast Path
+Reads the counters behind the per-tick collectors straight from /proc and /sys
+
+psutil opens, reads and closes each file on every call and builds its full
+general-purpose result. At sub-second sampling that overhead dominates the
+CPU, memory, disk and network collectors. ProcfsSource instead:
+- keeps /proc/stat, /proc/meminfo, /proc/diskstats, /proc/net/dev and the
+  cpufreq and hwmon files open;
+- re-reads them with os.preadv() into preallocated buffers;
+- parses only the fields SystemMonitor uses.
+
+Its methods mirror the psutil functions they replace (same names, arguments
+and namedtuple field names), so SystemMonitor builds the same frames from
+either source. Select it with MONITOR_SOURCE=procfs. Any other function
+(partitions, interfaces, static CPU facts) is psutil's own.
+"""
+
+import glob
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import psutil
+
+from io_counters import partition_names
+
+# Same fields (and order) as the psutil results SystemMonitor reads
+scputimes = namedtuple('scputimes', ['user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal',
+                                     'guest', 'guest_nice'])
+scpufreq = namedtuple('scpufreq', ['current', 'min', 'max'])
+svmem = namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free'])
+sswap = namedtuple('sswap', ['total', 'used', 'free', 'percent'])
+sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_time',
+                                 'write_time', 'read_merged_count', 'write_merged_count', 'busy_time'])
+snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv', 'errin', 'errout',
+                               'dropin', 'dropout'])
+shwtemp = namedtuple('shwtemp', ['label', 'current', 'high', 'critical'])
+
+# /proc/diskstats counts 512-byte sectors whatever the device's sector size
+SECTOR_SIZE = 512
+
+# virtual_memory() and swap_memory() called this close together share one /proc/meminfo read
+MEMINFO_MAX_AGE = 0.05
+
+_MEMINFO_KEYS = {b'MemTotal', b'MemFree', b'MemAvailable', b'Buffers', b'Cached', b'SReclaimable',
+                 b'SwapTotal', b'SwapFree'}
+
+
+def usage_percent(used: float, total: float) -> float:
+    return round(used / total * 100, 1) if total else 0.0
+
+
+def _sum_counters(kind, counters):
+    """Field-wise sum of counters namedtuples, or None when there are none (as psutil returns)"""
+    counters = list(counters)
+    return kind(*map(sum, zip(*counters))) if counters else None
+
+
+class ProcFile:
+    """A /proc or /sys file kept open and re-read from offset 0 into one buffer.
+
+    proc (seq_file) and sysfs reads regenerate the content on every read at
+    offset 0 and fill the buffer as far as the content goes, so a short read
+    is the whole file; a full buffer is grown and read again.
+    """
+
+    __slots__ = ('path', 'fd', 'buffer', 'lock')
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self.buffer = bytearray(size)
+        self.lock = threading.Lock()
+
+    def read(self) -> bytes:
+        with self.lock:
+            while True:
+                size = os.preadv(self.fd, [self.buffer], 0)
+                if size < len(self.buffer):
+                    return bytes(memoryview(self.buffer)[:size])
+                self.buffer = bytearray(2 * len(self.buffer))
+
+    def read_int(self) -> int:
+        return int(self.read())
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _read_text(path: str) -> Optional[str]:
+    """Whole small file, or None when it cannot be read (static sensor attributes)"""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def _read_millis(path: str) -> Optional[float]:
+    text = _read_text(path)
+    try:
+        return int(text) / 1000 if text else None
+    except ValueError:
+        return None
+
+
+class ProcfsSource:
+    """psutil-compatible readers backed by open /proc and /sys files (Linux only)"""
+
+    def __init__(self, procfs: str = '/proc', sysfs: str = '/sys'):
+        self.sysfs = sysfs
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.stat = ProcFile(f'{procfs}/stat')
+        self.meminfo = ProcFile(f'{procfs}/meminfo')
+        self.diskstats = ProcFile(f'{procfs}/diskstats')
+        self.net_dev = ProcFile(f'{procfs}/net/dev')
+        self._memory = None  # (monotonic time, {key: bytes})
+
+        # Current frequency per CPU; without cpufreq (most VMs) the "cpu MHz" lines of /proc/cpuinfo
+        self.freq_files = [ProcFile(path, 64) for path in
+                           sorted(glob.glob(f'{sysfs}/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_cur_freq'),
+                                  key=lambda path: int(path.split('/')[-3][len('cpu'):]))]
+        limits = [(_read_millis(path.replace('scaling_cur_freq', 'scaling_min_freq')) or 0.0,
+                   _read_millis(path.replace('scaling_cur_freq', 'scaling_max_freq')) or 0.0)
+                  for path in (f.path for f in self.freq_files)]
+        self.freq_min = sum(low for low, _ in limits) / len(limits) if limits else 0.0
+        self.freq_max = sum(high for _, high in limits) / len(limits) if limits else 0.0
+        self.cpuinfo = None
+        if not self.freq_files and os.path.exists(f'{procfs}/cpuinfo'):
+            self.cpuinfo = ProcFile(f'{procfs}/cpuinfo', 16384)
+
+        # Temperature sensors, found on the first read
+        self.sensors = None
+
+    def __getattr__(self, name):
+        # Functions without a fast path
+        return getattr(psutil, name)
+
+    def cpu_times(self, percpu: bool = False):
+        """CPU times in seconds, overall or per CPU"""
+        lines = self.stat.read().split(b'\n')
+        if not percpu:
+            return self._cpu_times(lines[0])
+        cpus = []
+        for line in lines[1:]:
+            if not line.startswith(b'cpu'):
+                break
+            cpus.append(self._cpu_times(line))
+        return cpus
+
+    def _cpu_times(self, line: bytes) -> scputimes:
+        ticks = self.clock_ticks
+        fields = [int(value) / ticks for value in line.split()[1:11]]
+        # Older kernels have fewer columns
+        fields.extend([0.0] * (10 - len(fields)))
+        return scputimes(*fields)
+
+    def cpu_freq(self) -> Optional[scpufreq]:
+        """Mean current frequency (MHz) over the CPUs"""
+        if self.freq_files:
+            current = sum(f.read_int() for f in self.freq_files) / len(self.freq_files) / 1000
+            return scpufreq(current, self.freq_min, self.freq_max)
+        if self.cpuinfo is not None:
+            speeds = [float(line.partition(b':')[2]) for line in self.cpuinfo.read().split(b'\n')
+                      if line.startswith(b'cpu MHz')]
+            if speeds:
+                return scpufreq(sum(speeds) / len(speeds), 0.0, 0.0)
+        return None
+
+    def _meminfo(self) -> Dict[bytes, int]:
+        now = time.monotonic()
+        if self._memory is not None and now - self._memory[0] <= MEMINFO_MAX_AGE:
+            return self._memory[1]
+        values = {}
+        for line in self.meminfo.read().split(b'\n'):
+            key, _, rest = line.partition(b':')
+            if key in _MEMINFO_KEYS:
+                values[key] = int(rest.split()[0]) * 1024
+        self._memory = (now, values)
+        return values
+
+    def virtual_memory(self) -> svmem:
+        """RAM totals computed as psutil does (available = MemAvailable)"""
+        mem = self._meminfo()
+        total = mem[b'MemTotal']
+        free = mem[b'MemFree']
+        available = mem.get(b'MemAvailable', 0)
+        if available <= 0:
+            # Pre-3.14 kernels (or the MemAvailable=0 kernel bug): estimate like older procps
+            available = free + mem.get(b'Buffers', 0) + mem.get(b'Cached', 0) + mem.get(b'SReclaimable', 0)
+        if available > total:
+            # Container with the host's figures
+            available = free
+        used = total - available
+        return svmem(total, available, usage_percent(used, total), used, free)
+
+    def swap_memory(self) -> sswap:
+        mem = self._meminfo()
+        total = mem.get(b'SwapTotal', 0)
+        free = mem.get(b'SwapFree', 0)
+        used = total - free
+        return sswap(total, used, free, usage_percent(used, total))
+
+    def disk_io_counters(self, perdisk: bool = False, nowrap: bool = True):
+        """Raw counters of every block device listed in /proc/diskstats, or their sum over whole disks"""
+        counters = {}
+        for line in self.diskstats.read().split(b'\n'):
+            fields = line.split()
+            if len(fields) >= 14:
+                (reads, reads_merged, read_sectors, read_time, writes, writes_merged, write_sectors,
+                 write_time, _, busy_time) = map(int, fields[3:13])
+            elif len(fields) == 7:
+                # Partition line of 2.6 kernels
+                reads, read_sectors, writes, write_sectors = map(int, fields[3:7])
+                reads_merged = writes_merged = read_time = write_time = busy_time = 0
+            else:
+                continue
+            counters[fields[2].decode()] = sdiskio(reads, writes, read_sectors * SECTOR_SIZE,
+                                                   write_sectors * SECTOR_SIZE, read_time, write_time,
+                                                   reads_merged, writes_merged, busy_time)
+        if perdisk:
+            return counters
+        # Like psutil, the total leaves out partitions, whose I/O their disk already counts
+        partitions = partition_names(frozenset(counters))
+        return _sum_counters(sdiskio, [c for name, c in counters.items() if name not in partitions])
+
+    def net_io_counters(self, pernic: bool = False, nowrap: bool = True):
+        """Raw counters of every interface listed in /proc/net/dev, or their sum"""
+        counters = {}
+        for line in self.net_dev.read().split(b'\n')[2:]:
+            name, colon, rest = line.rpartition(b':')
+            if not colon:
+                continue
+            fields = rest.split()
+            counters[name.strip().decode()] = snetio(
+                int(fields[8]), int(fields[0]), int(fields[9]), int(fields[1]),
+                int(fields[2]), int(fields[10]), int(fields[3]), int(fields[11]))
+        return counters if pernic else _sum_counters(snetio, counters.values())
+
+    def _find_sensors(self) -> List:
+        """(chip name, label, high, critical, input file) of each hwmon sensor, else thermal zones"""
+        sensors = []
+        inputs = glob.glob(f'{self.sysfs}/class/hwmon/hwmon*/temp*_input')
+        inputs += glob.glob(f'{self.sysfs}/class/hwmon/hwmon*/device/temp*_input')
+        for path in sorted(inputs):
+            base = path[:-len('_input')]
+            directory = os.path.dirname(path)
+            name = (_read_text(os.path.join(directory, 'name'))
+                    or _read_text(os.path.join(os.path.dirname(directory), 'name'))
+                    or os.path.basename(directory))
+            try:
+                sensors.append((name, _read_text(base + '_label') or '', _read_millis(base + '_max'),
+                                _read_millis(base + '_crit'), ProcFile(path, 64)))
+            except OSError:
+                continue
+
+        if not sensors:
+            for zone in sorted(glob.glob(f'{self.sysfs}/class/thermal/thermal_zone*')):
+                high = critical = None
+                for trip in glob.glob(os.path.join(zone, 'trip_point_*_type')):
+                    kind = _read_text(trip)
+                    if kind in ('critical', 'high'):
+                        value = _read_millis(trip.replace('_type', '_temp'))
+                        if kind == 'critical':
+                            critical = value
+                        else:
+                            high = value
+                try:
+                    sensors.append((_read_text(os.path.join(zone, 'type')) or os.path.basename(zone), '',
+                                    high, critical, ProcFile(os.path.join(zone, 'temp'), 64)))
+                except OSError:
+                    continue
+        return sensors
+
+    def sensors_temperatures(self) -> Dict[str, List[shwtemp]]:
+        """Temperatures (°C) per chip, re-read from the sensor files found on the first call"""
+        if self.sensors is None:
+            self.sensors = self._find_sensors()
+        temperatures: Dict[str, List[shwtemp]] = {}
+        for name, label, high, critical, source in self.sensors:
+            try:
+                current = source.read_int() / 1000
+            except (OSError, ValueError):
+                # Sensor went away or is not ready
+                continue
+            temperatures.setdefault(name, []).append(shwtemp(label, current, high, critical))
+        return temperatures
+
+    def close(self):
+        files = [self.stat, self.meminfo, self.diskstats, self.net_dev] + self.freq_files
+        if self.cpuinfo is not None:
+            files.append(self.cpuinfo)
+        files.extend(sensor[4] for sensor in self.sensors or ())
+        for f in files:
+            f.close()
@@ -0,0 +1,115 @@
+"""
+Report Job Queue
+Runs PDF report generation in a worker pool and keeps finished documents in memory
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, Optional
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ReportJob:
+    """State of one report request"""
+
+    def __init__(self, sample_count: int):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.sample_count = sample_count
+        self.created = time.time()
+        self.finished = None
+        self.error = None
+        self.data = None
+        self.filename = f'system_report_{int(self.created)}.pdf'
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'samples': self.sample_count,
+            'created': self.created,
+            'finished': self.finished,
+            'error': self.error,
+            'size': len(self.data) if self.data else 0
+        }
+
+
+class ReportJobManager:
+    """Queues report jobs on a worker pool; each job renders into its own buffer.
+
+    The history is copied when the job is submitted, so later samples do
+    not change a report that is already running. Only the most recent
+    ``max_jobs`` jobs (and their PDFs) are retained. ``get_generator`` is
+    called on a worker thread, so a lazily created PDFGenerator is first
+    built (and its plotting stack imported) off the request thread.
+    """
+
+    def __init__(self, get_generator: Callable, max_workers: int = 2, max_jobs: int = 20,
+                 on_complete: Optional[Callable[[ReportJob], None]] = None, rollups=None, alerts=None,
+                 anomalies=None):
+        self.get_generator = get_generator
+        self.rollups = rollups
+        self.alerts = alerts
+        self.anomalies = anomalies
+        self.max_jobs = max_jobs
+        self.on_complete = on_complete
+        self.jobs: 'OrderedDict[str, ReportJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='report')
+
+    def submit(self, history, rollups=None, host: Optional[str] = None, appendix: bool = False) -> ReportJob:
+        """Snapshot history and queue a report job for it (with a sample appendix if asked)"""
+        snapshot = history.copy()
+        rollups = rollups if rollups is not None else self.rollups
+        # Alerts and anomalies are evaluated on the local monitor only
+        alerts = self.alerts if host is None else None
+        anomalies = self.anomalies if host is None else None
+        return self._queue(len(snapshot), lambda buffer: self.get_generator().generate_report(
+            snapshot, buffer, rollups=rollups, host=host, alerts=alerts, anomalies=anomalies, appendix=appendix))
+
+    def submit_fleet(self, hosts: Dict) -> ReportJob:
+        """Snapshot every host's history and queue one fleet report"""
+        snapshots = {name: history.copy() for name, history in hosts.items()}
+        return self._queue(sum(len(h) for h in snapshots.values()),
+                           lambda buffer: self.get_generator().generate_fleet_report(snapshots, buffer))
+
+    def _queue(self, sample_count: int, render: Callable) -> ReportJob:
+        job = ReportJob(sample_count)
+
+        with self._lock:
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.max_jobs:
+                self.jobs.popitem(last=False)
+
+        self._executor.submit(self._run, job, render)
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _run(self, job: ReportJob, render: Callable):
+        job.status = RUNNING
+        try:
+            buffer = BytesIO()
+            render(buffer)
+            job.data = buffer.getvalue()
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        job.finished = time.time()
+
+        if self.on_complete:
+            self.on_complete(job)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,327 @@
+"""
+Metric Rollups
+Incrementally aggregated 1 minute and 1 hour buckets (min/max/sum/count plus a
+quantile sketch) so range statistics cost O(buckets) instead of O(samples)
+"""
+
+import json
+import math
+import os
+import threading
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from metrics_store import FIELD_NAMES
+
+# (tier name, bucket seconds, buckets retained)
+TIERS = [
+    ('1m', 60, 24 * 60),
+    ('1h', 3600, 30 * 24),
+]
+
+# Metrics that also keep a quantile sketch (others keep min/max/sum/count only)
+SKETCH_METRICS = ['cpu_percent', 'memory_percent', 'disk_percent',
+                  'net_upload_kbps', 'net_download_kbps', 'cpu_temp']
+
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+ROLLUP_FILE = 'rollups_{tier}.jsonl'
+
+
+class QuantileSketch:
+    """Log-bucketed quantile sketch with bounded relative error (DDSketch style).
+
+    Sketches are mergeable, so minute buckets roll up into hour buckets and
+    any range of buckets can be combined for percentiles.
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._inv_log_gamma = 1 / math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self.count += 1
+        if value <= 1e-9:
+            self.zero += 1
+            return
+        key = math.ceil(math.log(value) * self._inv_log_gamma)
+        self.bins[key] = self.bins.get(key, 0) + 1
+
+    def add_array(self, values):
+        """add() for a whole array of values at once"""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values[values > 1e-9]
+        self.count += len(values)
+        self.zero += len(values) - len(positive)
+        if len(positive):
+            keys, counts = np.unique(np.ceil(np.log(positive) * self._inv_log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.bins[key] = self.bins.get(key, 0) + count
+
+    def merge(self, other: 'QuantileSketch'):
+        self.count += other.count
+        self.zero += other.zero
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict:
+        return {'z': self.zero, 'b': self.bins}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'QuantileSketch':
+        sketch = cls()
+        sketch.zero = data.get('z', 0)
+        sketch.bins = {int(k): v for k, v in data.get('b', {}).items()}
+        sketch.count = sketch.zero + sum(sketch.bins.values())
+        return sketch
+
+
+class RollupBucket:
+    """Aggregates of every metric over [start, start + seconds)"""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.count = 0
+        n = len(FIELD_NAMES)
+        self.mins = [math.inf] * n
+        self.maxs = [-math.inf] * n
+        self.sums = [0.0] * n
+        self.sketches = {name: QuantileSketch() for name in SKETCH_METRICS}
+
+    def add(self, values: List[float]):
+        self.count += 1
+        for i, value in enumerate(values):
+            if value < self.mins[i]:
+                self.mins[i] = value
+            if value > self.maxs[i]:
+                self.maxs[i] = value
+            self.sums[i] += value
+        for name, sketch in self.sketches.items():
+            sketch.add(values[_FIELD_INDEX[name]])
+
+    def merge(self, other: 'RollupBucket'):
+        self.count += other.count
+        for i in range(len(FIELD_NAMES)):
+            self.mins[i] = min(self.mins[i], other.mins[i])
+            self.maxs[i] = max(self.maxs[i], other.maxs[i])
+            self.sums[i] += other.sums[i]
+        for name, sketch in self.sketches.items():
+            sketch.merge(other.sketches[name])
+
+    def to_dict(self) -> Dict:
+        return {
+            'start': self.start,
+            'count': self.count,
+            'min': dict(zip(FIELD_NAMES, self.mins)),
+            'max': dict(zip(FIELD_NAMES, self.maxs)),
+            'sum': dict(zip(FIELD_NAMES, self.sums)),
+            'sketch': {name: sketch.to_dict() for name, sketch in self.sketches.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'RollupBucket':
+        bucket = cls(data['start'])
+        bucket.count = data['count']
+        for i, name in enumerate(FIELD_NAMES):
+            bucket.mins[i] = data['min'].get(name, math.inf)
+            bucket.maxs[i] = data['max'].get(name, -math.inf)
+            bucket.sums[i] = data['sum'].get(name, 0.0)
+        for name in SKETCH_METRICS:
+            if name in data.get('sketch', {}):
+                bucket.sketches[name] = QuantileSketch.from_dict(data['sketch'][name])
+        return bucket
+
+
+_FIELD_INDEX = {name: i for i, name in enumerate(FIELD_NAMES)}
+
+
+class RollupTier:
+    """Closed buckets of one resolution plus the bucket currently filling"""
+
+    def __init__(self, name: str, seconds: int, retention: int):
+        self.name = name
+        self.seconds = seconds
+        self.buckets: deque = deque(maxlen=retention)
+        self.current: Optional[RollupBucket] = None
+
+    def bucket_start(self, timestamp: float) -> float:
+        return timestamp // self.seconds * self.seconds
+
+
+class RollupEngine:
+    """Feeds samples into the 1m tier and closed 1m buckets into the 1h tier.
+
+    Closed buckets are appended to ``rollups_<tier>.jsonl`` in ``directory``
+    (next to the raw segments) and reloaded on startup.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self.tiers = [RollupTier(*tier) for tier in TIERS]
+        self._lock = threading.Lock()
+        self._appended = {tier.name: 0 for tier in self.tiers}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def add(self, timestamp: float, values: List[float]):
+        """Aggregate one sample (values ordered as FIELD_NAMES)"""
+        with self._lock:
+            minute = self.tiers[0]
+            start = minute.bucket_start(timestamp)
+            if minute.current is not None and start != minute.current.start:
+                self._close(0)
+            if minute.current is None:
+                minute.current = RollupBucket(start)
+            minute.current.add(values)
+
+    def _close(self, level: int):
+        """Close the open bucket of tier `level` and cascade it into the next tier"""
+        tier = self.tiers[level]
+        bucket = tier.current
+        tier.current = None
+        tier.buckets.append(bucket)
+        self._persist(tier, bucket)
+
+        if level + 1 < len(self.tiers):
+            parent = self.tiers[level + 1]
+            start = parent.bucket_start(bucket.start)
+            if parent.current is not None and start != parent.current.start:
+                self._close(level + 1)
+            if parent.current is None:
+                parent.current = RollupBucket(start)
+            parent.current.merge(bucket)
+
+    def _path(self, tier: RollupTier) -> str:
+        return os.path.join(self.directory, ROLLUP_FILE.format(tier=tier.name))
+
+    def _persist(self, tier: RollupTier, bucket: RollupBucket):
+        if not self.directory:
+            return
+        with open(self._path(tier), 'a') as f:
+            f.write(json.dumps(bucket.to_dict()) + '\n')
+        self._appended[tier.name] += 1
+
+        # Rewrite the file once it holds twice the retained buckets
+        if self._appended[tier.name] > tier.buckets.maxlen:
+            self._rewrite(tier)
+
+    def _rewrite(self, tier: RollupTier):
+        tmp_path = self._path(tier) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            for bucket in tier.buckets:
+                f.write(json.dumps(bucket.to_dict()) + '\n')
+        os.replace(tmp_path, self._path(tier))
+        self._appended[tier.name] = 0
+
+    def _load(self):
+        for tier in self.tiers:
+            path = self._path(tier)
+            if not os.path.exists(path):
+                continue
+            with open(path) as f:
+                for line in f:
+                    try:
+                        tier.buckets.append(RollupBucket.from_dict(json.loads(line)))
+                    except (ValueError, KeyError):
+                        continue  # skip a line truncated by a crash
+            self._rewrite(tier)
+
+        # Rebuild coarser buckets that were still open when the process stopped
+        for level in range(len(self.tiers) - 1):
+            child, parent = self.tiers[level], self.tiers[level + 1]
+            known = {b.start for b in parent.buckets}
+            rebuilt: Dict[float, RollupBucket] = {}
+            for bucket in child.buckets:
+                start = parent.bucket_start(bucket.start)
+                if start in known:
+                    continue
+                rebuilt.setdefault(start, RollupBucket(start)).merge(bucket)
+            if rebuilt:
+                *closed, latest = sorted(rebuilt)
+                for start in closed:
+                    parent.buckets.append(rebuilt[start])
+                    self._persist(parent, rebuilt[start])
+                parent.current = rebuilt[latest]
+
+    def _buckets_in(self, start: float, end: float) -> List[RollupBucket]:
+        """Coarsest closed buckets inside [start, end], finer ones where no coarser bucket fits.
+
+        The open minute bucket is included when it starts inside the range,
+        so the result reflects samples up to the latest one.
+        """
+        selected = []
+        included = []  # (tier, set of bucket starts) of coarser tiers already used
+
+        for tier in reversed(self.tiers):
+            starts = set()
+            candidates = list(tier.buckets)
+            if tier is self.tiers[0] and tier.current is not None:
+                candidates.append(tier.current)
+
+            for bucket in candidates:
+                closed_fits = bucket.start >= start and bucket.start + tier.seconds <= end
+                open_fits = bucket is tier.current and start <= bucket.start <= end
+                if not (closed_fits or open_fits):
+                    continue
+                if any(coarse.bucket_start(bucket.start) in used for coarse, used in included):
+                    continue
+                selected.append(bucket)
+                starts.add(bucket.start)
+
+            included.append((tier, starts))
+
+        return selected
+
+    def stats(self, metrics: Optional[Iterable[str]] = None, start: Optional[float] = None,
+              end: Optional[float] = None,
+              quantiles: Iterable[float] = (0.5, 0.95, 0.99)) -> Dict[str, Dict]:
+        """min/max/avg/count (and percentiles for sketched metrics) over [start, end]"""
+        start = -math.inf if start is None else start
+        end = math.inf if end is None else end
+        metrics = list(metrics or FIELD_NAMES)
+
+        with self._lock:
+            buckets = self._buckets_in(start, end)
+            result = {}
+            for name in metrics:
+                i = _FIELD_INDEX[name]
+                count = sum(b.count for b in buckets)
+                entry = {
+                    'count': count,
+                    'min': min((b.mins[i] for b in buckets if b.count), default=None),
+                    'max': max((b.maxs[i] for b in buckets if b.count), default=None),
+                    'avg': sum(b.sums[i] for b in buckets) / count if count else None,
+                    'buckets': len(buckets)
+                }
+                if name in SKETCH_METRICS:
+                    sketch = QuantileSketch()
+                    for bucket in buckets:
+                        sketch.merge(bucket.sketches[name])
+                    for q in quantiles:
+                        value = sketch.quantile(q)
+                        if value is not None:
+                            # Sketch error is relative; never report outside the observed range
+                            value = min(max(value, entry['min']), entry['max'])
+                        entry[f"p{int(q * 100)}"] = value
+                result[name] = entry
+            return result
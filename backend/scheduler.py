@@ -0,0 +1,205 @@
+"""
+Collector Scheduler
+Runs each metric collector on its own sampling period and keeps the latest values
+
+Due collectors run concurrently on a small thread pool and each result is
+awaited for at most the collector's timeout. A probe that hangs (a stuck
+nvidia-smi, an unresponsive network mount) keeps its previous value and is
+not started again until the stuck call returns, so it cannot stall the
+collection loop or pile up threads. A probe that raises is counted and
+logged, keeps its previous value the same way, and is retried next period.
+"""
+
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import COLLECTOR_SECONDS
+
+# Cost classes used to pick default periods
+STATIC = 'static'
+FAST = 'fast'
+SLOW = 'slow'
+
+# Seconds a pass waits for a collector before using its previous value.
+# A call that overruns still finishes in the background and its result is
+# picked up then, so short timeouts cost at most one stale frame.
+DEFAULT_TIMEOUTS = {STATIC: 5.0, FAST: 0.25, SLOW: 0.5}
+
+# Collectors run on one grid of their periods from the first pass, so the
+# 0.5 s, 1 s and slower groups fall due in the same pass. A collector due
+# within this many seconds (at most a tenth of the shortest period) joins
+# the pass instead of waking the loop again a moment later.
+DUE_TOLERANCE = 0.005
+
+
+class Collector:
+    """A named probe with its own sampling period.
+
+    ``period=None`` marks a static collector: it runs once and its result
+    is cached for the lifetime of the scheduler. ``default`` stands in for
+    the result when the very first run times out; collectors without one
+    wait for their first result.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], period: Optional[float], cost: str = FAST,
+                 timeout: Optional[float] = None, default: Any = None):
+        self.name = name
+        self.func = func
+        self.period = period
+        self.cost = STATIC if period is None else cost
+        self.timeout = DEFAULT_TIMEOUTS[self.cost] if timeout is None else timeout
+        self.default = default
+        self.last_run = None
+        self.next_run: Optional[float] = None
+        self.runs = 0
+        self.total_time = 0.0
+        self.timeouts = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        # Call still running after its timeout
+        self.stuck: Optional[Future] = None
+
+    def is_due(self, now: float, tolerance: float = 0.0) -> bool:
+        if self.last_run is None:
+            return True
+        if self.period is None:
+            return False
+        return now >= self.next_run - tolerance
+
+    def schedule(self, now: float, epoch: float, tolerance: float = 0.0):
+        """Record a run at `now` and move next_run to the following slot of the grid from `epoch`"""
+        self.last_run = now
+        if self.period is not None:
+            slot = math.floor((now + tolerance - epoch) / self.period)
+            self.next_run = epoch + (slot + 1) * self.period
+
+
+class CollectorScheduler:
+    """Runs due collectors and merges their latest results"""
+
+    def __init__(self, collectors: List[Collector]):
+        self.collectors = {c.name: c for c in collectors}
+        self.latest: Dict[str, Any] = {}
+        # Start of the shared schedule grid (the first pass), and how early a slot may run
+        self.epoch: Optional[float] = None
+        periods = [c.period for c in collectors if c.period]
+        self.tolerance = min([DUE_TOLERANCE] + [period / 10 for period in periods])
+        self._pool = ThreadPoolExecutor(max_workers=len(collectors) or 1, thread_name_prefix='collector')
+        self._lock = threading.Lock()
+
+    def run(self, now: Optional[float] = None, force: bool = False, inline: bool = False) -> List[str]:
+        """Run every due collector (all non-static ones if force) and return the names that updated.
+
+        ``inline`` runs them one by one on the calling thread, without
+        timeouts, so a profiler attached to that thread sees the probes.
+        """
+        now = time.monotonic() if now is None else now
+        if self.epoch is None:
+            self.epoch = now
+        started = []
+
+        with self._lock:
+            for collector in self.collectors.values():
+                if not collector.is_due(now, self.tolerance) and not (force and collector.period is not None):
+                    continue
+                if collector.stuck is not None:
+                    if not collector.stuck.done():
+                        collector.skipped += 1
+                        continue
+                    collector.stuck = None
+                if inline or collector.period is None:
+                    # Static collectors run first and in order: others may read them via get()
+                    try:
+                        self._run_collector(collector, now)
+                    except Exception as e:
+                        self._failed(collector, now, e)
+                        continue
+                    started.append((collector, None, None))
+                else:
+                    deadline = time.perf_counter() + collector.timeout
+                    started.append((collector, self._pool.submit(self._run_collector, collector, now), deadline))
+
+        updated = []
+        for collector, future, deadline in started:
+            if future is None:
+                updated.append(collector.name)
+                continue
+            wait = None
+            if collector.name in self.latest or collector.default is not None:
+                wait = max(0.0, deadline - time.perf_counter())
+            try:
+                future.result(timeout=wait)
+            except TimeoutError:
+                collector.timeouts += 1
+                collector.stuck = future
+                collector.schedule(now, self.epoch, self.tolerance)
+                self.latest.setdefault(collector.name, collector.default)
+                print(f"Collector {collector.name} timed out after {collector.timeout:g}s; keeping its last value")
+                continue
+            except Exception as e:
+                self._failed(collector, now, e)
+                continue
+            updated.append(collector.name)
+
+        return updated
+
+    def _run_collector(self, collector: Collector, now: float):
+        start = time.perf_counter()
+        result = collector.func()
+        elapsed = time.perf_counter() - start
+        collector.total_time += elapsed
+        COLLECTOR_SECONDS.observe(elapsed, collector.name)
+        collector.runs += 1
+        collector.schedule(now, now if self.epoch is None else self.epoch, self.tolerance)
+        self.latest[collector.name] = result
+
+    def _failed(self, collector: Collector, now: float, error: Exception):
+        """Count a collector that raised and keep its last value (or default) until its next period"""
+        collector.errors += 1
+        collector.last_error = repr(error)
+        if collector.period is not None:
+            # Static collectors stay due and are retried on the next pass
+            collector.schedule(now, self.epoch, self.tolerance)
+        if collector.default is not None:
+            self.latest.setdefault(collector.name, collector.default)
+        print(f"Collector {collector.name} failed: {error!r}; keeping its last value")
+
+    def get(self, name: str) -> Any:
+        """Latest result of one collector, running it first if it never ran"""
+        if name not in self.latest:
+            self._run_collector(self.collectors[name], time.monotonic())
+        return self.latest[name]
+
+    def next_due(self, now: Optional[float] = None) -> float:
+        """Seconds until the next periodic collector is due"""
+        now = time.monotonic() if now is None else now
+        waits = []
+        for collector in self.collectors.values():
+            if collector.last_run is None:
+                return 0.0
+            if collector.period is not None:
+                waits.append(collector.next_run - self.tolerance - now)
+        return max(0.0, min(waits)) if waits else 0.0
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-collector period, cost class, run count and time spent"""
+        return {
+            name: {
+                'period': c.period,
+                'cost': c.cost,
+                'timeout': c.timeout,
+                'runs': c.runs,
+                'timeouts': c.timeouts,
+                'skipped': c.skipped,
+                'errors': c.errors,
+                'last_error': c.last_error,
+                'stuck': c.stuck is not None and not c.stuck.done(),
+                'total_time_ms': round(c.total_time * 1000, 3),
+                'avg_time_ms': round(c.total_time * 1000 / c.runs, 3) if c.runs else 0.0
+            }
+            for name, c in self.collectors.items()
+        }
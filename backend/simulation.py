@@ -0,0 +1,437 @@
+"""
+Simulation and Replay
+Synthetic or recorded metrics fed through the normal monitoring pipeline
+
+For load-testing the Socket.IO fan-out, alerts, storage and PDF reports
+without a busy machine:
+
+- SyntheticSystem is a psutil-compatible source with a configurable number
+  of cores, partitions and NICs. Its load follows seeded waves and bursts,
+  and its counters advance with real elapsed time, so rates come out right
+  at any sampling speed.
+- SimulatedMonitor is a SystemMonitor on a SyntheticSystem. Every collector
+  period is divided by ``speed``: at speed=100 the 0.5 s tick becomes 5 ms.
+  Timestamps stay on the wall clock, so latency measurements and reports
+  work as usual.
+- FrameRecorder writes every frame to a JSON-lines file. ReplayMonitor plays
+  such a recording back ``speed`` times faster than it was recorded (looping
+  at the end), restamping each frame with the current time.
+- SimulatedHosts feeds extra synthetic hosts into a FleetAggregator, batched
+  like agent.py batches.
+
+background_monitoring, CollectionWorker and PDFGenerator need no changes.
+Configure the server with environment variables:
+
+    MONITOR_SIMULATE="speed=20,cores=16,partitions=6,nics=4,hosts=50,seed=1"
+    MONITOR_REPLAY="session.jsonl,speed=50"
+    MONITOR_RECORD="session.jsonl"
+"""
+
+import gzip
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from io_counters import SNAPSHOT_MAX_AGE
+from metrics_store import FIELD_NAMES, extract_values
+from procfs import scputimes, scpufreq, sdiskio, shwtemp, snetio, sswap, svmem
+from system_monitor import COLLECTOR_PERIODS, SystemMonitor
+
+sdiskpart = namedtuple('sdiskpart', ['device', 'mountpoint', 'fstype', 'opts'])
+sdiskusage = namedtuple('sdiskusage', ['total', 'used', 'free', 'percent'])
+snicaddr = namedtuple('snicaddr', ['family', 'address', 'netmask', 'broadcast', 'ptp'])
+snicstats = namedtuple('snicstats', ['isup', 'duplex', 'speed', 'mtu', 'flags'])
+
+DEFAULT_OPTIONS = {'speed': 10.0, 'cores': 8, 'partitions': 4, 'nics': 2, 'hosts': 1, 'seed': 0}
+
+# Simulated seconds per load wave, and the chance per read that a burst starts
+WAVE_SECONDS = 600.0
+BURST_CHANCE = 0.002
+BURST_SECONDS = 20.0
+
+# Collectors that read the simulated source (processes would be the real machine's)
+SIMULATED_COLLECTORS = ['temperature', 'disk_partitions', 'interfaces']
+
+# Gaps in a recording longer than this are replayed as this (idle periods, restarts)
+REPLAY_MAX_GAP = 5.0
+
+# Extra simulated hosts send a batch every this many simulated seconds, like agent.py
+HOST_BATCH_SECONDS = 5.0
+HOST_SAMPLE_SECONDS = COLLECTOR_PERIODS['cpu']
+
+GB = 1024 ** 3
+
+
+def parse_options(spec: str, defaults: Dict = DEFAULT_OPTIONS) -> Dict:
+    """'speed=20,cores=16' -> options over the defaults (a bare leading item is returned as 'path')"""
+    options = dict(defaults)
+    for i, item in enumerate(part.strip() for part in spec.split(',')):
+        if not item:
+            continue
+        key, sep, value = item.partition('=')
+        if not sep and i == 0:
+            options['path'] = item
+            continue
+        if key not in defaults:
+            raise ValueError(f"Unknown simulation option: {key}")
+        options[key] = type(defaults[key])(value)
+    return options
+
+
+class _Wave:
+    """Load in [0, 1]: a slow wave, noise and occasional bursts, over simulated time"""
+
+    __slots__ = ('base', 'amplitude', 'phase', 'noise', 'burst_until')
+
+    def __init__(self, rng: random.Random, base: float, amplitude: float, noise: float):
+        self.base = base
+        self.amplitude = amplitude
+        self.phase = rng.uniform(0, 2 * math.pi)
+        self.noise = noise
+        self.burst_until = -1.0
+
+    def value(self, t: float, rng: random.Random) -> float:
+        if t > self.burst_until and rng.random() < BURST_CHANCE:
+            self.burst_until = t + rng.uniform(0.2, 1.0) * BURST_SECONDS
+        load = self.base + self.amplitude * math.sin(2 * math.pi * t / WAVE_SECONDS + self.phase)
+        load += rng.gauss(0, self.noise)
+        if t <= self.burst_until:
+            load += 0.5
+        return min(1.0, max(0.0, load))
+
+
+class SyntheticSystem:
+    """psutil-compatible source of a simulated machine (see SystemMonitor's ``source``)"""
+
+    def __init__(self, cores: int = 8, partitions: int = 4, nics: int = 2, seed: int = 0, speed: float = 1.0):
+        self.rng = random.Random(seed)
+        self.speed = speed
+        self.cores = cores
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.cpu_waves = [_Wave(self.rng, 0.3, 0.2, 0.05) for _ in range(cores)]
+        self.cpu = [[0.0] * 10 for _ in range(cores)]
+        self.cpu_read = self.start
+        self.memory_wave = _Wave(self.rng, 0.5, 0.1, 0.005)
+        self.memory_total = 8 * GB * max(1, cores // 4)
+
+        # One disk per partition plus its first partition, like perdisk=True on Linux
+        self.disks = [f"sd{chr(ord('a') + i % 26)}{'' if i < 26 else i // 26}" for i in range(partitions)]
+        self.disk_waves = {name: _Wave(self.rng, 0.2, 0.15, 0.05) for name in self.disks}
+        self.disk_sizes = {name: self.rng.choice([256, 512, 1024, 2048]) * GB for name in self.disks}
+        self.disk_fill = {name: self.rng.uniform(0.2, 0.9) for name in self.disks}
+        self.disk = {name: [0] * 9 for name in self.disks + [f"{name}1" for name in self.disks]}
+        self.disk_read = self.start
+
+        self.nics = ['lo'] + [f"eth{i}" for i in range(nics)]
+        self.nic_waves = {name: _Wave(self.rng, 0.1 if name == 'lo' else 0.3, 0.2, 0.05) for name in self.nics}
+        self.net = {name: [0] * 8 for name in self.nics}
+        self.net_read = self.start
+
+    def _elapsed(self, last: float) -> Tuple[float, float, float]:
+        """(now, real seconds since `last`, simulated time)"""
+        now = time.monotonic()
+        return now, now - last, (now - self.start) * self.speed
+
+    def cpu_count(self, logical: bool = True) -> int:
+        return self.cores if logical else max(1, self.cores // 2)
+
+    def cpu_times(self, percpu: bool = False):
+        with self._lock:
+            now, elapsed, t = self._elapsed(self.cpu_read)
+            self.cpu_read = now
+            for times, wave in zip(self.cpu, self.cpu_waves):
+                busy = wave.value(t, self.rng)
+                times[0] += elapsed * busy * 0.7
+                times[2] += elapsed * busy * 0.3
+                times[3] += elapsed * (1.0 - busy)
+            per_core = [scputimes(*times) for times in self.cpu]
+        if percpu:
+            return per_core
+        return scputimes(*[sum(column) for column in zip(*per_core)])
+
+    def cpu_freq(self, percpu: bool = False):
+        return scpufreq(2400.0 + 800.0 * self.cpu_waves[0].value(time.monotonic() - self.start, self.rng),
+                        800.0, 3600.0)
+
+    def virtual_memory(self):
+        t = (time.monotonic() - self.start) * self.speed
+        used = int(self.memory_total * (0.2 + 0.7 * self.memory_wave.value(t, self.rng)))
+        available = self.memory_total - used
+        return svmem(self.memory_total, available, round(used / self.memory_total * 100, 1), used, available)
+
+    def swap_memory(self):
+        total = 2 * GB
+        used = int(total * 0.05)
+        return sswap(total, used, total - used, round(used / total * 100, 1))
+
+    def disk_partitions(self, all: bool = False):
+        return [sdiskpart(f"/dev/{name}1", '/' if i == 0 else f"/mnt/{name}", 'ext4', 'rw')
+                for i, name in enumerate(self.disks)]
+
+    def disk_usage(self, path: str):
+        name = self.disks[0] if path == '/' else path.rsplit('/', 1)[-1]
+        total = self.disk_sizes[name]
+        used = int(total * self.disk_fill[name])
+        return sdiskusage(total, used, total - used, round(used / total * 100, 1))
+
+    def disk_io_counters(self, perdisk: bool = False, nowrap: bool = True):
+        with self._lock:
+            now, elapsed, t = self._elapsed(self.disk_read)
+            self.disk_read = now
+            for name in self.disks:
+                load = self.disk_waves[name].value(t, self.rng)
+                reads, writes = int(elapsed * 400 * load), int(elapsed * 250 * load)
+                for key, share in ((name, 1.0), (f"{name}1", 0.9)):
+                    counters = self.disk[key]
+                    counters[0] += int(reads * share)
+                    counters[1] += int(writes * share)
+                    counters[2] += int(reads * share) * 16384
+                    counters[3] += int(writes * share) * 32768
+                    counters[4] += int(reads * share * 0.4)
+                    counters[5] += int(writes * share * 0.8)
+                    counters[8] += int(elapsed * 1000 * min(1.0, load * 1.2))
+                self.disk_fill[name] = min(0.99, self.disk_fill[name] + writes * 32768 / self.disk_sizes[name])
+            counters = {name: sdiskio(*values) for name, values in self.disk.items()}
+        if perdisk:
+            return counters
+        return sdiskio(*[sum(column) for column in zip(*(counters[name] for name in self.disks))])
+
+    def net_io_counters(self, pernic: bool = False, nowrap: bool = True):
+        with self._lock:
+            now, elapsed, t = self._elapsed(self.net_read)
+            self.net_read = now
+            for name in self.nics:
+                load = self.nic_waves[name].value(t, self.rng)
+                sent, received = int(elapsed * 2_000_000 * load), int(elapsed * 6_000_000 * load)
+                counters = self.net[name]
+                counters[0] += sent
+                counters[1] += received
+                counters[2] += sent // 1200
+                counters[3] += received // 1200
+            counters = {name: snetio(*values) for name, values in self.net.items()}
+        if pernic:
+            return counters
+        return snetio(*[sum(column) for column in zip(*counters.values())])
+
+    def net_if_addrs(self):
+        return {name: [snicaddr('AddressFamily.AF_INET', '127.0.0.1' if name == 'lo' else f"10.0.{i}.2",
+                                '255.255.255.0', None, None)]
+                for i, name in enumerate(self.nics)}
+
+    def net_if_stats(self):
+        return {name: snicstats(True, 2, 0 if name == 'lo' else 10000, 1500, 'up') for name in self.nics}
+
+    def sensors_temperatures(self, fahrenheit: bool = False):
+        t = (time.monotonic() - self.start) * self.speed
+        return {'coretemp': [shwtemp(f"Core {i}", round(40 + 45 * wave.value(t, self.rng), 1), 85.0, 100.0)
+                             for i, wave in enumerate(self.cpu_waves[:8])]}
+
+
+class SimulatedMonitor(SystemMonitor):
+    """SystemMonitor of a SyntheticSystem, sampling `speed` times faster than the real collectors"""
+
+    def __init__(self, speed: float = DEFAULT_OPTIONS['speed'], cores: int = DEFAULT_OPTIONS['cores'],
+                 partitions: int = DEFAULT_OPTIONS['partitions'], nics: int = DEFAULT_OPTIONS['nics'],
+                 seed: int = DEFAULT_OPTIONS['seed'], collectors: Optional[List[str]] = None, **kwargs):
+        self.speed = speed
+        super().__init__(collectors=SIMULATED_COLLECTORS if collectors is None else collectors,
+                         source=SyntheticSystem(cores, partitions, nics, seed, speed), **kwargs)
+        # Readings are shared for the same fraction of a tick as at normal speed
+        self.disk_counters.max_age = SNAPSHOT_MAX_AGE / speed
+        self.net_counters.max_age = SNAPSHOT_MAX_AGE / speed
+
+    def _build_collectors(self, names):
+        collectors = super()._build_collectors(names)
+        for collector in collectors:
+            if collector.period is not None:
+                collector.period /= self.speed
+        return collectors
+
+
+class FrameRecorder:
+    """Monitor listener that appends every frame to a JSON-lines recording"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self._file = open(path, 'a', buffering=1)
+        self._lock = threading.Lock()
+
+    def __call__(self, timestamp: float, values: List[float], frame: Dict):
+        line = json.dumps({'t': timestamp, 'frame': frame})
+        with self._lock:
+            self._file.write(line + '\n')
+            self.frames += 1
+
+    def close(self):
+        self._file.close()
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, Dict]]:
+    """(timestamp, frame) of each line of a recording (.jsonl or .jsonl.gz)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['t'], record['frame']
+
+
+class ReplayMonitor(SystemMonitor):
+    """SystemMonitor that plays back a FrameRecorder recording instead of collecting"""
+
+    def __init__(self, path: str, speed: float = DEFAULT_OPTIONS['speed'], loop: bool = True, **kwargs):
+        super().__init__(collectors=[], **kwargs)
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.loops = 0
+        self._frames = read_recording(path)
+        self._next = next(self._frames, None)
+        if self._next is None:
+            raise ValueError(f"Recording has no frames: {path}")
+        self._gap = 0.0
+        self._lock = threading.Lock()
+
+    def _advance(self) -> Dict:
+        """The next recorded frame, remembering the recorded gap to the one after it"""
+        timestamp, frame = self._next
+        self._next = next(self._frames, None)
+        if self._next is None and self.loop:
+            self.loops += 1
+            self._frames = read_recording(self.path)
+            self._next = next(self._frames)
+            # From the last frame back to the first: one tick
+            self._gap = COLLECTOR_PERIODS['cpu']
+        elif self._next is not None:
+            self._gap = min(REPLAY_MAX_GAP, max(0.0, self._next[0] - timestamp))
+        return frame
+
+    def collect(self, inline: bool = False) -> Dict:
+        with self._lock:
+            if self._next is None:
+                # Recording finished (loop=False): keep serving the last frame
+                return self.data_history.latest
+            data = dict(self._advance())
+        now = time.time()
+        data['timestamp'] = datetime.fromtimestamp(now).isoformat()
+        self.last_updated = [name for name in COLLECTOR_PERIODS if name != 'cpu_static']
+        self._record(now, data)
+        return data
+
+    def get_all_info(self, inline: bool = False) -> Dict:
+        return self.collect(inline)
+
+    def next_due(self) -> float:
+        return self._gap / self.speed if self._next is not None else 1.0
+
+
+class SimulatedHosts:
+    """Extra synthetic hosts fed into a FleetAggregator from one thread.
+
+    Every host gets a batch of samples per HOST_BATCH_SECONDS of simulated
+    time. The values are per-host waves around the local monitor's first
+    sample, and the latest frame is the local monitor's newest frame with that
+    host's CPU and memory figures.
+    """
+
+    def __init__(self, fleet, count: int, monitor: SystemMonitor, speed: float = DEFAULT_OPTIONS['speed'],
+                 seed: int = DEFAULT_OPTIONS['seed'], prefix: str = 'sim-host'):
+        self.fleet = fleet
+        self.names = [f"{prefix}-{i:03d}" for i in range(count)]
+        self.monitor = monitor
+        self.speed = speed
+        self.rng = np.random.default_rng(seed)
+        self.phase = self.rng.uniform(0, 2 * np.pi, (count, len(FIELD_NAMES)))
+        self.base = None
+        self.batches = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='simulated-hosts', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        rows_per_batch = int(HOST_BATCH_SECONDS / HOST_SAMPLE_SECONDS)
+        interval = HOST_BATCH_SECONDS / self.speed
+        start = time.time()
+        while not self._stop.wait(interval):
+            template = self.monitor.data_history.latest
+            if template is None:
+                continue
+            if self.base is None:
+                self.base = np.maximum(np.array(extract_values(template)), 1.0)
+            now = time.time()
+            # Real time of each sample: the batch covers the last `interval` seconds
+            times = now - interval + np.arange(1, rows_per_batch + 1) * (interval / rows_per_batch)
+            simulated = (times - start) * self.speed
+            wave = np.sin(2 * np.pi * simulated[None, :, None] / WAVE_SECONDS + self.phase[:, None, :])
+            noise = self.rng.normal(0, 0.05, wave.shape)
+            values = np.maximum(self.base * (1 + 0.3 * wave + noise), 0)
+            cpu = FIELD_NAMES.index('cpu_percent')
+            memory = FIELD_NAMES.index('memory_percent')
+            values[:, :, [cpu, memory]] = np.minimum(values[:, :, [cpu, memory]], 100.0)
+
+            for i, name in enumerate(self.names):
+                rows = np.column_stack([times, values[i]])
+                host = self.fleet.get_or_create(name)
+                host.connected = True
+                host.add_rows(rows, self._latest(template, values[i, -1]))
+                self.fleet.batches += 1
+                self.fleet.samples += len(rows)
+                if self.fleet.on_batch:
+                    self.fleet.on_batch(host)
+            self.batches += 1
+
+    def _latest(self, template: Dict, values: np.ndarray) -> Dict:
+        frame = dict(template)
+        frame['timestamp'] = datetime.now().isoformat()
+        frame['cpu'] = dict(frame['cpu'], percent=round(float(values[FIELD_NAMES.index('cpu_percent')]), 1))
+        virtual = dict(frame['memory']['virtual'],
+                       percent=round(float(values[FIELD_NAMES.index('memory_percent')]), 1))
+        frame['memory'] = dict(frame['memory'], virtual=virtual)
+        return frame
+
+
+def create_monitor(data_dir: Optional[str] = None) -> Tuple[SystemMonitor, Optional[Dict]]:
+    """Monitor selected by MONITOR_SIMULATE / MONITOR_REPLAY (else a normal SystemMonitor) and its options.
+
+    Simulated and replayed samples are stored under ``<data_dir>/simulation``
+    (options['data_dir']) so they never mix with the machine's own history.
+    """
+    simulate = os.environ.get('MONITOR_SIMULATE')
+    replay = os.environ.get('MONITOR_REPLAY')
+    if not simulate and not replay:
+        return SystemMonitor(data_dir=data_dir), None
+
+    directory = os.path.join(data_dir, 'simulation') if data_dir else None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if replay:
+        options = parse_options(replay, {**DEFAULT_OPTIONS, 'path': ''})
+        monitor = ReplayMonitor(options['path'], options['speed'], data_dir=directory)
+        print(f"Replaying {options['path']} at {options['speed']:g}x")
+    else:
+        options = parse_options(simulate)
+        monitor = SimulatedMonitor(options['speed'], options['cores'], options['partitions'], options['nics'],
+                                   options['seed'], data_dir=directory)
+        print(f"Simulating {options['hosts']} host(s) at {options['speed']:g}x: {options['cores']} cores, "
+              f"{options['partitions']} partitions, {options['nics']} NICs")
+    options['data_dir'] = directory
+    return monitor, options
@@ -3,45 +3,252 @@ System Resource Monitor
 Collects CPU, Memory, Disk, Network, and Temperature data
 """
 
+import importlib
+import os
 import psutil
 import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
-try:
-    import GPUtil
-    GPU_AVAILABLE = True
-except:
-    GPU_AVAILABLE = False
+from metrics_store import MetricStore, DEFAULT_CAPACITY
+from disk_store import DiskStore
+from io_counters import (CounterRates, DISK_RATE_KEYS, NIC_RATE_KEYS, disk_rates, idle_rates, nic_rates,
+                         partition_names)
+from rollups import RollupEngine
+from scheduler import Collector, CollectorScheduler, FAST, SLOW
+
+# GPUtil module, imported on the first temperature read (False when unavailable)
+_gputil = None
+
+
+def load_gputil():
+    global _gputil
+    if _gputil is None:
+        try:
+            import GPUtil
+            _gputil = GPUtil
+        except Exception:
+            _gputil = False
+    return _gputil
+
+
+class CpuSampler:
+    """Non-blocking CPU utilisation from consecutive cpu_times snapshots.
+
+    Each call reads per-core ``cpu_times`` once and compares it with the
+    previous snapshot, so no sleeping interval is needed. The aggregate is
+    the mean of the per-core figures.
+    """
+
+    def __init__(self, source=psutil):
+        self.source = source
+        self.last_times = source.cpu_times(percpu=True)
+        self.last_percent = [0.0] * len(self.last_times)
+
+    @staticmethod
+    def _busy_total(times):
+        total = sum(times)
+        # On Linux guest time is already counted in user/nice
+        total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+        idle = times.idle + getattr(times, 'iowait', 0)
+        return total - idle, total
+
+    def sample(self):
+        """Return (total_percent, per_core_percent) since the previous call"""
+        current = self.source.cpu_times(percpu=True)
+        per_core = []
+
+        for i, times in enumerate(current):
+            if i >= len(self.last_times):
+                per_core.append(0.0)
+                continue
+            busy, total = self._busy_total(times)
+            last_busy, last_total = self._busy_total(self.last_times[i])
+            total_delta = total - last_total
+            if total_delta <= 0:
+                # No ticks elapsed since the last read: keep the previous figure
+                per_core.append(self.last_percent[i] if i < len(self.last_percent) else 0.0)
+                continue
+            percent = (busy - last_busy) / total_delta * 100
+            per_core.append(round(min(100.0, max(0.0, percent)), 1))
+
+        self.last_times = current
+        self.last_percent = per_core
+        total_percent = round(sum(per_core) / len(per_core), 1) if per_core else 0.0
+        return total_percent, per_core
+
+
+# Sampling periods in seconds; None means collected once and cached
+COLLECTOR_PERIODS = {
+    'cpu_static': None,
+    'cpu': 0.5,
+    'network_io': 0.5,
+    'memory': 1.0,
+    'disk_io': 1.0,
+    'processes': 2.0,
+    'temperature': 15.0,
+    'disk_partitions': 30.0,
+    'interfaces': 60.0,
+}
+
+SLOW_COLLECTORS = ('processes', 'temperature', 'disk_partitions', 'interfaces')
+
+# Frame sections used when a probe is disabled or times out before its first
+# result (sensor/GPU subprocesses, hung mounts); fast collectors wait for theirs
+COLLECTOR_PLACEHOLDERS = {
+    'processes': {'count': 0, 'refreshed': 0, 'collect_ms': 0.0, 'top_cpu': [], 'top_memory': [], 'top_io': []},
+    'temperature': {'cpu': [], 'gpu': [{'name': 'Not available', 'temperature': 0}]},
+    'disk_partitions': [],
+    'interfaces': [],
+}
+
+# Collectors that can be left out; the others feed the history columns
+OPTIONAL_COLLECTORS = tuple(COLLECTOR_PLACEHOLDERS)
+
+# Extra collectors are "name=module:function" entries in the collector list, or
+# functions registered under this entry point group; either is imported on
+# its first run and its result goes into frame['plugins'][name]
+PLUGIN_ENTRY_POINTS = 'system_monitor.collectors'
+PLUGIN_PERIOD = 5.0
+
+
+def _plugin_target(name: str) -> str:
+    """module:function of an installed entry point plugin"""
+    from importlib.metadata import entry_points
+    for entry in entry_points(group=PLUGIN_ENTRY_POINTS):
+        if entry.name == name:
+            return entry.value
+    raise ValueError(f"Unknown collector: {name}")
+
+
+def _lazy_call(target: str) -> Callable[[], Any]:
+    """Collector function that imports module:function on its first call"""
+    func = None
+
+    def call():
+        nonlocal func
+        if func is None:
+            module, _, attr = target.partition(':')
+            func = getattr(importlib.import_module(module), attr)
+        return func()
+
+    return call
+
+
+# CounterRates consumer of the collectors (others keep their own previous readings)
+MONITOR_CONSUMER = 'monitor'
+
+# Readers of the per-tick counters: 'psutil', or 'procfs' for the Linux fast path (procfs.py)
+DEFAULT_SOURCE = 'psutil'
+
+
+def load_source(name: Optional[str] = None):
+    """psutil itself, or a ProcfsSource (falls back to psutil where /proc cannot be opened)"""
+    name = name or os.environ.get('MONITOR_SOURCE') or DEFAULT_SOURCE
+    if name == 'psutil':
+        return psutil
+    if name != 'procfs':
+        raise ValueError(f"Unknown collector source: {name}")
+    from procfs import ProcfsSource
+    try:
+        return ProcfsSource()
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"procfs source unavailable ({e}); using psutil")
+        return psutil
+
+
+def enabled_collectors() -> List[str]:
+    """Collector list from MONITOR_COLLECTORS (comma separated), default all built-ins"""
+    configured = os.environ.get('MONITOR_COLLECTORS')
+    if not configured:
+        return list(COLLECTOR_PERIODS)
+    return [item.strip() for item in configured.split(',') if item.strip()]
 
 
 class SystemMonitor:
-    def __init__(self):
-        self.network_io_last = psutil.net_io_counters()
-        self.last_check_time = time.time()
-        self.data_history = []
+    def __init__(self, history_size: int = DEFAULT_CAPACITY, data_dir: Optional[str] = None,
+                 collectors: Optional[Iterable[str]] = None, source=None):
+        # Where system figures are read from: a source name (MONITOR_SOURCE, default psutil)
+        # or an object with psutil's functions, e.g. simulation.SyntheticSystem
+        self.source = load_source(source) if source is None or isinstance(source, str) else source
+        # One raw (nowrap=False) counter read per tick; wraps and resets are handled per delta
+        self.disk_counters = CounterRates(lambda: self.source.disk_io_counters(perdisk=True, nowrap=False))
+        self.net_counters = CounterRates(lambda: self.source.net_io_counters(pernic=True, nowrap=False))
+        self.disk_counters.deltas(MONITOR_CONSUMER)
+        self.net_counters.deltas(MONITOR_CONSUMER)
+        self.cpu_sampler = CpuSampler(self.source)
+        # Created on the first processes run
+        self.process_collector = None
+        self.last_updated: List[str] = []
+        # Called with (timestamp, values, frame) for every sample, e.g. the alert engine
+        self.listeners: List[Callable[[float, List[float], Dict], None]] = []
+        self.data_history = MetricStore(history_size)
+
+        # Optional on-disk store; recent samples are reloaded after a restart
+        self.disk_store = DiskStore(data_dir) if data_dir else None
+        if self.disk_store:
+            self.disk_store.load_recent(self.data_history)
+
+        # 1m/1h aggregates, persisted next to the raw segments
+        self.rollups = RollupEngine(data_dir)
+        self.plugins: List[str] = []
+        self.scheduler = CollectorScheduler(self._build_collectors(
+            enabled_collectors() if collectors is None else collectors))
+
+    def _build_collectors(self, names: Iterable[str]) -> List[Collector]:
+        """Required built-ins, the enabled optional ones, then plugins in list order"""
+        names = list(names)
+        collectors = [
+            Collector(name, getattr(self, f"get_{name}_info"), period,
+                      SLOW if name in SLOW_COLLECTORS else FAST,
+                      default=COLLECTOR_PLACEHOLDERS.get(name))
+            for name, period in COLLECTOR_PERIODS.items()
+            if name not in OPTIONAL_COLLECTORS or name in names
+        ]
+        for item in names:
+            if item in COLLECTOR_PERIODS:
+                continue
+            name, _, target = item.partition('=')
+            if target and ':' not in target:
+                raise ValueError(f"Collector target must be module:function: {item}")
+            collectors.append(Collector(name, _lazy_call(target or _plugin_target(name)),
+                                        PLUGIN_PERIOD, SLOW, default={}))
+            self.plugins.append(name)
+        return collectors
+
+    def get_cpu_static_info(self) -> Dict:
+        """Get CPU facts that do not change while running"""
+        cpu_freq = self.source.cpu_freq()
+
+        return {
+            'core_count': self.source.cpu_count(logical=False),
+            'thread_count': self.source.cpu_count(logical=True),
+            'frequency_min': cpu_freq.min if cpu_freq else 0,
+            'frequency_max': cpu_freq.max if cpu_freq else 0
+        }
 
     def get_cpu_info(self) -> Dict:
         """Get CPU usage and frequency information"""
-        cpu_percent = psutil.cpu_percent(interval=0.1, percpu=True)
-        cpu_freq = psutil.cpu_freq()
+        cpu_percent, per_core = self.cpu_sampler.sample()
+        cpu_freq = self.source.cpu_freq()
+        static = self.scheduler.get('cpu_static')
 
         return {
-            'percent': psutil.cpu_percent(interval=0.1),
-            'percent_per_core': cpu_percent,
-            'core_count': psutil.cpu_count(logical=False),
-            'thread_count': psutil.cpu_count(logical=True),
+            'percent': cpu_percent,
+            'percent_per_core': per_core,
+            'core_count': static['core_count'],
+            'thread_count': static['thread_count'],
             'frequency': {
                 'current': cpu_freq.current if cpu_freq else 0,
-                'min': cpu_freq.min if cpu_freq else 0,
-                'max': cpu_freq.max if cpu_freq else 0
+                'min': static['frequency_min'],
+                'max': static['frequency_max']
             }
         }
 
     def get_memory_info(self) -> Dict:
         """Get memory usage information"""
-        virtual_mem = psutil.virtual_memory()
-        swap_mem = psutil.swap_memory()
+        virtual_mem = self.source.virtual_memory()
+        swap_mem = self.source.swap_memory()
 
         return {
             'virtual': {
@@ -62,14 +269,14 @@ class SystemMonitor:
             }
         }
 
-    def get_disk_info(self) -> Dict:
-        """Get disk usage information"""
-        partitions = psutil.disk_partitions()
+    def get_disk_partitions_info(self) -> List[Dict]:
+        """Get per-partition disk usage"""
+        partitions = self.source.disk_partitions()
         disk_info = []
 
         for partition in partitions:
             try:
-                usage = psutil.disk_usage(partition.mountpoint)
+                usage = self.source.disk_usage(partition.mountpoint)
                 disk_info.append({
                     'device': partition.device,
                     'mountpoint': partition.mountpoint,
@@ -85,38 +292,70 @@ class SystemMonitor:
             except PermissionError:
                 continue
 
-        # Disk IO
-        disk_io = psutil.disk_io_counters()
-        io_info = {
-            'read_bytes': disk_io.read_bytes if disk_io else 0,
-            'write_bytes': disk_io.write_bytes if disk_io else 0,
-            'read_mb': round(disk_io.read_bytes / (1024**2), 2) if disk_io else 0,
-            'write_mb': round(disk_io.write_bytes / (1024**2), 2) if disk_io else 0
-        }
+        return disk_info
+
+    def get_disk_io_info(self, consumer: str = MONITOR_CONSUMER) -> Dict:
+        """Get disk IO totals plus per-disk IOPS, throughput and latency since the consumer's previous call"""
+        elapsed, counters, deltas = self.disk_counters.deltas(consumer)
+        # perdisk lists partitions too; totals and the per-disk list count whole disks only
+        partitions = partition_names(frozenset(counters))
+        names = [name for name in counters if name not in partitions]
+        disks = [disk_rates(name, deltas[name], elapsed) if name in deltas else idle_rates(name, DISK_RATE_KEYS)
+                 for name in names]
+        read_bytes = sum(counters[name].read_bytes for name in names)
+        write_bytes = sum(counters[name].write_bytes for name in names)
 
         return {
-            'partitions': disk_info,
-            'io': io_info
+            'read_bytes': read_bytes,
+            'write_bytes': write_bytes,
+            'read_mb': round(read_bytes / (1024**2), 2),
+            'write_mb': round(write_bytes / (1024**2), 2),
+            'read_kbps': round(sum(d['read_kbps'] for d in disks), 2),
+            'write_kbps': round(sum(d['write_kbps'] for d in disks), 2),
+            'read_iops': round(sum(d['read_iops'] for d in disks), 1),
+            'write_iops': round(sum(d['write_iops'] for d in disks), 1),
+            'disks': disks
         }
 
-    def get_network_info(self) -> Dict:
-        """Get network usage information"""
-        current_time = time.time()
-        time_delta = current_time - self.last_check_time
-
-        network_io_current = psutil.net_io_counters()
+    def get_disk_info(self) -> Dict:
+        """Get disk usage information"""
+        return {
+            'partitions': self.get_disk_partitions_info(),
+            'io': self.get_disk_io_info()
+        }
 
-        # Calculate speed (bytes per second)
-        bytes_sent_per_sec = (network_io_current.bytes_sent - self.network_io_last.bytes_sent) / time_delta if time_delta > 0 else 0
-        bytes_recv_per_sec = (network_io_current.bytes_recv - self.network_io_last.bytes_recv) / time_delta if time_delta > 0 else 0
+    def get_network_io_info(self, consumer: str = MONITOR_CONSUMER) -> Dict:
+        """Get network totals plus total and per-interface speed since the consumer's previous call"""
+        elapsed, counters, deltas = self.net_counters.deltas(consumer)
+        nics = [nic_rates(name, deltas[name], elapsed) if name in deltas else idle_rates(name, NIC_RATE_KEYS)
+                for name in counters]
+        totals = [sum(column) for column in zip(*counters.values())] if counters else [0] * 4
+        bytes_sent, bytes_recv, packets_sent, packets_recv = totals[:4]
+        upload_kbps = sum(nic['upload_kbps'] for nic in nics)
+        download_kbps = sum(nic['download_kbps'] for nic in nics)
 
-        # Update last values
-        self.network_io_last = network_io_current
-        self.last_check_time = current_time
+        return {
+            'total': {
+                'bytes_sent': bytes_sent,
+                'bytes_recv': bytes_recv,
+                'packets_sent': packets_sent,
+                'packets_recv': packets_recv,
+                'mb_sent': round(bytes_sent / (1024**2), 2),
+                'mb_recv': round(bytes_recv / (1024**2), 2)
+            },
+            'speed': {
+                'upload_mbps': round(upload_kbps / 128, 2),  # KB/s to Mbps
+                'download_mbps': round(download_kbps / 128, 2),
+                'upload_kbps': round(upload_kbps, 2),
+                'download_kbps': round(download_kbps, 2)
+            },
+            'nics': nics
+        }
 
-        # Get network interfaces
-        interfaces = psutil.net_if_addrs()
-        interface_stats = psutil.net_if_stats()
+    def get_interfaces_info(self) -> List[Dict]:
+        """Get network interface addresses and link state"""
+        interfaces = self.source.net_if_addrs()
+        interface_stats = self.source.net_if_stats()
 
         interface_info = []
         for interface_name, addresses in interfaces.items():
@@ -129,23 +368,20 @@ class SystemMonitor:
                     'addresses': [{'address': addr.address, 'family': str(addr.family)} for addr in addresses]
                 })
 
-        return {
-            'total': {
-                'bytes_sent': network_io_current.bytes_sent,
-                'bytes_recv': network_io_current.bytes_recv,
-                'packets_sent': network_io_current.packets_sent,
-                'packets_recv': network_io_current.packets_recv,
-                'mb_sent': round(network_io_current.bytes_sent / (1024**2), 2),
-                'mb_recv': round(network_io_current.bytes_recv / (1024**2), 2)
-            },
-            'speed': {
-                'upload_mbps': round(bytes_sent_per_sec * 8 / (1024**2), 2),  # Convert to Mbps
-                'download_mbps': round(bytes_recv_per_sec * 8 / (1024**2), 2),
-                'upload_kbps': round(bytes_sent_per_sec / 1024, 2),
-                'download_kbps': round(bytes_recv_per_sec / 1024, 2)
-            },
-            'interfaces': interface_info
-        }
+        return interface_info
+
+    def get_network_info(self) -> Dict:
+        """Get network usage information"""
+        network_info = self.get_network_io_info()
+        network_info['interfaces'] = self.get_interfaces_info()
+        return network_info
+
+    def get_processes_info(self) -> Dict:
+        """Get top processes by CPU, memory and disk I/O"""
+        if self.process_collector is None:
+            from process_monitor import ProcessCollector
+            self.process_collector = ProcessCollector()
+        return self.process_collector.collect()
 
     def get_temperature_info(self) -> Dict:
         """Get temperature information (CPU/GPU)"""
@@ -156,7 +392,7 @@ class SystemMonitor:
 
         # CPU Temperature
         try:
-            temps = psutil.sensors_temperatures()
+            temps = self.source.sensors_temperatures()
             if temps:
                 for name, entries in temps.items():
                     for entry in entries:
@@ -170,9 +406,10 @@ class SystemMonitor:
             temp_info['cpu'] = [{'label': 'Not available on this system', 'current': 0}]
 
         # GPU Temperature
-        if GPU_AVAILABLE:
+        gputil = load_gputil()
+        if gputil:
             try:
-                gpus = GPUtil.getGPUs()
+                gpus = gputil.getGPUs()
                 for i, gpu in enumerate(gpus):
                     temp_info['gpu'].append({
                         'id': i,
@@ -191,28 +428,78 @@ class SystemMonitor:
 
         return temp_info
 
-    def get_all_info(self) -> Dict:
-        """Get all system information"""
-        timestamp = datetime.now().isoformat()
+    def _build_frame(self, now: float) -> Dict:
+        """Merge the latest collector results into one get_all_info() frame"""
+        latest = self.scheduler.latest
+
+        def section(name):
+            return latest[name] if name in latest else COLLECTOR_PLACEHOLDERS[name]
+
+        network = dict(latest['network_io'])
+        network['interfaces'] = section('interfaces')
 
         data = {
-            'timestamp': timestamp,
-            'cpu': self.get_cpu_info(),
-            'memory': self.get_memory_info(),
-            'disk': self.get_disk_info(),
-            'network': self.get_network_info(),
-            'temperature': self.get_temperature_info()
+            'timestamp': datetime.fromtimestamp(now).isoformat(),
+            'cpu': latest['cpu'],
+            'memory': latest['memory'],
+            'disk': {
+                'partitions': section('disk_partitions'),
+                'io': latest['disk_io']
+            },
+            'network': network,
+            'temperature': section('temperature'),
+            'processes': section('processes')
         }
+        if self.plugins:
+            data['plugins'] = {name: latest.get(name, {}) for name in self.plugins}
 
-        # Add to history
-        self.data_history.append(data)
-
+        self._record(now, data)
         return data
 
-    def get_history(self) -> List[Dict]:
-        """Get all collected data history"""
+    def _record(self, now: float, data: Dict):
+        """Add a frame to the history, disk store and rollups, and pass it to the listeners"""
+        values = self.data_history.append(now, data)
+        # The store clamps a wall clock step back; the disk store and rollups get the same time
+        now = self.data_history.last_timestamp
+        if self.disk_store:
+            self.disk_store.append_values(now, values)
+        self.rollups.add(now, values)
+        for listener in self.listeners:
+            listener(now, values, data)
+
+    def add_listener(self, listener: Callable[[float, List[float], Dict], None]):
+        """Receive every sample as it is collected"""
+        self.listeners.append(listener)
+
+    def collect(self, inline: bool = False) -> Dict:
+        """Run only the collectors that are due and return the merged frame"""
+        self.last_updated = self.scheduler.run(inline=inline)
+        return self._build_frame(time.time())
+
+    def next_due(self) -> float:
+        """Seconds until the next collector is due"""
+        return self.scheduler.next_due()
+
+    def get_all_info(self, inline: bool = False) -> Dict:
+        """Get all system information"""
+        self.last_updated = self.scheduler.run(force=True, inline=inline)
+        return self._build_frame(time.time())
+
+    def get_history(self) -> MetricStore:
+        """Get the columnar store of collected data history"""
         return self.data_history
 
+    def get_range(self, start: Optional[float] = None, end: Optional[float] = None):
+        """History over [start, end]; a start older than the in-memory window reads from disk.
+
+        Without a start the range is the in-memory window, not everything on disk.
+        """
+        first = self.data_history.first_timestamp
+        in_memory = start is None or (first is not None and start >= first)
+        if self.disk_store and not in_memory:
+            return self.disk_store.view(start, end, latest=self.data_history.latest)
+        return self.data_history.copy(start, end)
+
     def clear_history(self):
-        """Clear data history"""
-        self.data_history = []
+        """Clear in-memory data history (samples on disk are kept)"""
+        self.data_history.clear()
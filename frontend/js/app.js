@@ -2,11 +2,24 @@
 const BACKEND_URL = 'http://localhost:5001';
 let socket = null;
 let systemData = null;
+let deltaBase = null;  // last frame of the delta stream
+let lastSeq = 0;
 let dataHistory = [];
 let isMonitoring = false;
 let monitoringTime = 0;
 let timerInterval = null;
 let autoStopTimeout = null;
+let pendingReportJob = null;
+
+// Chart window shown on the dashboard (seconds)
+const HISTORY_WINDOW_SECONDS = 180;
+
+// Stream protocol: 'full' (JSON frames), 'delta' (snapshot + patches) or 'packed' (binary)
+const PROTOCOL_MODE = 'delta';
+let packedSchema = null;
+let packedTables = [];
+let packedStructure = null;
+let packedDetails = {};
 
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', function() {
@@ -23,6 +36,12 @@ function connectToServer() {
     socket.on('connect', () => {
         console.log('Connected to server');
         updateConnectionStatus(true);
+        // Choose the protocol, then (re)subscribe; the server answers the subscription
+        // with the chart backfill and a snapshot of the current state
+        socket.emit('set_protocol', { mode: PROTOCOL_MODE });
+        if (isMonitoring) {
+            socket.emit('start_monitoring');
+        }
     });
 
     socket.on('disconnect', () => {
@@ -34,29 +53,297 @@ function connectToServer() {
         console.log('Connection response:', data);
     });
 
+    socket.on('protocol_status', (data) => {
+        console.log('Protocol:', data.mode);
+        if (data.schema) {
+            packedSchema = data.schema;
+            packedTables = data.tables || [];
+        }
+    });
+
+    // Full frames (on-demand requests)
     socket.on('system_data', (data) => {
-        console.log('Received system data');
-        systemData = data;
+        handleSystemData(data);
+    });
 
-        // Add to history (keep last 18 entries - 3 minutes)
-        dataHistory.push(data);
-        if (dataHistory.length > 18) {
-            dataHistory.shift();
-        }
+    // Chart history of the last minutes, sent once on subscribe
+    socket.on('system_backfill', (buffer) => {
+        mergeBackfill(decodeBackfill(buffer));
+    });
 
-        updateUI(data);
-        updateCharts(dataHistory);
+    // Delta protocol: a snapshot, then only the changed paths
+    socket.on('system_snapshot', (message) => {
+        lastSeq = message.seq;
+        deltaBase = message.data;
+        handleSystemData(deltaBase);
+    });
 
-        // Update data count
-        document.getElementById('dataCount').textContent = dataHistory.length;
+    // Packed protocol: JSON structure (devices) and details (processes, sensors,
+    // partitions, plugins) when they change, binary scalars every tick
+    socket.on('system_structure', (structure) => {
+        packedStructure = structure;
+    });
 
-        // Enable PDF button if we have data
-        document.getElementById('downloadBtn').disabled = dataHistory.length === 0;
+    // Only the sections that changed; a resync sends them all
+    socket.on('system_details', (details) => {
+        Object.assign(packedDetails, details || {});
+    });
+
+    socket.on('system_packed', (buffer) => {
+        if (!packedSchema || !packedStructure) {
+            socket.emit('resync', 'packed');
+            return;
+        }
+        handleSystemData(unpackFrame(buffer));
+    });
+
+    socket.on('system_delta', (message) => {
+        if (!deltaBase || message.seq !== lastSeq + 1) {
+            socket.emit('resync');
+            return;
+        }
+        lastSeq = message.seq;
+        deltaBase = applyDelta(deltaBase, message.set, message.del);
+        handleSystemData(deltaBase);
     });
 
     socket.on('monitoring_status', (data) => {
         console.log('Monitoring status:', data);
     });
+
+    socket.on('report_status', (job) => {
+        handleReportStatus(job);
+    });
+
+    socket.on('alert', (event) => {
+        handleAlert(event);
+    });
+
+    // Anomaly start/end events share the alerts bar; scores arrive every tick
+    socket.on('anomaly', (event) => {
+        handleAlert(event);
+    });
+
+    socket.on('anomaly_scores', (message) => {
+        handleAnomalyScores(message);
+    });
+}
+
+// Firing alerts by rule and entity; resolved ones are removed
+const activeAlerts = new Map();
+
+function handleAlert(event) {
+    const id = `${event.rule}:${event.key || ''}`;
+    if (event.status === 'firing') {
+        activeAlerts.set(id, event);
+    } else {
+        activeAlerts.delete(id);
+    }
+    renderAlerts();
+}
+
+// Keep the current score on flagged anomalies (1.0x is the detector's limit)
+function handleAnomalyScores(message) {
+    let changed = false;
+    for (const metric of message.flagged) {
+        const alert = activeAlerts.get(`anomaly:${metric}`);
+        if (alert && alert.current !== message.scores[metric]) {
+            alert.current = message.scores[metric];
+            changed = true;
+        }
+    }
+    if (changed) {
+        renderAlerts();
+    }
+}
+
+function renderAlerts() {
+    const bar = document.getElementById('alertsBar');
+    bar.innerHTML = Array.from(activeAlerts.values()).map(alert => `
+        <div class="alert-item ${alert.severity}">
+            ${escapeHtml(alert.message)} (since ${new Date(alert.timestamp * 1000).toLocaleTimeString()}${
+                alert.current !== undefined ? `, now ${alert.current.toFixed(1)}x` : ''})
+        </div>
+    `).join('');
+    bar.style.display = activeAlerts.size > 0 ? 'flex' : 'none';
+}
+
+// Delta path segments escape '~' as '~0' and '.' as '~1' (see backend/frame_delta.py)
+function splitDeltaPath(path) {
+    return path.split('.').map(part => part.replace(/~1/g, '.').replace(/~0/g, '~'));
+}
+
+// Apply a path-keyed patch ({"cpu.percent": 12.5, ...}) to a copy of a frame
+function applyDelta(frame, changed, removed) {
+    const result = structuredClone(frame);
+
+    for (const [path, value] of Object.entries(changed || {})) {
+        const parts = splitDeltaPath(path);
+        const leaf = parts.pop();
+        let node = result;
+        parts.forEach(part => { node = node[part]; });
+        node[leaf] = value;
+    }
+
+    (removed || []).forEach(path => {
+        const parts = splitDeltaPath(path);
+        const leaf = parts.pop();
+        let node = result;
+        parts.forEach(part => { node = node[part]; });
+        delete node[leaf];
+    });
+
+    return result;
+}
+
+// Unit fields the packed protocol leaves to the client: name -> [source, divisor]
+const DERIVED_FIELDS = {
+    total_gb: ['total', 1024 ** 3],
+    used_gb: ['used', 1024 ** 3],
+    available_gb: ['available', 1024 ** 3],
+    free_gb: ['free', 1024 ** 3],
+    read_mb: ['read_bytes', 1024 ** 2],
+    write_mb: ['write_bytes', 1024 ** 2],
+    mb_sent: ['bytes_sent', 1024 ** 2],
+    mb_recv: ['bytes_recv', 1024 ** 2],
+    upload_mbps: ['upload_kbps', 128],
+    download_mbps: ['download_kbps', 128]
+};
+
+function restoreDerived(node) {
+    if (Array.isArray(node)) {
+        node.forEach(restoreDerived);
+    } else if (node && typeof node === 'object') {
+        for (const [key, [source, divisor]] of Object.entries(DERIVED_FIELDS)) {
+            if (!(key in node) && typeof node[source] === 'number') {
+                node[key] = Math.round(node[source] / divisor * 100) / 100;
+            }
+        }
+        Object.values(node).forEach(restoreDerived);
+    }
+}
+
+function setPath(frame, path, value) {
+    const parts = path.split('.');
+    const leaf = parts.pop();
+    let node = frame;
+    parts.forEach(part => { node = node[part] = node[part] || {}; });
+    node[leaf] = value;
+}
+
+// Decode a packed record (see backend/frame_codec.py) on top of the latest structure
+function unpackFrame(buffer) {
+    const view = new DataView(buffer);
+    const frame = structuredClone(packedStructure);
+    for (const [path, section] of Object.entries(structuredClone(packedDetails))) {
+        setPath(frame, path, section);
+    }
+    let offset = 4;  // uint32 seq
+
+    frame.timestamp = new Date(view.getFloat64(offset, true) * 1000).toISOString();
+    offset += 8;
+
+    packedSchema.forEach(([path, code]) => {
+        if (code === 'd') {
+            setPath(frame, path, view.getFloat64(offset, true));
+            offset += 8;
+        } else {
+            setPath(frame, path, view.getFloat32(offset, true));
+            offset += 4;
+        }
+    });
+
+    const count = view.getUint16(offset, true);
+    offset += 2;
+    const perCore = [];
+    for (let i = 0; i < count; i++) {
+        perCore.push(view.getFloat32(offset + i * 4, true));
+    }
+    setPath(frame, 'cpu.percent_per_core', perCore);
+    offset += count * 4;
+
+    // Per-device rate rows on top of the device lists of the structure
+    packedTables.forEach(([path, keys]) => {
+        const rows = view.getUint16(offset, true);
+        offset += 2;
+        const table = path.split('.').reduce((node, part) => (node ? node[part] : undefined), frame) || [];
+        for (let i = 0; i < rows; i++) {
+            keys.forEach((key, k) => {
+                if (table[i]) {
+                    table[i][key] = view.getFloat32(offset + k * 4, true);
+                }
+            });
+            offset += keys.length * 4;
+        }
+    });
+
+    restoreDerived(frame);
+    return frame;
+}
+
+// Decode a backfill message (see backend/backfill.py) into chart-only history entries
+function decodeBackfill(buffer) {
+    const view = new DataView(buffer);
+    const length = view.getUint16(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 2, length)));
+    let offset = 2 + length;
+    offset += (8 - offset % 8) % 8;
+
+    const n = header.points;
+    const timestamps = new Float64Array(buffer.slice(offset, offset + n * 8));
+    offset += n * 8;
+    const columns = {};
+    header.columns.forEach(name => {
+        columns[name] = new Float32Array(buffer.slice(offset, offset + n * 4));
+        offset += n * 4;
+    });
+
+    const points = [];
+    for (let i = 0; i < n; i++) {
+        points.push({
+            timestamp: new Date(timestamps[i] * 1000).toISOString(),
+            cpu: { percent: columns.cpu_percent[i] },
+            memory: { virtual: { percent: columns.memory_percent[i] } },
+            network: { speed: { upload_kbps: columns.net_upload_kbps[i], download_kbps: columns.net_download_kbps[i] } },
+            temperature: { cpu: [{ current: columns.cpu_temp[i] }], gpu: [{ temperature: columns.gpu_temp[i] }] }
+        });
+    }
+    return points;
+}
+
+// Put backfilled points in front of the live frames received after them
+function mergeBackfill(points) {
+    if (points.length === 0) return;
+    const last = Date.parse(points[points.length - 1].timestamp);
+    const live = dataHistory.filter(d => Date.parse(d.timestamp) > last);
+    dataHistory = points.concat(live);
+
+    document.getElementById('dataCount').textContent = dataHistory.length;
+    if (document.getElementById('chartsContainer').style.display !== 'none') {
+        updateCharts(dataHistory);
+    }
+}
+
+// Handle a complete system data frame
+function handleSystemData(data) {
+    console.log('Received system data');
+    systemData = data;
+
+    // Add to history (keep the last 3 minutes)
+    dataHistory.push(data);
+    const cutoff = Date.parse(data.timestamp) - HISTORY_WINDOW_SECONDS * 1000;
+    while (dataHistory.length > 0 && Date.parse(dataHistory[0].timestamp) < cutoff) {
+        dataHistory.shift();
+    }
+
+    updateUI(data);
+    updateCharts(dataHistory);
+
+    // Update data count
+    document.getElementById('dataCount').textContent = dataHistory.length;
+
+    // Enable PDF button if we have data and no report is being generated
+    document.getElementById('downloadBtn').disabled = dataHistory.length === 0 || pendingReportJob !== null;
 }
 
 // Update connection status indicator
@@ -85,7 +372,6 @@ function startMonitoring() {
     socket.emit('start_monitoring');
     isMonitoring = true;
     monitoringTime = 0;
-    dataHistory = [];
 
     // Update UI
     document.getElementById('startBtn').style.display = 'none';
@@ -164,6 +450,10 @@ function updateUI(data) {
             `${disk.used_gb} GB / ${disk.total_gb} GB`;
         document.getElementById('diskMount').textContent = disk.mountpoint;
     }
+    if (data.disk.io.read_kbps !== undefined) {
+        document.getElementById('diskIo').textContent =
+            `R ${data.disk.io.read_kbps.toFixed(1)} KB/s · W ${data.disk.io.write_kbps.toFixed(1)} KB/s`;
+    }
 
     // Network
     document.getElementById('netUpload').textContent =
@@ -202,6 +492,12 @@ function updateUI(data) {
     updateDetailedTables(data);
 }
 
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 // Update detailed tables
 function updateDetailedTables(data) {
     // CPU Details
@@ -226,6 +522,17 @@ function updateDetailedTables(data) {
     document.getElementById('memDetailSwapUsed').textContent =
         `${data.memory.swap.used_gb} GB (${data.memory.swap.percent.toFixed(1)}%)`;
 
+    // Top Processes
+    if (data.processes && data.processes.top_cpu.length > 0) {
+        const tbody = document.getElementById('processTableBody');
+        tbody.innerHTML = data.processes.top_cpu.map(proc => `
+            <tr>
+                <td>${escapeHtml(proc.name)} (${proc.pid})</td>
+                <td>${proc.cpu_percent.toFixed(1)}% | ${proc.rss_mb} MB</td>
+            </tr>
+        `).join('');
+    }
+
     // Disk Details
     if (data.disk.partitions.length > 0) {
         const tbody = document.getElementById('diskTableBody');
@@ -255,7 +562,7 @@ async function downloadPDF() {
     }
 
     try {
-        const response = await fetch(`${BACKEND_URL}/api/generate_pdf`, {
+        const response = await fetch(`${BACKEND_URL}/api/reports`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -263,20 +570,70 @@ async function downloadPDF() {
         });
 
         if (!response.ok) {
-            throw new Error('Failed to generate PDF');
+            throw new Error('Failed to queue PDF report');
         }
 
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `system_report_${Date.now()}.pdf`;
-        document.body.appendChild(a);
-        a.click();
-        a.remove();
-        window.URL.revokeObjectURL(url);
+        const job = await response.json();
+        pendingReportJob = job.job_id;
+        document.getElementById('downloadBtn').disabled = true;
+
+        // Completion is pushed over the socket; poll as a fallback
+        await waitForReport(job.job_id);
     } catch (error) {
         console.error('Error downloading PDF:', error);
         alert('Failed to generate PDF. Make sure monitoring has been started and data is available.');
+        pendingReportJob = null;
+        document.getElementById('downloadBtn').disabled = dataHistory.length === 0;
+    }
+}
+
+async function waitForReport(jobId) {
+    while (pendingReportJob === jobId) {
+        const response = await fetch(`${BACKEND_URL}/api/reports/${jobId}`);
+        const job = await response.json();
+        if (!response.ok || job.status === 'failed') {
+            throw new Error(job.error || 'Report job failed');
+        }
+        if (job.status === 'done') {
+            await fetchReport(jobId);
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
     }
 }
+
+function handleReportStatus(job) {
+    if (job.job_id !== pendingReportJob) return;
+
+    if (job.status === 'done') {
+        fetchReport(job.job_id).catch(error => {
+            console.error('Error downloading PDF:', error);
+            alert('Failed to download PDF.');
+        });
+    } else if (job.status === 'failed') {
+        pendingReportJob = null;
+        document.getElementById('downloadBtn').disabled = dataHistory.length === 0;
+        alert('Failed to generate PDF: ' + job.error);
+    }
+}
+
+async function fetchReport(jobId) {
+    if (pendingReportJob !== jobId) return;
+    pendingReportJob = null;
+    document.getElementById('downloadBtn').disabled = dataHistory.length === 0;
+
+    const response = await fetch(`${BACKEND_URL}/api/reports/${jobId}/download`);
+    if (!response.ok) {
+        throw new Error('Failed to download PDF');
+    }
+
+    const blob = await response.blob();
+    const url = window.URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `system_report_${Date.now()}.pdf`;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    window.URL.revokeObjectURL(url);
+}
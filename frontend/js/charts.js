@@ -133,8 +133,9 @@ function initCharts() {
 }
 
 function getChartLabels(dataHistory) {
-    return dataHistory.map((_, index) => {
-        const secondsAgo = (dataHistory.length - 1 - index) * 10;
+    const latest = Date.parse(dataHistory[dataHistory.length - 1].timestamp);
+    return dataHistory.map(d => {
+        const secondsAgo = Math.round((latest - Date.parse(d.timestamp)) / 1000);
         return secondsAgo === 0 ? 'Now' : `-${secondsAgo}s`;
     });
 }